@@ -0,0 +1,206 @@
+"""Background batch reviews: a job registry plus a paced worker pool"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from app.config import settings
+from app.metrics import track_in_flight
+from app.orchestrator import review_cache_key, run_full_review
+from app.services.clause_extractor import split_into_chunks
+from app.services.llm_scheduler import llm_caller
+from app.services.pdf_loader import load_contract
+from app.services.review_cache import review_cache
+from app.services.review_store import store_review
+
+
+class RequestPacer:
+    """
+    Spaces LLM requests evenly so the batch runs at, but not above, a requests-per-minute budget.
+
+    Each caller reserves the next free slots on a shared timeline and sleeps until
+    its slot comes up, so bursts from many workers are smoothed out.
+    """
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, requests=1):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot)
+            self._next_slot = start + self.interval * requests
+        delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class BatchJob:
+    def __init__(self, documents, tenant=None):
+        self.id = uuid.uuid4().hex
+        # Who submitted the job; its LLM calls are scheduled as batch traffic on their behalf
+        self.tenant = tenant
+        self.created_at = time.time()
+        self.finished_at = None
+        self.documents = [
+            {"index": index, "filename": name, "status": "queued", "result": None, "error": None}
+            for index, (name, _) in enumerate(documents)
+        ]
+        # Completed documents in completion order, for streaming
+        self.completed = []
+        self.condition = threading.Condition()
+
+    @property
+    def done(self):
+        return len(self.completed) == len(self.documents)
+
+    def snapshot(self):
+        with self.condition:
+            counts = {}
+            for doc in self.documents:
+                counts[doc["status"]] = counts.get(doc["status"], 0) + 1
+            return {
+                "job_id": self.id,
+                "status": "completed" if self.done else "running",
+                "total": len(self.documents),
+                "counts": counts,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+                "documents": [dict(doc) for doc in self.documents],
+            }
+
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+_executor = None
+_pacer = RequestPacer(settings.GROQ_REQUESTS_PER_MINUTE)
+
+
+def _get_executor():
+    global _executor
+    with _jobs_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.BATCH_WORKERS, thread_name_prefix="batch")
+        return _executor
+
+
+def _estimated_llm_calls(text: str):
+    # One extraction call per chunk, then risk classification and revision suggestions
+    # (the fused topology classifies risks in the extraction call)
+    chunks = split_into_chunks(text, settings.CLAUSE_CHUNK_SIZE, settings.CLAUSE_CHUNK_OVERLAP)
+    return len(chunks) + (1 if settings.PIPELINE_TOPOLOGY == "fused" else 2)
+
+
+def _pace(text: str):
+    # Cached reviews cost no LLM calls, so don't spend quota waiting for them
+    if not (settings.REVIEW_CACHE_ENABLED and review_cache.get(review_cache_key(text), record=False)):
+        _pacer.acquire(_estimated_llm_calls(text))
+
+
+def _process_document(job: BatchJob, index: int, path: str):
+    doc = job.documents[index]
+    with job.condition:
+        doc["status"] = "processing"
+    try:
+        with track_in_flight("batch"):
+            _review_document(job, doc, path)
+    finally:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception:
+            pass
+        with job.condition:
+            job.completed.append(index)
+            if job.done:
+                job.finished_at = time.time()
+            job.condition.notify_all()
+
+
+def _review_document(job: BatchJob, doc, path: str):
+    try:
+        text, normalization = load_contract(path)
+        if not text or not text.strip():
+            raise ValueError("PDF appears to be empty or could not be read")
+        # With the shared rate limiter on, every LLM call already waits for budget
+        if not settings.LLM_RATE_LIMIT_ENABLED:
+            _pace(text)
+        with llm_caller("batch", job.tenant):
+            result = run_full_review(text)
+        if normalization is not None:
+            result["pipeline"]["normalization"] = normalization
+        store_review(text, result, doc["filename"], "batch")
+        with job.condition:
+            doc["status"] = "completed"
+            doc["result"] = result
+    except Exception as e:
+        with job.condition:
+            doc["status"] = "failed"
+            doc["error"] = str(e)
+
+
+def _evict_old_jobs():
+    # Keep the registry bounded: drop the oldest finished jobs first
+    finished = sorted((job for job in _jobs.values() if job.done), key=lambda job: job.created_at)
+    while len(_jobs) > settings.BATCH_MAX_JOBS and finished:
+        del _jobs[finished.pop(0).id]
+
+
+def submit_batch(documents, tenant=None):
+    """
+    Queue documents for background review.
+
+    Args:
+        documents: List of (filename, path) tuples; the files are deleted once processed
+        tenant: Submitter the job's LLM calls are fair-shared under (see llm_scheduler)
+
+    Returns:
+        The new job id
+    """
+    job = BatchJob(documents, tenant)
+    with _jobs_lock:
+        _jobs[job.id] = job
+        _evict_old_jobs()
+    executor = _get_executor()
+    for index, (_, path) in enumerate(documents):
+        executor.submit(_process_document, job, index, path)
+    return job.id
+
+
+def get_job(job_id: str):
+    """Return the BatchJob for job_id, or None if unknown"""
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def iter_job_results(job: BatchJob, timeout=None):
+    """
+    Yield document records as they complete, in completion order.
+
+    Args:
+        job: The batch job to follow
+        timeout: Stop waiting after this many seconds without progress (None waits indefinitely)
+    """
+    sent = 0
+    while True:
+        with job.condition:
+            while sent == len(job.completed):
+                if job.done:
+                    return
+                if not job.condition.wait(timeout=timeout):
+                    return
+            pending = [dict(job.documents[index]) for index in job.completed[sent:]]
+        sent += len(pending)
+        yield from pending
+
+
+def shutdown_executor():
+    """Stop accepting batch work (called on application shutdown)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
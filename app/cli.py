@@ -0,0 +1,315 @@
+"""
+Headless batch reviews for large portfolios.
+
+    python -m app.cli review contracts/ --output reviews.jsonl
+    python -m app.cli train-prefilter
+
+PDFs are parsed in a process pool (one document per worker process) and reviewed
+by a bounded thread pool. Every finished contract is appended to the output file
+as one JSON line and flushed to disk at once. The output doubles as the checkpoint:
+re-running the same command after a crash or Ctrl-C skips contracts that already
+have a completed record and retries the failed ones, so readers should keep the
+last record per ``path``.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from app.config import settings
+from app.orchestrator import TOPOLOGIES, run_full_review
+from app.services.llm_scheduler import llm_caller
+from app.services.pdf_loader import load_contract
+from app.services.review_store import ReviewStore, store_review
+from app.services.risk_classifier import verdict_fingerprint
+from app.services.risk_prefilter import MARKER, train
+
+
+def find_pdfs(directory: str, recursive=True):
+    """PDF paths under directory, sorted so runs and resumes see the same order"""
+    if not recursive:
+        return sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.lower().endswith(".pdf") and os.path.isfile(os.path.join(directory, name))
+        )
+    found = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        found.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(".pdf"))
+    return found
+
+
+def read_checkpoint(output: str):
+    """
+    Relative paths that already have a completed record in ``output``.
+
+    A line torn by a crash mid-write is cut off so appending can continue cleanly.
+    """
+    completed = set()
+    if not os.path.exists(output):
+        return completed
+    with open(output, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+    for line in data[:end].splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get("status") == "completed":
+            completed.add(record["path"])
+    return completed
+
+
+def _parse(path: str):
+    """Extract and normalize one PDF - runs in a worker process"""
+    return load_contract(path, use_pool=False)
+
+
+def _review(text: str, topology):
+    started = time.perf_counter()
+    with llm_caller("batch", "cli"):
+        result = run_full_review(text, topology=topology)
+    return result, time.perf_counter() - started
+
+
+def _format_duration(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}h{rest // 60:02d}m" if hours else f"{rest // 60}m{rest % 60:02d}s"
+
+
+class Progress:
+    """Throughput and ETA for this run (resumed documents don't count towards the rates)"""
+
+    def __init__(self, total, skipped, interval=5.0, stream=sys.stderr):
+        self.total = total
+        self.skipped = skipped
+        self.interval = interval
+        self.stream = stream
+        self.completed = 0
+        self.failed = 0
+        self.tokens = 0
+        self.started = time.monotonic()
+        self._last_report = self.started
+
+    def record(self, ok, tokens=0):
+        if ok:
+            self.completed += 1
+        else:
+            self.failed += 1
+        self.tokens += tokens
+        now = time.monotonic()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report()
+
+    def stats(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        done = self.completed + self.failed
+        remaining = self.total - self.skipped - done
+        docs_per_minute = 60 * done / elapsed
+        return {
+            "total": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "elapsed_seconds": round(elapsed, 1),
+            "docs_per_minute": round(docs_per_minute, 1),
+            "tokens_per_minute": round(60 * self.tokens / elapsed),
+            "eta_seconds": round(60 * remaining / docs_per_minute) if docs_per_minute else None,
+        }
+
+    def report(self):
+        stats = self.stats()
+        done = self.skipped + stats["completed"] + stats["failed"]
+        eta = _format_duration(stats["eta_seconds"]) if stats["eta_seconds"] is not None else "?"
+        print(
+            f"[{done}/{self.total}] {stats['docs_per_minute']} docs/min, "
+            f"{stats['tokens_per_minute']:,} tokens/min, {stats['failed']} failed, ETA {eta}",
+            file=self.stream,
+            flush=True,
+        )
+
+
+def review_directory(directory, output, review_workers=None, pdf_workers=None, topology=None,
+                     recursive=True, progress_interval=5.0):
+    """
+    Review every PDF under ``directory``, appending one JSON record per contract to ``output``.
+
+    Parsing stays at most a few documents ahead of the reviews, so memory is bounded
+    however large the directory is.
+
+    Args:
+        review_workers: Reviews in flight at once (default: BATCH_WORKERS)
+        pdf_workers: PDF parsing processes (default: all cores)
+        topology: Pipeline topology (default: PIPELINE_TOPOLOGY)
+
+    Returns:
+        Final Progress stats (a dict)
+    """
+    review_workers = review_workers or settings.BATCH_WORKERS
+    pdf_workers = pdf_workers or os.cpu_count() or 1
+    paths = find_pdfs(directory, recursive)
+    done = read_checkpoint(output)
+    todo = deque(path for path in paths if os.path.relpath(path, directory) not in done)
+    progress = Progress(len(paths), len(paths) - len(todo), progress_interval)
+    print(
+        f"{len(paths)} PDFs in {directory}: {progress.skipped} already reviewed, {len(todo)} to go",
+        file=sys.stderr,
+        flush=True,
+    )
+
+    parsed = deque()  # (path, text, normalization) waiting for a review slot
+    parsing = {}
+    reviewing = {}
+    with open(output, "a", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=pdf_workers) as parse_pool, \
+            ThreadPoolExecutor(max_workers=review_workers, thread_name_prefix="cli-review") as review_pool:
+
+        def write(path, record):
+            record = {"path": os.path.relpath(path, directory), **record, "finished_at": time.time()}
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+
+        # Keep every parser busy, but don't run far ahead of the reviews
+        ahead = pdf_workers * 2 + review_workers
+        try:
+            while todo or parsing or parsed or reviewing:
+                while todo and len(parsing) + len(parsed) < ahead:
+                    path = todo.popleft()
+                    parsing[parse_pool.submit(_parse, path)] = path
+                while parsed and len(reviewing) < review_workers:
+                    path, text, normalization = parsed.popleft()
+                    reviewing[review_pool.submit(_review, text, topology)] = (path, text, normalization)
+
+                finished, _ = wait([*parsing, *reviewing], return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if future in parsing:
+                        path = parsing.pop(future)
+                        try:
+                            text, normalization = future.result()
+                            if not text.strip():
+                                raise ValueError("PDF appears to be empty or could not be read")
+                        except Exception as e:
+                            write(path, {"status": "failed", "error": str(e)})
+                            progress.record(False)
+                        else:
+                            parsed.append((path, text, normalization))
+                        continue
+
+                    path, text, normalization = reviewing.pop(future)
+                    try:
+                        result, seconds = future.result()
+                    except Exception as e:
+                        write(path, {"status": "failed", "error": str(e)})
+                        progress.record(False)
+                        continue
+                    if normalization is not None:
+                        result["pipeline"]["normalization"] = normalization
+                    store_review(text, result, os.path.basename(path), "cli")
+                    write(path, {"status": "completed", "seconds": round(seconds, 3), "result": result})
+                    pipeline = result.get("pipeline") or {}
+                    progress.record(True, pipeline.get("prompt_tokens", 0) + pipeline.get("completion_tokens", 0))
+        except KeyboardInterrupt:
+            # Finished reviews are already on disk; the rest is picked up by the next run
+            print("\nInterrupted - rerun the same command to resume", file=sys.stderr, flush=True)
+            for future in [*parsing, *reviewing]:
+                future.cancel()
+            parse_pool.shutdown(wait=False, cancel_futures=True)
+            review_pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    progress.report()
+    return progress.stats()
+
+
+def prefilter_examples(store):
+    """(clause_type, clause text, level) from stored reviews, skipping missing clauses and prefilter answers"""
+    for clause_type, summary, level, verdict in store.iter_clauses():
+        if MARKER in verdict or summary.strip().lower() == "not_found":
+            continue
+        yield clause_type, summary, level
+
+
+def train_prefilter(store_path, output, threshold=None):
+    """
+    Train the risk prefilter on the verdicts in a review store and save it to ``output``.
+
+    Returns:
+        The training report (precision and coverage on held-out clauses)
+
+    Raises:
+        ValueError: If the store has too few classified clauses
+    """
+    model, report = train(prefilter_examples(ReviewStore(store_path)), verdict_fingerprint(), threshold)
+    model.save(output)
+    return {"model_id": model.id, "output": output, **report}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Contract review from the command line")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    review = commands.add_parser(
+        "review",
+        help="Review every PDF in a directory into a JSONL file (resumable)",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    review.add_argument("directory")
+    review.add_argument("--output", default="reviews.jsonl", help="JSONL results file, also the checkpoint")
+    review.add_argument("--workers", type=int, help=f"Reviews in flight at once (default: BATCH_WORKERS={settings.BATCH_WORKERS})")
+    review.add_argument("--pdf-workers", type=int, help="PDF parsing processes (default: all cores)")
+    review.add_argument("--topology", choices=TOPOLOGIES, help="Pipeline topology (default: PIPELINE_TOPOLOGY)")
+    review.add_argument("--no-recursive", action="store_true", help="Only PDFs directly in the directory")
+    review.add_argument("--progress-interval", type=float, default=5.0, help="Seconds between progress lines")
+
+    prefilter = commands.add_parser(
+        "train-prefilter",
+        help="Train the local risk prefilter on verdicts in the review store",
+        description="Train the local risk prefilter (RISK_PREFILTER_*) on the LLM verdicts saved in the "
+                    "review store, and report its precision on held-out clauses.",
+    )
+    prefilter.add_argument("--store", default=settings.REVIEW_STORE_PATH, help="Review store (default: REVIEW_STORE_PATH)")
+    prefilter.add_argument("--output", default=settings.RISK_PREFILTER_PATH, help="Model file (default: RISK_PREFILTER_PATH)")
+    prefilter.add_argument("--threshold", type=float, help="Confidence threshold to report (default: RISK_PREFILTER_THRESHOLD)")
+    args = parser.parse_args(argv)
+
+    if args.command == "review":
+        if not os.path.isdir(args.directory):
+            parser.error(f"{args.directory} is not a directory")
+        try:
+            stats = review_directory(
+                args.directory,
+                args.output,
+                review_workers=args.workers,
+                pdf_workers=args.pdf_workers,
+                topology=args.topology,
+                recursive=not args.no_recursive,
+                progress_interval=args.progress_interval,
+            )
+        except KeyboardInterrupt:
+            return 130
+        print(json.dumps(stats), flush=True)
+        return 1 if stats["failed"] else 0
+    if args.command == "train-prefilter":
+        if not os.path.exists(args.store):
+            parser.error(f"{args.store} does not exist")
+        try:
+            report = train_prefilter(args.store, args.output, args.threshold)
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            return 1
+        print(json.dumps(report, indent=2), flush=True)
+        return 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,8 +16,150 @@ class Settings:
     # - "mixtral-8x7b-32768" (good balance)
     # - "gemma-7b-it" (fast, efficient)
     GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+    GROQ_API_BASE = os.getenv("GROQ_API_BASE", "https://api.groq.com")
+    # Model cascade: extraction and classification run on GROQ_MODEL; clauses whose answer scores
+    # below CASCADE_CONFIDENCE_THRESHOLD (0-1: parse failures, "not_found" despite a matching
+    # section, hedging, malformed verdicts) are re-run on CASCADE_LARGE_MODEL
+    MODEL_CASCADE_ENABLED = os.getenv("MODEL_CASCADE_ENABLED", "false").lower() == "true"
+    CASCADE_LARGE_MODEL = os.getenv("CASCADE_LARGE_MODEL", "llama-3.3-70b-versatile")
+    CASCADE_CONFIDENCE_THRESHOLD = float(os.getenv("CASCADE_CONFIDENCE_THRESHOLD", "0.6"))
+    # LLM provider: "groq", or "fake" for a deterministic local model (benchmarks, offline development)
+    LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")
+    FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.5"))
+    FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "0"))
+    FAKE_LLM_MALFORMED_RATE = float(os.getenv("FAKE_LLM_MALFORMED_RATE", "0"))
+    # Fraction of clauses the fake model answers wrongly (missed, hedged or misclassified), except on CASCADE_LARGE_MODEL
+    FAKE_LLM_NOISE = float(os.getenv("FAKE_LLM_NOISE", "0"))
+    # Simulated provider limits for the fake model: over budget, calls fail with a 429 (0 = unlimited)
+    FAKE_LLM_REQUESTS_PER_MINUTE = int(os.getenv("FAKE_LLM_REQUESTS_PER_MINUTE", "0"))
+    FAKE_LLM_TOKENS_PER_MINUTE = int(os.getenv("FAKE_LLM_TOKENS_PER_MINUTE", "0"))
+    # Request JSON-only output (response_format json_object) for extraction and classification;
+    # disable for models without JSON mode support
+    LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "true").lower() == "true"
+    # Shared HTTP connection pool for all LLM calls
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "50"))
+    LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "120"))
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+    # Time budget for a review from /review or the Gradio UI (0 = none); stages still running
+    # when it runs out are cancelled and the review comes back partial, with per-stage status
+    REVIEW_DEADLINE_SECONDS = float(os.getenv("REVIEW_DEADLINE_SECONDS", "180"))
+    # Open connections to Groq at startup so the first review skips the TLS handshake
+    LLM_WARMUP = os.getenv("LLM_WARMUP", "true").lower() == "true"
     # Port configuration (default: 7861)
     PORT = os.getenv("PORT", "7861")
+    # Gradio UI: reviews running at once per instance, and how many more may wait in the queue (0 = unbounded)
+    GRADIO_CONCURRENCY_LIMIT = int(os.getenv("GRADIO_CONCURRENCY_LIMIT", "8"))
+    GRADIO_MAX_QUEUE_SIZE = int(os.getenv("GRADIO_MAX_QUEUE_SIZE", "64"))
+    # Analyses kept per browser session, so re-analysing the same file is instant
+    GRADIO_SESSION_RESULTS = int(os.getenv("GRADIO_SESSION_RESULTS", "8"))
+    # Review cache: repeat uploads of the same contract skip the LLM calls
+    # Memory tier holds REVIEW_CACHE_SIZE entries; both tiers expire after REVIEW_CACHE_TTL seconds
+    # Set REVIEW_CACHE_PATH to an empty string to disable the on-disk (SQLite) tier
+    REVIEW_CACHE_ENABLED = os.getenv("REVIEW_CACHE_ENABLED", "true").lower() == "true"
+    REVIEW_CACHE_SIZE = int(os.getenv("REVIEW_CACHE_SIZE", "256"))
+    REVIEW_CACHE_TTL = int(os.getenv("REVIEW_CACHE_TTL", "86400"))
+    REVIEW_CACHE_PATH = os.getenv("REVIEW_CACHE_PATH", "data/review_cache.db")
+    # Single-flight: identical reviews (same cache key) in flight at once share one computation.
+    # Workers on the host coordinate through leases in SINGLE_FLIGHT_PATH (empty: this process only);
+    # a lease not released within SINGLE_FLIGHT_LEASE_TTL seconds is taken over by a waiting worker
+    SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+    SINGLE_FLIGHT_PATH = os.getenv("SINGLE_FLIGHT_PATH", "data/single_flight.db")
+    SINGLE_FLIGHT_LEASE_TTL = float(os.getenv("SINGLE_FLIGHT_LEASE_TTL", "300"))
+    SINGLE_FLIGHT_POLL_INTERVAL = float(os.getenv("SINGLE_FLIGHT_POLL_INTERVAL", "0.25"))
+    # Worker processes used to parse PDFs off the API event loop
+    PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+    # PDFs with at least PDF_PARALLEL_MIN_PAGES pages are extracted PDF_PAGE_BATCH pages at a time across the pool
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "32"))
+    PDF_PAGE_BATCH = int(os.getenv("PDF_PAGE_BATCH", "8"))
+    # Clean extracted text before review: running headers/footers, page numbers, words hyphenated
+    # across lines, extra whitespace and short header/footer blocks repeated at page edges are removed
+    TEXT_NORMALIZATION_ENABLED = os.getenv("TEXT_NORMALIZATION_ENABLED", "true").lower() == "true"
+    TEXT_NORMALIZATION_DEDUPE_BLOCKS = os.getenv("TEXT_NORMALIZATION_DEDUPE_BLOCKS", "true").lower() == "true"
+    # Also drop exhibits and schedules that follow the signature block
+    TEXT_NORMALIZATION_STRIP_EXHIBITS = os.getenv("TEXT_NORMALIZATION_STRIP_EXHIBITS", "false").lower() == "true"
+    # Uploads are streamed to disk in UPLOAD_CHUNK_SIZE byte chunks and rejected above MAX_UPLOAD_MB
+    MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "50"))
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+    UPLOAD_DIR = os.getenv("UPLOAD_DIR", "tmp")
+    # Long contracts are split into overlapping chunks for clause extraction
+    # Chunks are sent to the LLM in parallel, at most CLAUSE_CHUNK_CONCURRENCY at a time
+    CLAUSE_CHUNK_SIZE = int(os.getenv("CLAUSE_CHUNK_SIZE", "8000"))
+    CLAUSE_CHUNK_OVERLAP = int(os.getenv("CLAUSE_CHUNK_OVERLAP", "400"))
+    CLAUSE_CHUNK_CONCURRENCY = int(os.getenv("CLAUSE_CHUNK_CONCURRENCY", "4"))
+    # Groq budgets (defaults: free tier for llama-3.1-8b-instant; 0 = unlimited)
+    GROQ_REQUESTS_PER_MINUTE = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+    GROQ_TOKENS_PER_MINUTE = int(os.getenv("GROQ_TOKENS_PER_MINUTE", "6000"))
+    # Shared LLM rate limiter: every call waits for request and token budget, drawn from one
+    # SQLite file (LLM_RATE_LIMIT_PATH) by all workers on the host. Tokens are estimated from the
+    # prompt plus LLM_EXPECTED_COMPLETION_TOKENS and corrected from reported usage. Calls that
+    # would wait longer than LLM_RATE_LIMIT_MAX_WAIT seconds fail with HTTP 429 and Retry-After.
+    # When disabled, batch reviews fall back to pacing documents at GROQ_REQUESTS_PER_MINUTE, and
+    # LLM calls still share LLM_MAX_CONCURRENCY slots in fair-scheduling order.
+    LLM_RATE_LIMIT_ENABLED = os.getenv("LLM_RATE_LIMIT_ENABLED", "true").lower() == "true"
+    LLM_RATE_LIMIT_PATH = os.getenv("LLM_RATE_LIMIT_PATH", "data/llm_rate_limit.db")
+    LLM_EXPECTED_COMPLETION_TOKENS = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", "300"))
+    LLM_RATE_LIMIT_MAX_WAIT = float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT", "120"))
+    # Adaptive concurrency per worker: starts at LLM_MAX_CONCURRENCY, halves on a 429, shrinks
+    # when a call takes longer than LLM_LATENCY_TARGET seconds and grows back while calls are fast
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+    LLM_LATENCY_TARGET = float(os.getenv("LLM_LATENCY_TARGET", "30"))
+    # Call-level LLM response cache, below the review cache: responses are stored zlib-compressed in
+    # SQLite (LLM_CACHE_PATH, shared by all workers), keyed on the whitespace-normalized prompt, model,
+    # temperature and JSON mode; the least recently used are evicted past LLM_CACHE_MAX_ENTRIES and
+    # entries expire after LLM_CACHE_TTL seconds (0 = never)
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/llm_cache.db")
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+    LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "604800"))
+    # Fair scheduling of calls waiting for rate-limit budget or a concurrency slot: priority classes
+    # share both in proportion to these weights (interactive = Gradio UI, api = REST reviews, batch =
+    # batch jobs and the CLI), and tenants within a class share their class's turns equally
+    LLM_SCHEDULER_WEIGHTS = os.getenv("LLM_SCHEDULER_WEIGHTS", "interactive=8,api=2,batch=1")
+    # Retries after a 429: the provider's retry-after if given, else full-jitter exponential backoff
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+    LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1"))
+    LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+    # Batch review workers and limits
+    BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+    BATCH_MAX_DOCUMENTS = int(os.getenv("BATCH_MAX_DOCUMENTS", "500"))
+    BATCH_MAX_JOBS = int(os.getenv("BATCH_MAX_JOBS", "100"))
+    # Clause extraction mode: "full" sends the whole contract, "targeted" sends only the
+    # sections a local keyword/heading index ranks highest for each clause type
+    CLAUSE_EXTRACTION_MODE = os.getenv("CLAUSE_EXTRACTION_MODE", "full")
+    CLAUSE_TARGET_MAX_CHARS = int(os.getenv("CLAUSE_TARGET_MAX_CHARS", "6000"))
+    CLAUSE_TARGET_TOP_K = int(os.getenv("CLAUSE_TARGET_TOP_K", "2"))
+    # Review pipeline topology:
+    # - "sequential": extract clauses, then classify risks and draft revisions in parallel (two serial LLM round-trips)
+    # - "fused": one call returns clauses and risks; revisions are drafted from the local clause index at the same time
+    # - "speculative": revisions are drafted from the local clause index while extraction and classification run
+    PIPELINE_TOPOLOGY = os.getenv("PIPELINE_TOPOLOGY", "sequential")
+    # Versioned reviews (POST /contracts/{id}/versions): SQLite file holding each contract's
+    # versions and per-block extractions. Blocks end at content-chosen section boundaries
+    # (about every VERSION_BLOCK_SECTIONS sections once half of CLAUSE_CHUNK_SIZE is reached)
+    CONTRACT_VERSIONS_PATH = os.getenv("CONTRACT_VERSIONS_PATH", "data/contract_versions.db")
+    VERSION_BLOCK_SECTIONS = int(os.getenv("VERSION_BLOCK_SECTIONS", "4"))
+    # Review store: every completed review saved in SQLite (document hash, clause types,
+    # normalized risk levels, full-text index over clause summaries) for GET /reviews
+    REVIEW_STORE_ENABLED = os.getenv("REVIEW_STORE_ENABLED", "true").lower() == "true"
+    REVIEW_STORE_PATH = os.getenv("REVIEW_STORE_PATH", "data/reviews.db")
+    # Near-duplicate clause index: risk verdicts are reused for clauses whose estimated
+    # Jaccard similarity (word 3-grams, MinHash) to an already classified clause reaches the threshold;
+    # the oldest entries are evicted past CLAUSE_INDEX_MAX_ENTRIES (0 = unbounded)
+    CLAUSE_INDEX_ENABLED = os.getenv("CLAUSE_INDEX_ENABLED", "true").lower() == "true"
+    CLAUSE_INDEX_PATH = os.getenv("CLAUSE_INDEX_PATH", "data/clause_index.db")
+    CLAUSE_INDEX_THRESHOLD = float(os.getenv("CLAUSE_INDEX_THRESHOLD", "0.85"))
+    CLAUSE_INDEX_PERMUTATIONS = int(os.getenv("CLAUSE_INDEX_PERMUTATIONS", "128"))
+    CLAUSE_INDEX_BANDS = int(os.getenv("CLAUSE_INDEX_BANDS", "16"))
+    CLAUSE_INDEX_MAX_ENTRIES = int(os.getenv("CLAUSE_INDEX_MAX_ENTRIES", "300000"))
+    # Local risk prefilter: a TF-IDF + logistic regression model trained on stored LLM verdicts
+    # (python -m app.cli train-prefilter) answers clauses it is at least THRESHOLD sure of,
+    # for the levels listed in RISK_PREFILTER_LEVELS; the rest still go to the LLM
+    RISK_PREFILTER_ENABLED = os.getenv("RISK_PREFILTER_ENABLED", "false").lower() == "true"
+    RISK_PREFILTER_PATH = os.getenv("RISK_PREFILTER_PATH", "data/risk_prefilter.npz")
+    RISK_PREFILTER_THRESHOLD = float(os.getenv("RISK_PREFILTER_THRESHOLD", "0.95"))
+    RISK_PREFILTER_LEVELS = os.getenv("RISK_PREFILTER_LEVELS", "low")
 
 
 settings = Settings()
\ No newline at end of file
@@ -1,9 +1,15 @@
 import os
+import hashlib
 import json
+import threading
 import gradio as gr
-from app.services.pdf_loader import load_pdf
-from app.orchestrator import run_full_review
+from app.services.pdf_loader import load_contract
+from app.orchestrator import iter_full_review
 from app.config import settings
+from app.metrics import track_in_flight
+from app.services.deadline import new_deadline
+from app.services.llm_factory import warm_up
+from app.services.review_store import store_review
 
 
 def format_clause_value(value):
@@ -42,15 +48,120 @@ def format_clause_value(value):
     return f"<p style='margin: 0; color: #1a1a1a; line-height: 1.6;'>{str(value)}</p>"
 
 
-def analyze_contract(pdf_file, progress=gr.Progress()):
-    """Process uploaded PDF and return analysis results"""
+def _message_html(message, color="#666"):
+    return f"<p style='text-align: center; color: {color}; padding: 40px;'>{message}</p>"
+
+
+PENDING_HTML = _message_html("⏳ Analyzing...")
+
+
+def format_clauses(clauses_dict):
+    """Clauses tab HTML"""
+    if isinstance(clauses_dict, dict):
+        clauses_html = "<div style='max-height: 400px; overflow-y: auto;'>"
+        for key, value in clauses_dict.items():
+            if key != "error" and key != "raw_response":
+                formatted_value = format_clause_value(value)
+                clauses_html += f"""
+                <div style='margin-bottom: 15px; padding: 12px; background: #f8f9ff; border-radius: 8px; border-left: 4px solid #667eea;'>
+                    <h4 style='margin: 0 0 8px 0; color: #667eea; font-weight: 600;'>{key.replace('_', ' ').title()}</h4>
+                    <div style='color: #1a1a1a; line-height: 1.6; font-weight: 400;'>{formatted_value}</div>
+                </div>
+                """
+        clauses_html += "</div>"
+    else:
+        clauses_html = f"<p>{str(clauses_dict)}</p>"
+    return clauses_html
+
+
+def format_risks(risks_dict):
+    """Risk Analysis tab HTML"""
+    if isinstance(risks_dict, dict):
+        risks_html = "<div style='max-height: 400px; overflow-y: auto;'>"
+        for key, value in risks_dict.items():
+            if key != "error" and key != "raw_response":
+                # Determine risk level color
+                risk_str = str(value).lower()
+                if "high" in risk_str or "critical" in risk_str:
+                    risk_color = "#c62828"
+                    risk_bg = "#ffebee"
+                    risk_label = "🔴 HIGH RISK"
+                elif "medium" in risk_str or "moderate" in risk_str:
+                    risk_color = "#e65100"
+                    risk_bg = "#fff3e0"
+                    risk_label = "🟡 MEDIUM RISK"
+                elif "low" in risk_str:
+                    risk_color = "#2e7d32"
+                    risk_bg = "#e8f5e9"
+                    risk_label = "🟢 LOW RISK"
+                else:
+                    risk_color = "#666"
+                    risk_bg = "#f5f5f5"
+                    risk_label = "⚪ UNKNOWN"
+                
+                risks_html += f"""
+                <div style='margin-bottom: 15px; padding: 12px; background: {risk_bg}; border-radius: 8px; border-left: 4px solid {risk_color};'>
+                    <div style='display: flex; align-items: center; margin-bottom: 8px;'>
+                        <h4 style='margin: 0; color: {risk_color}; font-weight: 600;'>{key.replace('_', ' ').title()}</h4>
+                        <span style='margin-left: 10px; padding: 4px 10px; background: {risk_color}; color: white; border-radius: 12px; font-size: 0.75rem; font-weight: 600;'>{risk_label}</span>
+                    </div>
+                    <p style='margin: 0; color: #1a1a1a; line-height: 1.6; font-weight: 400;'>{str(value)}</p>
+                </div>
+                """
+        risks_html += "</div>"
+    else:
+        risks_html = f"<p>{str(risks_dict)}</p>"
+    return risks_html
+
+
+def format_suggestions(suggestions):
+    """Revision Suggestions tab HTML"""
+    return f"""
+    <div style='padding: 20px; background: #fff3cd; border-radius: 8px; border-left: 4px solid #ffc107; max-height: 400px; overflow-y: auto;'>
+        <h4 style='margin: 0 0 12px 0; color: #856404; font-weight: 600;'>💡 Revision Suggestions</h4>
+        <div style='color: #1a1a1a; line-height: 1.8; white-space: pre-wrap; font-weight: 400;'>{str(suggestions or "No suggestions available")}</div>
+    </div>
+    """
+
+
+FORMATTERS = {"clauses": format_clauses, "risks": format_risks, "suggestions": format_suggestions}
+STAGE_LABELS = {"clauses": "clauses", "risks": "risk analysis", "suggestions": "revision suggestions"}
+
+
+def _stage_status(done):
+    pending = [label for key, label in STAGE_LABELS.items() if key not in done]
+    ready = ", ".join(label for key, label in STAGE_LABELS.items() if key in done)
+    return f"{ready[0].upper()}{ready[1:]} ready - still working on {' and '.join(pending)}..."
+
+
+def file_digest(path):
+    """SHA-256 of a file's bytes - identifies a re-upload of the same contract within a session"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def analyze_contract(pdf_file, session_results=None, progress=gr.Progress(), request: gr.Request = None):
+    """
+    Process an uploaded PDF, filling each tab as soon as its stage finishes.
+
+    Yields (clauses_html, risks_html, suggestions_html, status, session_results).
+    ``session_results`` holds this session's last GRADIO_SESSION_RESULTS analyses by
+    file hash, so analysing the same file again skips the PDF parse and the review.
+    Its LLM calls are scheduled as interactive traffic, shared fairly between sessions.
+    """
+    session = request.session_hash if request is not None else None
+    with track_in_flight("gradio"):
+        yield from _analyze_contract(pdf_file, dict(session_results or {}), progress, session)
+
+
+def _analyze_contract(pdf_file, session_results, progress, session=None):
     if pdf_file is None:
-        return (
-            "<p style='text-align: center; color: #666; padding: 40px;'>⚠️ Please upload a PDF file</p>",
-            "<p style='text-align: center; color: #666; padding: 40px;'>⚠️ Please upload a PDF file</p>",
-            "<p style='text-align: center; color: #666; padding: 40px;'>⚠️ Please upload a PDF file</p>",
-            "⚠️ Please upload a PDF file"
-        )
+        message_html = _message_html("⚠️ Please upload a PDF file")
+        yield message_html, message_html, message_html, "⚠️ Please upload a PDF file", session_results
+        return
     
     try:
         progress(0.1, desc="Loading PDF...")
@@ -66,100 +177,74 @@ def analyze_contract(pdf_file, progress=gr.Progress()):
         # Verify file exists before attempting to load
         if not os.path.exists(file_path):
             raise ValueError(f"File not found: {file_path}. Please upload the file again.")
+
+        digest = file_digest(file_path)
+        if digest in session_results:
+            progress(1.0, desc="Loaded earlier analysis!")
+            yield (*session_results[digest], "✅ Analysis completed successfully! (reused from this session)", session_results)
+            return
         
         # Load PDF
-        text = load_pdf(file_path)
+        text, normalization = load_contract(file_path)
         if not text or not text.strip():
             error_msg = "⚠️ PDF appears to be empty or could not be read"
-            return (
-                f"<p style='text-align: center; color: #c62828; padding: 40px;'>{error_msg}</p>",
-                f"<p style='text-align: center; color: #c62828; padding: 40px;'>{error_msg}</p>",
-                f"<p style='text-align: center; color: #c62828; padding: 40px;'>{error_msg}</p>",
-                error_msg
-            )
+            error_html = _message_html(error_msg, "#c62828")
+            yield error_html, error_html, error_html, error_msg, session_results
+            return
         
-        # Truncate very long content to speed up processing (keep first 8000 chars)
-        if len(text) > 8000:
-            text = text[:8000] + "\n\n[Content truncated for faster processing...]"
-            progress(0.15, desc="Content optimized for processing...")
+        # Long contracts are extracted chunk by chunk in parallel (see CLAUSE_CHUNK_SIZE)
+        if len(text) > settings.CLAUSE_CHUNK_SIZE:
+            progress(0.15, desc="Long contract - extracting clauses in parallel chunks...")
         
         progress(0.2, desc="Extracting clauses from contract...")
-        # Run full review with progress updates
-        result = run_full_review(text, progress=progress)
-        
-        # Format clauses
-        clauses_dict = result.get("clauses", {})
-        if isinstance(clauses_dict, dict):
-            clauses_html = "<div style='max-height: 400px; overflow-y: auto;'>"
-            for key, value in clauses_dict.items():
-                if key != "error" and key != "raw_response":
-                    formatted_value = format_clause_value(value)
-                    clauses_html += f"""
-                    <div style='margin-bottom: 15px; padding: 12px; background: #f8f9ff; border-radius: 8px; border-left: 4px solid #667eea;'>
-                        <h4 style='margin: 0 0 8px 0; color: #667eea; font-weight: 600;'>{key.replace('_', ' ').title()}</h4>
-                        <div style='color: #1a1a1a; line-height: 1.6; font-weight: 400;'>{formatted_value}</div>
-                    </div>
-                    """
-            clauses_html += "</div>"
-        else:
-            clauses_html = f"<p>{str(clauses_dict)}</p>"
-        
-        # Format risks
-        risks_dict = result.get("risks", {})
-        if isinstance(risks_dict, dict):
-            risks_html = "<div style='max-height: 400px; overflow-y: auto;'>"
-            for key, value in risks_dict.items():
-                if key != "error" and key != "raw_response":
-                    # Determine risk level color
-                    risk_str = str(value).lower()
-                    if "high" in risk_str or "critical" in risk_str:
-                        risk_color = "#c62828"
-                        risk_bg = "#ffebee"
-                        risk_label = "🔴 HIGH RISK"
-                    elif "medium" in risk_str or "moderate" in risk_str:
-                        risk_color = "#e65100"
-                        risk_bg = "#fff3e0"
-                        risk_label = "🟡 MEDIUM RISK"
-                    elif "low" in risk_str:
-                        risk_color = "#2e7d32"
-                        risk_bg = "#e8f5e9"
-                        risk_label = "🟢 LOW RISK"
-                    else:
-                        risk_color = "#666"
-                        risk_bg = "#f5f5f5"
-                        risk_label = "⚪ UNKNOWN"
-                    
-                    risks_html += f"""
-                    <div style='margin-bottom: 15px; padding: 12px; background: {risk_bg}; border-radius: 8px; border-left: 4px solid {risk_color};'>
-                        <div style='display: flex; align-items: center; margin-bottom: 8px;'>
-                            <h4 style='margin: 0; color: {risk_color}; font-weight: 600;'>{key.replace('_', ' ').title()}</h4>
-                            <span style='margin-left: 10px; padding: 4px 10px; background: {risk_color}; color: white; border-radius: 12px; font-size: 0.75rem; font-weight: 600;'>{risk_label}</span>
-                        </div>
-                        <p style='margin: 0; color: #1a1a1a; line-height: 1.6; font-weight: 400;'>{str(value)}</p>
-                    </div>
-                    """
-            risks_html += "</div>"
-        else:
-            risks_html = f"<p>{str(risks_dict)}</p>"
-        
-        # Format suggestions
-        suggestions = result.get("suggestions", "No suggestions available")
-        suggestions_html = f"""
-        <div style='padding: 20px; background: #fff3cd; border-radius: 8px; border-left: 4px solid #ffc107; max-height: 400px; overflow-y: auto;'>
-            <h4 style='margin: 0 0 12px 0; color: #856404; font-weight: 600;'>💡 Revision Suggestions</h4>
-            <div style='color: #1a1a1a; line-height: 1.8; white-space: pre-wrap; font-weight: 400;'>{str(suggestions)}</div>
-        </div>
-        """
+        # Each tab is filled as soon as its stage finishes
+        outputs = {key: PENDING_HTML for key in FORMATTERS}
+        yield outputs["clauses"], outputs["risks"], outputs["suggestions"], "Analyzing contract...", session_results
+        done = set()
+        # Closing the tab stops this generator, which cancels the review's remaining LLM calls
+        for event, data in iter_full_review(
+            text, progress=progress, deadline=new_deadline(), caller=("interactive", session)
+        ):
+            if event == "done":
+                result = data
+                store_review(text, data, os.path.basename(file_path), "gradio")
+                break
+            outputs[event] = FORMATTERS[event](data)
+            done.add(event)
+            if len(done) < len(FORMATTERS):
+                yield outputs["clauses"], outputs["risks"], outputs["suggestions"], _stage_status(done), session_results
         
         # Note: Don't delete the file - Gradio manages temporary files automatically
         # Deleting it causes issues when analyzing the same file multiple times
-        
-        return clauses_html, risks_html, suggestions_html, "✅ Analysis completed successfully!"
+
+        if result.get("partial"):
+            unfinished = [key for key, status in result["stages"].items() if status != "completed"]
+            for key in unfinished:
+                outputs[key] = _message_html(f"⏱️ The {STAGE_LABELS[key]} didn't finish in time", "#e65100")
+            labels = [STAGE_LABELS[key] for key in unfinished]
+            missing = " and ".join([", ".join(labels[:-1]), labels[-1]] if len(labels) > 1 else labels)
+            status = (
+                f"⚠️ Partial analysis: {missing} "
+                f"did not finish within {settings.REVIEW_DEADLINE_SECONDS:g}s - try again later"
+            )
+            # Not kept for the session, so analysing the file again runs the missing stages
+            yield outputs["clauses"], outputs["risks"], outputs["suggestions"], status, session_results
+            return
+
+        html = (outputs["clauses"], outputs["risks"], outputs["suggestions"])
+        session_results[digest] = html
+        while len(session_results) > settings.GRADIO_SESSION_RESULTS:
+            # Dicts keep insertion order - drop the oldest analysis
+            del session_results[next(iter(session_results))]
+        status = "✅ Analysis completed successfully!"
+        if normalization and normalization["tokens_saved"] > 0:
+            status += f" (~{normalization['tokens_saved']:,} tokens of headers, page numbers and boilerplate skipped)"
+        yield (*html, status, session_results)
     
     except Exception as e:
         error_msg = f"❌ Error: {str(e)}"
-        error_html = f"<p style='text-align: center; color: #c62828; padding: 40px;'>{error_msg}</p>"
-        return error_html, error_html, error_html, error_msg
+        error_html = _message_html(error_msg, "#c62828")
+        yield error_html, error_html, error_html, error_msg, session_results
 
 
 # Create Gradio interface
@@ -220,6 +305,8 @@ with gr.Blocks(
                 interactive=False,
                 value="Ready to analyze..."
             )
+            # This session's analyses by file hash (see analyze_contract)
+            session_results = gr.State({})
         
         with gr.Column(scale=2):
             with gr.Tabs():
@@ -244,8 +331,8 @@ with gr.Blocks(
     # Connect the function to the button
     analyze_btn.click(
         fn=analyze_contract,
-        inputs=[pdf_input],
-        outputs=[clauses_output, risks_output, suggestions_output, status]
+        inputs=[pdf_input, session_results],
+        outputs=[clauses_output, risks_output, suggestions_output, status, session_results]
     )
     
     # Also allow Enter key or file upload to trigger analysis
@@ -255,6 +342,12 @@ with gr.Blocks(
         outputs=[status]
     )
 
+# Reviews beyond GRADIO_CONCURRENCY_LIMIT wait in a queue of up to GRADIO_MAX_QUEUE_SIZE
+demo.queue(
+    default_concurrency_limit=settings.GRADIO_CONCURRENCY_LIMIT,
+    max_size=settings.GRADIO_MAX_QUEUE_SIZE or None,
+)
+
 
 if __name__ == "__main__":
     # Get port from config (which loads from .env or uses default 7861)
@@ -273,5 +366,7 @@ if __name__ == "__main__":
         print(f"🚀 Starting Gradio UI on http://{server_name}:{port} (Local development mode)")
         print(f"   Using port from config/.env: {port}")
     
+    if settings.LLM_WARMUP:
+        threading.Thread(target=warm_up, daemon=True).start()
     demo.launch(server_name=server_name, server_port=port, share=False)
 
@@ -1,11 +1,50 @@
+import asyncio
+import json
+import math
 import os
-from fastapi import FastAPI, UploadFile, HTTPException
-from app.services.pdf_loader import load_pdf
-from app.orchestrator import run_full_review
-from app.models.agent_models import ReviewResponse
+from typing import Optional
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Path, Query, Request, UploadFile, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from app import batch_jobs
+from app.config import settings
+from app.metrics import render_metrics, track_in_flight
+from app.services.llm_factory import aclose_clients, awarm_up
+from app.services.pdf_loader import aload_contract, shutdown_pool
+from app.orchestrator import arun_full_review, arun_versioned_review, astream_full_review
+from app.models.agent_models import (
+    BatchSubmitResponse,
+    ReviewQueryResponse,
+    ReviewResponse,
+    StoredReview,
+    VersionedReviewResponse,
+)
+from app.services.contract_versions import contract_versions
+from app.services.deadline import new_deadline
+from app.services.llm_cache import get_llm_cache
+from app.services.llm_scheduler import llm_caller, tenant_id
+from app.services.clause_index import clause_index
+from app.services.rate_limiter import LLMRateLimitError, get_rate_limiter
+from app.services.review_cache import review_cache
+from app.services.review_store import review_store, store_review
+from app.services.risk_prefilter import prefilter_stats
+from app.services.single_flight import single_flight
+from app.services.uploads import UploadTooLargeError, extract_pdfs_from_zip, save_upload
 
 
-app = FastAPI(title="Contract Review + Risk Analysis Agent")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the shared Groq connection pool in the background; startup doesn't wait on the network
+    warmup = asyncio.create_task(awarm_up()) if settings.LLM_WARMUP else None
+    yield
+    if warmup:
+        warmup.cancel()
+    batch_jobs.shutdown_executor()
+    shutdown_pool()
+    await aclose_clients()
+
+
+app = FastAPI(title="Contract Review + Risk Analysis Agent", lifespan=lifespan)
 
 
 @app.get("/")
@@ -22,58 +61,398 @@ def health():
     return {"status": "running"}
 
 
-@app.post("/review", response_model=ReviewResponse)
-async def review_contract(file: UploadFile):
+@app.get("/metrics")
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    return review_cache.stats()
+
+
+@app.get("/llm-cache/stats")
+def llm_cache_stats():
+    cache = get_llm_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
+@app.get("/clause-index/stats")
+def clause_index_stats():
+    return clause_index.stats()
+
+
+@app.get("/risk-prefilter/stats")
+def risk_prefilter_stats():
+    return prefilter_stats()
+
+
+@app.get("/rate-limit/stats")
+def rate_limit_stats():
+    return get_rate_limiter().stats()
+
+
+@app.get("/scheduler/stats")
+def scheduler_stats():
+    """LLM calls waiting for rate-limit budget and for a concurrency slot, per priority class and tenant"""
+    limiter = get_rate_limiter()
+    return {
+        "enabled": limiter.enabled,
+        **limiter.concurrency.scheduler_snapshot(),
+        "budget": limiter.budget.scheduler_snapshot(),
+    }
+
+
+@app.get("/single-flight/stats")
+def single_flight_stats():
+    return single_flight.stats()
+
+
+def _tenant(request: Request):
+    # API callers share LLM slots per API key, else per client address
+    return tenant_id(request.headers.get("x-api-key"), request.client.host if request.client else None)
+
+
+def _rate_limited(e: LLMRateLimitError):
+    # Tell clients when to come back instead of inviting an immediate resubmit
+    retry_after = max(1, math.ceil(e.retry_after or settings.LLM_BACKOFF_MAX))
+    return HTTPException(
+        status_code=429,
+        detail=f"LLM provider is rate limiting requests; retry after {retry_after}s",
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+def _report_normalization(result, normalization):
+    """Add the text normalization stats to a review's ``pipeline`` report"""
+    if normalization is not None and isinstance(result.get("pipeline"), dict):
+        result["pipeline"]["normalization"] = normalization
+    return result
+
+
+async def _load_contract_text(file: UploadFile):
+    """
+    Validate an uploaded PDF, stream it to disk, extract and normalize its text and clean up.
+
+    Returns (text, normalization stats or None).
+    """
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file provided")
     
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="File must be a PDF")
     
-    path = f"tmp/{file.filename}"
+    path = None
 
     try:
-        os.makedirs("tmp", exist_ok=True)
-
-        # Save uploaded file
-        with open(path, "wb") as f:
-            content = await file.read()
-            if not content:
-                raise HTTPException(status_code=400, detail="Uploaded file is empty")
-            f.write(content)
+        # Stream the upload to a uniquely named temp file
+        try:
+            path = await save_upload(file)
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
         # Load PDF
         try:
-            text = load_pdf(path)
+            text, normalization = await aload_contract(path)
             if not text or not text.strip():
                 raise HTTPException(status_code=400, detail="PDF appears to be empty or could not be read")
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Error loading PDF: {str(e)}")
+        return text, normalization
 
-        # Run review
-        try:
-            result = run_full_review(text)
-            
-            # Ensure result matches expected format
-            if not isinstance(result.get("clauses"), dict):
-                result["clauses"] = {"error": "Invalid clauses format", "raw": str(result.get("clauses"))}
-            if not isinstance(result.get("risks"), dict):
-                result["risks"] = {"error": "Invalid risks format", "raw": str(result.get("risks"))}
-            if not isinstance(result.get("suggestions"), str):
-                result["suggestions"] = str(result.get("suggestions", "No suggestions available"))
-            
-            return result
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error during contract review: {str(e)}")
-    
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
     finally:
         # Clean up uploaded file
+        try:
+            if path and os.path.exists(path):
+                os.remove(path)
+        except Exception:
+            pass
+
+
+# How often a running review checks whether its client is still connected
+DISCONNECT_POLL_INTERVAL = 0.5
+
+
+async def _until_disconnected(request: Request, coro, deadline):
+    """
+    Await ``coro``, cancelling it and its in-flight LLM calls if the client disconnects first.
+
+    Raises:
+        HTTPException: 499 if the client went away (nobody reads it; it ends the request)
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                deadline.cancel("disconnected")
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        task.cancel()
+
+
+@app.post("/review", response_model=ReviewResponse)
+async def review_contract(
+    request: Request,
+    file: UploadFile,
+    timeout: Optional[float] = Query(
+        None, gt=0, description="Seconds to spend on the review (capped at REVIEW_DEADLINE_SECONDS)"
+    ),
+):
+    """
+    Review a contract.
+
+    Stages still running when the deadline passes are cancelled and the review comes
+    back partial (``partial: true``, per-stage ``stages``) instead of failing.
+    """
+    with track_in_flight("/review"):
+        return await _review_contract(request, file, timeout)
+
+
+async def _review_contract(request: Request, file: UploadFile, timeout=None):
+    # The deadline starts before parsing, so it bounds the request as the client sees it
+    deadline = new_deadline(timeout)
+    text, normalization = await _load_contract_text(file)
+
+    # Run review
+    try:
+        with llm_caller("api", _tenant(request)):
+            result = await _until_disconnected(request, arun_full_review(text, deadline=deadline), deadline)
+        
+        # Ensure result matches expected format (stages that didn't finish stay null)
+        stages = result.get("stages") or {}
+        if stages.get("clauses", "completed") == "completed" and not isinstance(result.get("clauses"), dict):
+            result["clauses"] = {"error": "Invalid clauses format", "raw": str(result.get("clauses"))}
+        if stages.get("risks", "completed") == "completed" and not isinstance(result.get("risks"), dict):
+            result["risks"] = {"error": "Invalid risks format", "raw": str(result.get("risks"))}
+        if stages.get("suggestions", "completed") == "completed" and not isinstance(result.get("suggestions"), str):
+            result["suggestions"] = str(result.get("suggestions", "No suggestions available"))
+
+        _report_normalization(result, normalization)
+        await asyncio.to_thread(store_review, text, result, file.filename, "api")
+        return result
+    except LLMRateLimitError as e:
+        raise _rate_limited(e)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error during contract review: {str(e)}")
+
+
+# Contract ids are caller-chosen (e.g. a matter or document number)
+CONTRACT_ID = Path(pattern=r"^[A-Za-z0-9._-]{1,128}$")
+
+
+@app.post("/contracts/{contract_id}/versions", response_model=VersionedReviewResponse)
+async def review_contract_version(request: Request, file: UploadFile, contract_id: str = CONTRACT_ID):
+    """
+    Review a new version of a contract.
+
+    Only sections that changed since the previous version are sent to the LLM;
+    the response lists the clauses whose risk level moved.
+    """
+    text, normalization = await _load_contract_text(file)
+    with track_in_flight("/contracts/versions"):
+        try:
+            with llm_caller("api", _tenant(request)):
+                result = await arun_versioned_review(contract_id, text)
+        except LLMRateLimitError as e:
+            raise _rate_limited(e)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error during contract review: {str(e)}")
+    _report_normalization(result, normalization)
+    await asyncio.to_thread(store_review, text, result, file.filename, "versions")
+    return result
+
+
+@app.get("/contracts/{contract_id}/versions")
+def list_contract_versions(contract_id: str = CONTRACT_ID):
+    versions = contract_versions.list_versions(contract_id)
+    if not versions:
+        raise HTTPException(status_code=404, detail="Contract not found")
+    return {"contract_id": contract_id, "versions": versions}
+
+
+@app.post("/review/stream")
+async def review_contract_stream(
+    request: Request,
+    file: UploadFile,
+    timeout: Optional[float] = Query(
+        None, gt=0, description="Seconds to spend on the review (capped at REVIEW_DEADLINE_SECONDS)"
+    ),
+):
+    """
+    Server-sent events for a contract review.
+
+    Events: ``clauses`` and ``risks`` as each stage finishes, ``suggestion_token``
+    for every streamed chunk of the revision suggestions, ``suggestions`` with the
+    full text, then ``done`` with the complete ReviewResponse (or ``error``). As with
+    /review, stages still running at the deadline are cancelled and ``done`` is partial.
+    """
+    # The deadline starts before parsing, so it bounds the request as the client sees it
+    deadline = new_deadline(timeout)
+    text, normalization = await _load_contract_text(file)
+    tenant = _tenant(request)
+
+    async def events():
+        with track_in_flight("/review/stream"), llm_caller("api", tenant):
+            try:
+                async for event, data in astream_full_review(text, deadline=deadline):
+                    if event == "done":
+                        _report_normalization(data, normalization)
+                        await asyncio.to_thread(store_review, text, data, file.filename, "stream")
+                    yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+            except LLMRateLimitError as e:
+                error = _rate_limited(e)
+                detail = {"detail": error.detail, "retry_after": int(error.headers["Retry-After"])}
+                yield f"event: error\ndata: {json.dumps(detail)}\n\n"
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps({'detail': f'Error during contract review: {str(e)}'})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _remove_files(paths):
+    for path in paths:
         try:
             if os.path.exists(path):
                 os.remove(path)
         except Exception:
-            pass
\ No newline at end of file
+            pass
+
+
+def _remove_extracted(extraction):
+    if not extraction.cancelled() and extraction.exception() is None:
+        _remove_files(path for _, path in extraction.result())
+
+
+@app.post("/review/batch", response_model=BatchSubmitResponse, status_code=202)
+async def review_batch(request: Request, files: list[UploadFile]):
+    """
+    Queue many contracts for background review.
+
+    Accepts any mix of PDFs and zip archives of PDFs. Poll GET /jobs/{job_id}
+    or follow GET /jobs/{job_id}/stream for results as each document completes.
+    """
+    documents = []
+    try:
+        for file in files:
+            name = file.filename or ""
+            if name.lower().endswith(".zip"):
+                archive = await save_upload(file, suffix=".zip")
+                # Decompressing a large archive takes a while; keep it off the event loop
+                extraction = asyncio.ensure_future(asyncio.to_thread(extract_pdfs_from_zip, archive))
+                try:
+                    documents.extend(await asyncio.shield(extraction))
+                except asyncio.CancelledError:
+                    # The thread runs on after the client goes away; remove what it extracts
+                    extraction.add_done_callback(_remove_extracted)
+                    raise
+                finally:
+                    _remove_files([archive])
+            elif name.lower().endswith(".pdf"):
+                documents.append((name, await save_upload(file)))
+            else:
+                raise HTTPException(status_code=400, detail=f"{name or 'File'} must be a PDF or a zip of PDFs")
+
+            if len(documents) > settings.BATCH_MAX_DOCUMENTS:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"A batch may contain at most {settings.BATCH_MAX_DOCUMENTS} documents",
+                )
+    except UploadTooLargeError as e:
+        _remove_files(path for _, path in documents)
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        _remove_files(path for _, path in documents)
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        _remove_files(path for _, path in documents)
+        raise
+
+    if not documents:
+        raise HTTPException(status_code=400, detail="No PDF files provided")
+
+    job_id = batch_jobs.submit_batch(documents, tenant=_tenant(request))
+    return {"job_id": job_id, "documents": len(documents)}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = batch_jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.snapshot()
+
+
+@app.get("/jobs/{job_id}/stream")
+def stream_job(job_id: str):
+    """Newline-delimited JSON, one record per document as it completes"""
+    job = batch_jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    def records():
+        for doc in batch_jobs.iter_job_results(job):
+            yield json.dumps(doc) + "\n"
+
+    return StreamingResponse(records(), media_type="application/x-ndjson")
+
+
+@app.get("/reviews", response_model=ReviewQueryResponse)
+def query_reviews(
+    clause_type: Optional[str] = None,
+    risk_level: Optional[str] = Query(None, pattern="^(?i:high|medium|low)$"),
+    q: Optional[str] = Query(None, max_length=500),
+    document_hash: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+):
+    """
+    Search stored reviews without calling the LLM, most recently reviewed first.
+
+    ``clause_type`` and ``risk_level`` apply to the same clause (e.g. liability + high);
+    ``q`` is a full-text search over clause summaries and risk verdicts (``word*`` for a prefix).
+    """
+    try:
+        return review_store.query(
+            clause_type=clause_type,
+            risk_level=risk_level.lower() if risk_level else None,
+            q=q,
+            document_hash=document_hash,
+            since=since,
+            until=until,
+            limit=limit,
+            offset=offset,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/reviews/summary")
+def review_summary():
+    """Stored reviews and the number of clauses at each risk level, per clause type"""
+    return review_store.summary()
+
+
+@app.get("/reviews/{review_id}", response_model=StoredReview)
+def get_review(review_id: int):
+    review = review_store.get(review_id)
+    if review is None:
+        raise HTTPException(status_code=404, detail="Review not found")
+    return review
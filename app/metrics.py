@@ -0,0 +1,191 @@
+"""Prometheus metrics for the review pipeline"""
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+
+
+# LLM calls take seconds; PDF parsing and JSON parsing take milliseconds
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+
+STAGE_LATENCY = Histogram(
+    "contract_review_stage_seconds",
+    "Latency of each pipeline stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+LLM_CALL_LATENCY = Histogram(
+    "contract_review_llm_call_seconds",
+    "Latency of individual LLM calls",
+    ["service", "model"],
+    buckets=STAGE_BUCKETS,
+)
+LLM_CALLS = Counter(
+    "contract_review_llm_calls_total",
+    "LLM calls by outcome",
+    ["service", "model", "outcome"],
+)
+LLM_TOKENS = Counter(
+    "contract_review_llm_tokens_total",
+    "LLM tokens by kind (prompt/completion); estimated from characters when the provider reports no usage",
+    ["service", "model", "kind"],
+)
+JSON_PARSE_FALLBACKS = Counter(
+    "contract_review_json_parse_fallbacks_total",
+    "LLM responses that could not be parsed as JSON",
+    ["service"],
+)
+JSON_REPAIRS = Counter(
+    "contract_review_json_repairs_total",
+    "LLM responses that were only usable after local repair (repaired syntax / partial object)",
+    ["service", "kind"],
+)
+CLAUSE_INDEX_LOOKUPS = Counter(
+    "contract_review_clause_index_lookups_total",
+    "Clause risk lookups in the near-duplicate index by outcome (exact/near/miss)",
+    ["outcome"],
+)
+REVIEWS_COALESCED = Counter(
+    "contract_review_reviews_coalesced_total",
+    "Reviews served by waiting on an identical review already in flight (local: same worker, remote: another worker)",
+    ["scope"],
+)
+CASCADE_ESCALATIONS = Counter(
+    "contract_review_cascade_escalations_total",
+    "Clauses re-run on the large model because the small model's answer scored low confidence",
+    ["service", "clause"],
+)
+TEXT_NORMALIZATION_SAVED = Counter(
+    "contract_review_text_normalization_saved_total",
+    "Characters and estimated tokens removed from extracted PDF text before review",
+    ["unit"],
+)
+REVIEWS_CUT_SHORT = Counter(
+    "contract_review_reviews_cut_short_total",
+    "Reviews whose remaining LLM calls were cancelled: deadline exceeded or client disconnected",
+    ["reason"],
+)
+RISK_PREFILTER_DECISIONS = Counter(
+    "contract_review_risk_prefilter_decisions_total",
+    "Clauses answered by the local risk prefilter or deferred to the LLM",
+    ["outcome"],
+)
+LLM_CACHE_LOOKUPS = Counter(
+    "contract_review_llm_cache_lookups_total",
+    "LLM calls looked up in the call-level response cache",
+    ["service", "outcome"],
+)
+LLM_THROTTLED = Counter(
+    "contract_review_llm_throttled_total",
+    "LLM calls rejected by the provider with HTTP 429",
+    ["service"],
+)
+LLM_RETRIES = Counter(
+    "contract_review_llm_retries_total",
+    "LLM calls retried after a 429",
+    ["service"],
+)
+LLM_RATE_LIMIT_WAIT = Histogram(
+    "contract_review_llm_rate_limit_wait_seconds",
+    "Time LLM calls waited for a concurrency slot and request/token budget",
+    ["service"],
+    buckets=STAGE_BUCKETS,
+)
+LLM_QUEUE_WAIT = Histogram(
+    "contract_review_llm_queue_wait_seconds",
+    "Time LLM calls waited in the fair scheduler (queue: budget for rate-limit budget, slot for a concurrency slot)",
+    ["queue", "priority"],
+    buckets=STAGE_BUCKETS,
+)
+IN_FLIGHT_REQUESTS = Gauge(
+    "contract_review_in_flight_requests",
+    "Reviews currently being processed",
+    ["endpoint"],
+    multiprocess_mode="livesum",
+)
+IN_FLIGHT_LLM_CALLS = Gauge(
+    "contract_review_in_flight_llm_calls",
+    "LLM calls currently awaiting a response",
+    ["service"],
+    multiprocess_mode="livesum",
+)
+LLM_QUEUE_DEPTH = Gauge(
+    "contract_review_llm_queue_depth",
+    "LLM calls waiting in the fair scheduler (queue: budget or slot)",
+    ["queue", "priority"],
+    multiprocess_mode="livesum",
+)
+
+LLM_CONCURRENCY_LIMIT = Gauge(
+    "contract_review_llm_concurrency_limit",
+    "Adaptive limit on LLM calls in flight (summed over workers)",
+    multiprocess_mode="livesum",
+)
+
+# Rough characters-per-token ratio, used when the provider doesn't report usage
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str):
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+
+@contextmanager
+def observe_stage(stage: str):
+    """Time a pipeline stage into contract_review_stage_seconds"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(stage).observe(time.perf_counter() - started)
+
+
+@contextmanager
+def track_in_flight(endpoint: str):
+    """Count a request as in flight for the duration of the block"""
+    gauge = IN_FLIGHT_REQUESTS.labels(endpoint)
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+def record_llm_usage(service: str, model: str, prompt: str, completion: str, usage=None):
+    """
+    Add token counts for one LLM call.
+
+    Args:
+        usage: Provider-reported usage (``usage_metadata`` dict with input_tokens/output_tokens);
+            token counts are estimated from text length when missing
+    """
+    usage = usage or {}
+    prompt_tokens = usage.get("input_tokens") or estimate_tokens(prompt)
+    completion_tokens = usage.get("output_tokens") or estimate_tokens(completion)
+    LLM_TOKENS.labels(service, model, "prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(service, model, "completion").inc(completion_tokens)
+    return prompt_tokens, completion_tokens
+
+
+def render_metrics():
+    """
+    Return (body, content_type) for the /metrics endpoint.
+
+    With PROMETHEUS_MULTIPROC_DIR set (multiple uvicorn workers), metrics from
+    every worker process are aggregated.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
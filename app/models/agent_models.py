@@ -1,7 +1,113 @@
-from pydantic import BaseModel
+from typing import Optional, Union
+from pydantic import BaseModel, ConfigDict, field_validator, model_serializer
+
+# A clause summary; some models answer with structured detail instead of a sentence
+ClauseValue = Union[str, dict, list]
+
+
+class ClauseSet(BaseModel):
+    """The five extracted clause types ("not_found" when the contract has none)"""
+    # Extra keys (e.g. "error" and "raw_response" on a failed parse) are kept
+    model_config = ConfigDict(extra="allow")
+
+    termination: ClauseValue = "not_found"
+    confidentiality: ClauseValue = "not_found"
+    payment_terms: ClauseValue = "not_found"
+    liability: ClauseValue = "not_found"
+    governing_law: ClauseValue = "not_found"
+
+    @field_validator("*", mode="before")
+    @classmethod
+    def _coerce(cls, value):
+        if value is None:
+            return "not_found"
+        return value if isinstance(value, (str, dict, list)) else str(value)
+
+
+class RiskMap(BaseModel):
+    """Risk verdict ("High Risk: reason") per clause type; unclassified clause types are omitted"""
+    model_config = ConfigDict(extra="allow")
+
+    termination: Optional[ClauseValue] = None
+    confidentiality: Optional[ClauseValue] = None
+    payment_terms: Optional[ClauseValue] = None
+    liability: Optional[ClauseValue] = None
+    governing_law: Optional[ClauseValue] = None
+
+    @field_validator("*", mode="before")
+    @classmethod
+    def _coerce(cls, value):
+        return value if value is None or isinstance(value, (str, dict, list)) else str(value)
+
+    @model_serializer(mode="wrap")
+    def _omit_unclassified(self, handler):
+        return {key: value for key, value in handler(self).items() if value is not None}
 
 
 class ReviewResponse(BaseModel):
-    clauses: dict
-    risks: dict
-    suggestions: str
\ No newline at end of file
+    # Null for a stage that didn't complete (see ``stages``)
+    clauses: Optional[ClauseSet] = None
+    risks: Optional[RiskMap] = None
+    suggestions: Optional[str] = None
+    # Topology, wall-clock seconds, LLM calls and tokens spent on this review
+    pipeline: Optional[dict] = None
+    # Status of each stage: "completed", "timed_out" (cut off by the review deadline) or
+    # "skipped" (its input timed out); unfinished stages come back null
+    stages: Optional[dict[str, str]] = None
+    # True when a stage didn't complete before the deadline
+    partial: bool = False
+
+
+class VersionedReviewResponse(ReviewResponse):
+    contract_id: str
+    version: int
+    previous_version: Optional[int] = None
+    # Clause types re-classified because their extracted text changed
+    changed_clauses: list[str]
+    # Clause type -> {"previous": level, "current": level} where the risk level moved
+    risk_changes: dict
+    # Section and block counts: total vs. changed / re-extracted
+    diff: dict
+
+
+class BatchSubmitResponse(BaseModel):
+    job_id: str
+    documents: int
+
+
+class StoredReview(ReviewResponse):
+    id: int
+    # SHA-256 of the normalized contract text; re-uploads of the same text share a row
+    document_hash: str
+    filename: Optional[str] = None
+    # Where the review ran: "api", "stream", "versions", "batch" or "gradio"
+    source: Optional[str] = None
+    created_at: float
+    updated_at: float
+
+
+class ReviewMatch(BaseModel):
+    clause_type: str
+    risk_level: Optional[str] = None
+    summary: str
+    verdict: str
+
+
+class ReviewSummary(BaseModel):
+    id: int
+    document_hash: str
+    filename: Optional[str] = None
+    source: Optional[str] = None
+    created_at: float
+    updated_at: float
+    # Clause type -> "high" / "medium" / "low" (None when unclassified)
+    risk_levels: dict[str, Optional[str]]
+    # Clauses that matched the query's clause filters
+    matches: list[ReviewMatch]
+
+
+class ReviewQueryResponse(BaseModel):
+    total: int
+    limit: int
+    offset: int
+    reviews: list[ReviewSummary]
@@ -1,41 +1,773 @@
+import asyncio
+import contextvars
+import copy
 import json
+import queue
+import threading
+import time
 from concurrent.futures import ThreadPoolExecutor
-from app.services.clause_extractor import extract_clauses
-from app.services.risk_classifier import classify_risks
-from app.services.revision_agent import suggest_revisions
+from app.config import settings
+from app.metrics import observe_stage
+from app.services import clause_extractor, fused_reviewer, risk_classifier, revision_agent
+from app.services.clause_extractor import aextract_clauses, extract_clauses, merge_clause_results
+from app.services.contract_versions import build_blocks, contract_versions
+from app.services.deadline import Deadline, PartialReview, ReviewCancelled, deadline_scope
+from app.services.fused_reviewer import aextract_and_classify, extract_and_classify
+from app.services.llm_scheduler import current_caller, llm_caller
+from app.services.llm_factory import new_usage, track_llm_usage
+from app.services.risk_classifier import aclassify_risks, classify_risks, normalize_risk_level
+from app.services.revision_agent import astream_revisions, asuggest_revisions, suggest_revisions
+from app.services.model_cascade import cascade_fingerprint
+from app.services.review_cache import make_cache_key, review_cache
+from app.services.risk_prefilter import prefilter_fingerprint
+from app.services.section_index import select_clause_spans
+from app.services.single_flight import single_flight
 
+TOPOLOGIES = ("sequential", "fused", "speculative")
+STAGES = ("clauses", "risks", "suggestions")
 
-def run_full_review(text: str, progress=None):
+
+def resolve_topology(topology=None):
+    """
+    Validate a pipeline topology name (default: PIPELINE_TOPOLOGY).
+
+    Raises:
+        ValueError: If the topology is not one of TOPOLOGIES
+    """
+    topology = topology or settings.PIPELINE_TOPOLOGY
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown pipeline topology '{topology}'. Expected one of: {', '.join(TOPOLOGIES)}")
+    return topology
+
+
+def review_cache_key(text: str, topology=None):
+    """
+    Cache key for a full review: the contract text plus everything that shapes the output.
+    """
+    return make_cache_key(
+        text,
+        resolve_topology(topology),
+        settings.GROQ_MODEL,
+        settings.CLAUSE_CHUNK_SIZE,
+        settings.CLAUSE_CHUNK_OVERLAP,
+        settings.CLAUSE_EXTRACTION_MODE,
+        settings.CLAUSE_TARGET_MAX_CHARS,
+        settings.CLAUSE_TARGET_TOP_K,
+        clause_extractor.CLAUSE_PROMPT,
+        risk_classifier.RISK_PROMPT,
+        revision_agent.REVISION_PROMPT,
+        fused_reviewer.FUSED_PROMPT,
+        clause_extractor.TEMPERATURE,
+        risk_classifier.TEMPERATURE,
+        revision_agent.TEMPERATURE,
+        fused_reviewer.TEMPERATURE,
+        cascade_fingerprint(),
+        prefilter_fingerprint(risk_classifier.verdict_fingerprint()),
+    )
+
+
+def _is_cacheable(result, usage):
+    # Don't pin parse failures or truncated responses in the cache - a retry may well succeed
+    if usage.get("partial_responses"):
+        return False
+    for key in ("clauses", "risks"):
+        value = result.get(key)
+        if not isinstance(value, dict) or "error" in value:
+            return False
+    return True
+
+
+def _clauses_str(clauses):
+    # Canonical JSON: the same extraction always yields byte-identical classification and
+    # revision prompts, whichever path (chunk merge, cascade, versions) produced it
+    return json.dumps(clauses, sort_keys=True) if isinstance(clauses, dict) else str(clauses)
+
+
+def revision_source(text: str):
+    """
+    Input for revisions drafted before extraction finishes (fused and speculative topologies).
+
+    The local section index picks the clause-bearing sections, so the prompt stays
+    within CLAUSE_TARGET_MAX_CHARS however long the contract is.
+    """
+    return select_clause_spans(text)
+
+
+def _pipeline_report(topology, started, usage, cached=False, coalesced=False):
+    return {
+        "topology": topology,
+        "cached": cached,
+        # Served by waiting on an identical review already in flight (see single_flight)
+        "coalesced": coalesced,
+        "seconds": round(time.perf_counter() - started, 3),
+        **usage,
+    }
+
+
+def run_full_review(text: str, progress=None, topology=None, deadline=None):
     """
     Run full contract review with parallel processing for independent tasks.
+
+    Identical contracts (after whitespace normalization) reviewed with the same
+    model, prompts and temperatures are served from the review cache, and a
+    review that is already in flight (in any worker) is waited on rather than
+    run twice.
+
+    Args:
+        text: Contract text
+        progress: Optional Gradio-style progress callback
+        topology: "sequential", "fused" or "speculative" (default: PIPELINE_TOPOLOGY)
+        deadline: Optional Deadline; stages still running when it passes are abandoned
+            and no further LLM calls are sent for them
+
+    Returns:
+        Dict with clauses, risks, suggestions, ``stages`` (status of each), ``partial``
+        and ``pipeline`` - the topology used, wall-clock seconds, LLM calls and
+        prompt/completion tokens for this review
+
+    Raises:
+        ReviewCancelled: If ``deadline`` was cancelled (e.g. the client disconnected)
     """
-    # Step 1: Extract clauses (must be done first)
-    if progress:
-        progress(0.3, desc="Analyzing contract clauses...")
-    clauses = extract_clauses(text)
-    
-    # Convert clauses dict to string for risk classification and revision suggestions
-    clauses_str = json.dumps(clauses) if isinstance(clauses, dict) else str(clauses)
-    
-    # Step 2 & 3: Run risk classification and revision suggestions in parallel
-    # These are independent of each other and can run simultaneously
+    return _run_full_review(text, progress, resolve_topology(topology), deadline=deadline)
+
+
+def _run_full_review(text, progress, topology, emit=None, deadline=None):
+    with deadline_scope(deadline):
+        try:
+            return _run_review(text, progress, topology, emit, deadline)
+        except PartialReview as e:
+            # Callers coalesced onto this review get their own copy
+            return copy.deepcopy(e.result)
+
+
+def _run_review(text, progress, topology, emit, deadline):
+    started = time.perf_counter()
+    cache_key = None
+    if settings.REVIEW_CACHE_ENABLED or settings.SINGLE_FLIGHT_ENABLED:
+        cache_key = review_cache_key(text, topology)
+    if settings.REVIEW_CACHE_ENABLED:
+        cached = review_cache.get(cache_key)
+        if cached is not None:
+            if progress:
+                progress(1.0, desc="Loaded cached analysis!")
+            cached["pipeline"] = _pipeline_report(topology, started, new_usage(), cached=True)
+            return cached
+
+    def review():
+        stages = {}
+        with track_llm_usage() as usage, observe_stage(f"review_{topology}"):
+            if topology == "sequential":
+                clauses, risks, suggestions = _review_sequential(text, stages, deadline, progress, emit)
+            else:
+                clauses, risks, suggestions = _review_overlapped(text, topology, stages, deadline, progress, emit)
+        result = {
+            "clauses": clauses,
+            "risks": risks,
+            "suggestions": suggestions,
+        }
+        return _finish_review(result, cache_key, topology, started, usage, stages)
+
+    if settings.SINGLE_FLIGHT_ENABLED:
+        try:
+            result, shared = single_flight.run(cache_key, review)
+        except ReviewCancelled as e:
+            if e.reason != "deadline":
+                raise
+            _waiter_timed_out(topology, started, deadline)
+        if shared:
+            result["pipeline"] = _pipeline_report(topology, started, new_usage(), coalesced=True)
+    else:
+        result = review()
+
     if progress:
-        progress(0.5, desc="Analyzing risks and generating suggestions (parallel processing)...")
-    
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        # Submit both tasks
-        risk_future = executor.submit(classify_risks, clauses_str)
-        suggestion_future = executor.submit(suggest_revisions, clauses_str)
-        
+        progress(1.0, desc="Analysis complete!")
+    return result
+
+
+def _record_stages(result, topology, started, usage, stages):
+    """Add each stage's status to ``result``; raises PartialReview if any didn't complete"""
+    result["stages"] = {name: stages.get(name, "completed") for name in STAGES}
+    result["partial"] = any(status != "completed" for status in result["stages"].values())
+    if result["partial"]:
+        # Stages that didn't finish come back null - not an empty answer that reads as "none found"
+        for name in STAGES:
+            if result["stages"][name] != "completed":
+                result[name] = None
+        result["pipeline"] = _pipeline_report(topology, started, usage)
+        raise PartialReview(result)
+
+
+def _finish_review(result, cache_key, topology, started, usage, stages):
+    _record_stages(result, topology, started, usage, stages)
+    if settings.REVIEW_CACHE_ENABLED and _is_cacheable(result, usage):
+        review_cache.set(cache_key, result)
+    result["pipeline"] = _pipeline_report(topology, started, usage)
+    return result
+
+
+async def _afinish_review(result, cache_key, topology, started, usage, stages):
+    # The review cache is SQLite; keep its write off the event loop
+    _record_stages(result, topology, started, usage, stages)
+    if settings.REVIEW_CACHE_ENABLED and _is_cacheable(result, usage):
+        await asyncio.to_thread(review_cache.set, cache_key, result)
+    result["pipeline"] = _pipeline_report(topology, started, usage)
+    return result
+
+
+def _waiter_timed_out(topology, started, deadline):
+    """
+    Raise PartialReview for a caller whose deadline passed while it waited on an identical review.
+
+    Nothing finished in time, so it gets what its own review would have returned:
+    the stages running at the deadline timed out and the ones waiting on them skipped.
+    """
+    stages = {}
+    _stage_cut_off("clauses", stages, deadline)
+    if topology != "sequential":
+        # Suggestions are drafted alongside the analysis
+        _stage_cut_off("suggestions", stages, deadline)
+    if topology == "fused":
+        stages["risks"] = stages["clauses"]
+    _skip(stages, "risks", "suggestions")
+    _record_stages({name: None for name in STAGES}, topology, started, new_usage(), stages)
+
+
+def _stage_cut_off(name, stages, deadline):
+    """Mark a stage the deadline cut off, or raise if the review was cancelled for another reason"""
+    if deadline is not None and deadline.reason not in (None, "deadline"):
+        raise ReviewCancelled(deadline.reason)
+    if deadline is not None:
+        # Stops the abandoned stage's worker before its next LLM call
+        deadline.cancel("deadline")
+    stages[name] = "timed_out"
+
+
+def _await_stage(future, name, stages, deadline):
+    """A stage's result, or None if the deadline passes first (the stage is then marked timed out)"""
+    try:
+        value = future.result(timeout=deadline.remaining() if deadline else None)
+    except TimeoutError:
+        pass
+    except ReviewCancelled as e:
+        if e.reason != "deadline":
+            raise
+    else:
+        stages[name] = "completed"
+        return value
+    _stage_cut_off(name, stages, deadline)
+    return None
+
+
+async def _astage(coro, name, stages, deadline):
+    """Async variant of _await_stage: the stage's coroutine (and its LLM call) is cancelled at the deadline"""
+    try:
+        value = await asyncio.wait_for(coro, deadline.remaining() if deadline else None)
+    except TimeoutError:
+        pass
+    except ReviewCancelled as e:
+        if e.reason != "deadline":
+            raise
+    else:
+        stages[name] = "completed"
+        return value
+    _stage_cut_off(name, stages, deadline)
+    return None
+
+
+def _skip(stages, *names):
+    # Stages whose input never arrived
+    for name in names:
+        stages.setdefault(name, "skipped")
+
+
+def _emit_when_done(future, event, emit):
+    # Hand a stage result to ``emit`` as soon as its future resolves
+    if emit:
+        future.add_done_callback(lambda f: f.exception() is None and emit(event, f.result()))
+
+
+def _review_sequential(text: str, stages, deadline=None, progress=None, emit=None):
+    # Every stage runs on a worker thread (in a copy of the current context, which carries the
+    # per-review usage tracking and deadline) so waiting on it can stop at the deadline
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        # Step 1: Extract clauses (must be done first)
+        if progress:
+            progress(0.3, desc="Analyzing contract clauses...")
+        clauses = _await_stage(
+            executor.submit(contextvars.copy_context().run, extract_clauses, text), "clauses", stages, deadline
+        )
+        if stages["clauses"] != "completed":
+            _skip(stages, "risks", "suggestions")
+            return None, None, None
+        if emit:
+            emit("clauses", clauses)
+
+        # Convert clauses dict to string for risk classification and revision suggestions
+        clauses_str = _clauses_str(clauses)
+
+        # Step 2 & 3: Run risk classification and revision suggestions in parallel
+        # These are independent of each other and can run simultaneously
+        if progress:
+            progress(0.5, desc="Analyzing risks and generating suggestions (parallel processing)...")
+        risk_future = executor.submit(contextvars.copy_context().run, classify_risks, clauses_str)
+        suggestion_future = executor.submit(contextvars.copy_context().run, suggest_revisions, clauses_str)
+        _emit_when_done(risk_future, "risks", emit)
+        _emit_when_done(suggestion_future, "suggestions", emit)
+
         # Wait for both to complete
-        risks = risk_future.result()
-        suggestions = suggestion_future.result()
-    
+        risks = _await_stage(risk_future, "risks", stages, deadline)
+        suggestions = _await_stage(suggestion_future, "suggestions", stages, deadline)
+        return clauses, risks, suggestions
+    finally:
+        # Don't wait for stages the deadline cut off; they send no further LLM calls
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _review_overlapped(text: str, topology: str, stages, deadline=None, progress=None, emit=None):
+    # Revisions are drafted from the clause sections while the analysis runs,
+    # so the critical path is one round-trip (fused) or extraction + classification (speculative)
     if progress:
-        progress(1.0, desc="Analysis complete!")
+        progress(0.3, desc="Analyzing clauses and drafting suggestions (parallel processing)...")
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        suggestion_future = executor.submit(
+            contextvars.copy_context().run, suggest_revisions, revision_source(text)
+        )
+        _emit_when_done(suggestion_future, "suggestions", emit)
+        clauses = risks = None
+        if topology == "fused":
+            analysis = _await_stage(
+                executor.submit(contextvars.copy_context().run, extract_and_classify, text), "clauses", stages, deadline
+            )
+            stages["risks"] = stages["clauses"]
+            if analysis is not None:
+                clauses, risks = analysis
+                if emit:
+                    emit("clauses", clauses)
+        else:
+            clauses = _await_stage(
+                executor.submit(contextvars.copy_context().run, extract_clauses, text), "clauses", stages, deadline
+            )
+            if stages["clauses"] == "completed":
+                if emit:
+                    emit("clauses", clauses)
+                if progress:
+                    progress(0.6, desc="Analyzing risks...")
+                risks = _await_stage(
+                    executor.submit(contextvars.copy_context().run, classify_risks, _clauses_str(clauses)),
+                    "risks", stages, deadline,
+                )
+            else:
+                _skip(stages, "risks")
+        if emit and stages["risks"] == "completed":
+            emit("risks", risks)
+        suggestions = _await_stage(suggestion_future, "suggestions", stages, deadline)
+        return clauses, risks, suggestions
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def arun_full_review(text: str, topology=None, deadline=None):
+    """
+    Async variant of run_full_review for the API.
+
+    The LLM calls are awaited rather than run on threads, so a single worker
+    process can interleave many concurrent reviews. Stages still running at the
+    ``deadline`` are cancelled along with their in-flight LLM calls.
+    """
+    topology = resolve_topology(topology)
+    with deadline_scope(deadline):
+        try:
+            return await _arun_review(text, topology, deadline)
+        except PartialReview as e:
+            return copy.deepcopy(e.result)
+
+
+async def _arun_review(text, topology, deadline):
+    started = time.perf_counter()
+    cache_key = None
+    if settings.REVIEW_CACHE_ENABLED or settings.SINGLE_FLIGHT_ENABLED:
+        cache_key = review_cache_key(text, topology)
+    if settings.REVIEW_CACHE_ENABLED:
+        # The review cache is SQLite; keep its read off the event loop
+        cached = await asyncio.to_thread(review_cache.get, cache_key)
+        if cached is not None:
+            cached["pipeline"] = _pipeline_report(topology, started, new_usage(), cached=True)
+            return cached
+
+    async def review():
+        stages = {}
+        with track_llm_usage() as usage, observe_stage(f"review_{topology}"):
+            if topology == "sequential":
+                # Step 1: Extract clauses (must be done first)
+                clauses = await _astage(aextract_clauses(text), "clauses", stages, deadline)
+                risks = suggestions = None
+                if stages["clauses"] == "completed":
+                    clauses_str = _clauses_str(clauses)
+
+                    # Step 2 & 3: Risk classification and revision suggestions run concurrently
+                    risks, suggestions = await asyncio.gather(
+                        _astage(aclassify_risks(clauses_str), "risks", stages, deadline),
+                        _astage(asuggest_revisions(clauses_str), "suggestions", stages, deadline),
+                    )
+                else:
+                    _skip(stages, "risks", "suggestions")
+            else:
+                (clauses, risks), suggestions = await asyncio.gather(
+                    _aanalyze(text, topology, stages, deadline),
+                    _astage(asuggest_revisions(revision_source(text)), "suggestions", stages, deadline),
+                )
+        result = {
+            "clauses": clauses,
+            "risks": risks,
+            "suggestions": suggestions,
+        }
+        return await _afinish_review(result, cache_key, topology, started, usage, stages)
+
+    if not settings.SINGLE_FLIGHT_ENABLED:
+        return await review()
+    try:
+        result, shared = await single_flight.arun(cache_key, review)
+    except ReviewCancelled as e:
+        if e.reason != "deadline":
+            raise
+        _waiter_timed_out(topology, started, deadline)
+    if shared:
+        result["pipeline"] = _pipeline_report(topology, started, new_usage(), coalesced=True)
+    return result
+
+
+async def _aanalyze(text: str, topology: str, stages, deadline=None):
+    # Clauses and risks for the fused and speculative topologies
+    if topology == "fused":
+        analysis = await _astage(aextract_and_classify(text), "clauses", stages, deadline)
+        stages["risks"] = stages["clauses"]
+        return analysis or (None, None)
+    clauses = await _astage(aextract_clauses(text), "clauses", stages, deadline)
+    if stages["clauses"] != "completed":
+        _skip(stages, "risks")
+        return None, None
+    return clauses, await _astage(aclassify_risks(_clauses_str(clauses)), "risks", stages, deadline)
+
+
+def iter_full_review(text: str, progress=None, topology=None, deadline=None, caller=None):
+    """
+    Run the review on worker threads and yield ``(event, data)`` pairs as each stage finishes.
+
+    Sync counterpart of astream_full_review for the Gradio UI: yields ``clauses``,
+    ``risks`` and ``suggestions`` in the order they complete, then ``done`` with the
+    full result as returned by run_full_review. A review served from the cache or
+    coalesced onto one already in flight yields all three stages at once; stages cut
+    off by ``deadline`` are not yielded (see ``stages`` in the result).
+
+    Closing the generator early (the UI session went away) cancels the review, so no
+    further LLM calls are sent for it. ``caller`` is the (priority, tenant) its LLM calls
+    are scheduled under (default: this context's, see llm_scheduler).
+    """
+    topology = resolve_topology(topology)
+    deadline = deadline or Deadline()
+    events = queue.Queue()
+
+    def emit(event, data):
+        events.put((event, data))
+
+    def review():
+        try:
+            with llm_caller(*(caller or current_caller())):
+                emit("done", _run_full_review(text, progress, topology, emit, deadline))
+        except Exception as e:
+            emit("error", e)
+
+    # The review runs in a copy of this context, so usage tracking set by the caller still applies
+    worker = threading.Thread(target=contextvars.copy_context().run, args=(review,), daemon=True)
+    worker.start()
+    sent = set()
+    finished = False
+    try:
+        while True:
+            event, data = events.get()
+            if event == "error":
+                finished = True
+                raise data
+            if event == "done":
+                finished = True
+                stages = data.get("stages") or {}
+                for key in STAGES:
+                    if key not in sent and stages.get(key, "completed") == "completed":
+                        yield key, data[key]
+                yield "done", data
+                return
+            if event not in sent:
+                sent.add(event)
+                yield event, data
+    finally:
+        if not finished:
+            deadline.cancel("disconnected")
+
+
+async def astream_full_review(text: str, topology=None, deadline=None):
+    """
+    Run the review and yield ``(event, data)`` pairs as each stage produces output.
+
+    Yields ``clauses`` and ``risks`` as the analysis finishes and the revision
+    suggestions (``suggestion_token`` per streamed chunk, then ``suggestions``)
+    interleaved as they arrive, and finally ``done`` with the full result as returned
+    by arun_full_review. With the fused and speculative topologies suggestion tokens
+    start streaming before the clauses are known.
+
+    As in arun_full_review, stages still running at ``deadline`` are cancelled (they
+    are not yielded; see ``stages`` and ``partial`` in the result), and an identical
+    review already in flight is waited on rather than run twice - its stages are then
+    yielded at once. Closing the generator early (the client disconnected) cancels
+    the review, so no further LLM calls are sent for it.
+    """
+    topology = resolve_topology(topology)
+    deadline = deadline or Deadline()
+    started = time.perf_counter()
+    cache_key = None
+    if settings.REVIEW_CACHE_ENABLED or settings.SINGLE_FLIGHT_ENABLED:
+        cache_key = review_cache_key(text, topology)
+    if settings.REVIEW_CACHE_ENABLED:
+        cached = await asyncio.to_thread(review_cache.get, cache_key)
+        if cached is not None:
+            for name in STAGES:
+                yield name, cached[name]
+            cached["pipeline"] = _pipeline_report(topology, started, new_usage(), cached=True)
+            yield "done", cached
+            return
+
+    # What the consumer is sent, in order; None once the review is over
+    events = asyncio.Queue()
+
+    async def review():
+        # Every stage feeds one queue so whichever produces output first is sent first
+        produced = asyncio.Queue()
+        stages = {}
+        begun = set()
+        result = {}
+        tasks = []
+
+        def start(coro):
+            async def run():
+                try:
+                    await coro
+                except Exception as e:
+                    await produced.put(("error", e))
+            # Tasks copy this context: the usage tracking and deadline apply in them too
+            tasks.append(asyncio.create_task(run()))
+
+        async def suggest(clauses_str):
+            begun.add("suggestions")
+            parts = []
+            async for token in astream_revisions(clauses_str):
+                parts.append(token)
+                await produced.put(("suggestion_token", token))
+            await produced.put(("suggestions", "".join(parts)))
+
+        async def analyze():
+            begun.add("clauses")
+            if topology == "fused":
+                begun.add("risks")
+                clauses, risks = await aextract_and_classify(text)
+                await produced.put(("clauses", clauses))
+            else:
+                clauses = await aextract_clauses(text)
+                await produced.put(("clauses", clauses))
+                clauses_str = _clauses_str(clauses)
+                if topology == "sequential":
+                    start(suggest(clauses_str))
+                begun.add("risks")
+                risks = await aclassify_risks(clauses_str)
+            await produced.put(("risks", risks))
+
+        with track_llm_usage() as usage, observe_stage(f"review_{topology}"):
+            if topology != "sequential":
+                start(suggest(revision_source(text)))
+            start(analyze())
+            try:
+                while any(name not in result for name in STAGES):
+                    try:
+                        event, data = await asyncio.wait_for(produced.get(), deadline.remaining())
+                    except TimeoutError:
+                        break
+                    if event == "error":
+                        if isinstance(data, ReviewCancelled) and data.reason == "deadline":
+                            break
+                        raise data
+                    if event != "suggestion_token":
+                        result[event] = data
+                        stages[event] = "completed"
+                    events.put_nowait((event, data))
+            finally:
+                # Stop outstanding LLM calls once the review is over or abandoned
+                for task in tasks:
+                    task.cancel()
+        for name in STAGES:
+            if name not in stages:
+                _stage_cut_off(name, stages, deadline)
+                if name not in begun:
+                    stages[name] = "skipped"
+        result = {name: result.get(name) for name in STAGES}
+        return await _afinish_review(result, cache_key, topology, started, usage, stages)
+
+    async def run():
+        try:
+            if settings.SINGLE_FLIGHT_ENABLED:
+                try:
+                    return await single_flight.arun(cache_key, review)
+                except ReviewCancelled as e:
+                    if e.reason != "deadline":
+                        raise
+                    _waiter_timed_out(topology, started, deadline)
+            return await review(), False
+        except PartialReview as e:
+            return copy.deepcopy(e.result), False
+        finally:
+            events.put_nowait(None)
+
+    with deadline_scope(deadline):
+        flight = asyncio.create_task(run())
+    finished = False
+    try:
+        while (item := await events.get()) is not None:
+            yield item
+        result, shared = await flight
+        finished = True
+    finally:
+        if not finished:
+            deadline.cancel("disconnected")
+            flight.cancel()
+
+    if shared:
+        # Waited on an identical review in flight: its stages arrive all at once
+        for name in STAGES:
+            if (result.get("stages") or {}).get(name, "completed") == "completed":
+                yield name, result[name]
+        result["pipeline"] = _pipeline_report(topology, started, new_usage(), coalesced=True)
+    yield "done", result
+
+
+def versioned_review_fingerprint():
+    """Everything besides the text that shapes a stored block extraction or risk verdict"""
+    return make_cache_key(
+        "",
+        settings.GROQ_MODEL,
+        settings.CLAUSE_CHUNK_SIZE,
+        settings.VERSION_BLOCK_SECTIONS,
+        clause_extractor.CLAUSE_PROMPT,
+        risk_classifier.RISK_PROMPT,
+        revision_agent.REVISION_PROMPT,
+        clause_extractor.TEMPERATURE,
+        risk_classifier.TEMPERATURE,
+        revision_agent.TEMPERATURE,
+        cascade_fingerprint(),
+        prefilter_fingerprint(risk_classifier.verdict_fingerprint()),
+    )
+
+
+def _risk_changes(previous_risks, risks):
+    changes = {}
+    for key in dict.fromkeys([*previous_risks, *risks]):
+        if key in ("error", "raw_response"):
+            continue
+        before = normalize_risk_level(previous_risks.get(key))
+        after = normalize_risk_level(risks.get(key))
+        if before != after:
+            changes[key] = {"previous": before, "current": after}
+    return changes
+
+
+async def arun_versioned_review(contract_id: str, text: str):
+    """
+    Review a new version of a contract, re-analyzing only what changed since the last one.
+
+    The contract is split into sections and grouped into content-addressed blocks
+    (see contract_versions.build_blocks). Blocks already extracted for an earlier
+    version are reused; only new blocks go to the LLM. Risks are re-classified only
+    for clauses whose extracted text changed, and suggestions are regenerated only
+    when some clause changed. The first version is a full review.
+
+    Returns:
+        Dict with contract_id, version, previous_version, clauses, risks, suggestions,
+        changed_clauses, risk_changes (clause -> previous/current level), diff and pipeline
+
+    Raises:
+        ValueError: If the text contains no sections
+    """
+    started = time.perf_counter()
+    fingerprint = versioned_review_fingerprint()
+    blocks = build_blocks(text)
+    if not blocks:
+        raise ValueError("Contract text is empty")
+
+    # The version store is SQLite; keep its reads and writes off the event loop
+    previous = await asyncio.to_thread(contract_versions.latest, contract_id)
+    reusable = previous is not None and previous["fingerprint"] == fingerprint
+    previous_result = previous["result"] if previous else {}
+    stored = await asyncio.to_thread(
+        contract_versions.get_blocks, contract_id, fingerprint, {b["hash"] for b in blocks}
+    )
+    # Identical blocks within one contract (repeated boilerplate) are extracted once
+    changed = list({b["hash"]: b["text"] for b in blocks if b["hash"] not in stored}.items())
+
+    semaphore = asyncio.Semaphore(settings.CLAUSE_CHUNK_CONCURRENCY)
+
+    async def extract(block_text):
+        async with semaphore:
+            return await aextract_clauses(block_text, mode="full")
+
+    with track_llm_usage() as usage, observe_stage("review_incremental"):
+        extracted = await asyncio.gather(*(extract(block_text) for _, block_text in changed))
+        new_blocks = dict(zip((h for h, _ in changed), extracted))
+        clauses = merge_clause_results([stored.get(b["hash"]) or new_blocks[b["hash"]] for b in blocks])
+
+        previous_clauses = previous_result.get("clauses", {}) if reusable else {}
+        previous_risks = previous_result.get("risks", {}) if reusable else {}
+        if "error" in clauses or "error" in previous_risks:
+            changed_clauses = [k for k in clauses if k not in ("error", "raw_response")]
+        else:
+            changed_clauses = [
+                k for k in clauses if clauses[k] != previous_clauses.get(k) or k not in previous_risks
+            ]
+
+        risks = {k: previous_risks[k] for k in clauses if k not in changed_clauses and k in previous_risks}
+        suggestions = previous_result.get("suggestions") if reusable else None
+        if changed_clauses or suggestions is None:
+            new_risks, suggestions = await asyncio.gather(
+                aclassify_risks(_clauses_str({k: clauses[k] for k in changed_clauses})),
+                asuggest_revisions(_clauses_str(clauses)),
+            )
+            if "error" in new_risks:
+                risks = new_risks
+            else:
+                risks.update(new_risks)
 
+    section_count = sum(len(b["sections"]) for b in blocks)
+    previous_sections = {h for b in previous["blocks"] for h in b["sections"]} if previous else set()
+    diff = {
+        "sections": section_count,
+        "changed_sections": sum(1 for b in blocks for h in b["sections"] if h not in previous_sections),
+        "blocks": len(blocks),
+        "reextracted_blocks": len(changed),
+    }
+    result = {"clauses": clauses, "risks": risks, "suggestions": suggestions}
+    version = await asyncio.to_thread(
+        contract_versions.add_version,
+        contract_id,
+        fingerprint,
+        [{"hash": b["hash"], "sections": b["sections"]} for b in blocks],
+        {h: c for h, c in new_blocks.items() if isinstance(c, dict) and "error" not in c},
+        result,
+        {**diff, "changed_clauses": changed_clauses},
+    )
     return {
-        "clauses": clauses,
-        "risks": risks,
-        "suggestions": suggestions,
-    }
\ No newline at end of file
+        "contract_id": contract_id,
+        "version": version,
+        "previous_version": previous["version"] if previous else None,
+        **result,
+        "changed_clauses": changed_clauses,
+        "risk_changes": _risk_changes(previous_result.get("risks", {}), risks) if previous else {},
+        "diff": diff,
+        "pipeline": _pipeline_report("incremental", started, usage),
+    }
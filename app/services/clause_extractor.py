@@ -1,9 +1,20 @@
+import asyncio
+import contextvars
 import json
-import re
-from app.services.llm_factory import create_llm
+from concurrent.futures import ThreadPoolExecutor
+from app.config import settings
+from app.metrics import JSON_PARSE_FALLBACKS, JSON_REPAIRS, observe_stage
+from app.models.agent_models import ClauseSet
+from app.services.json_repair import repair_json
+from app.services.llm_factory import ainvoke_llm, invoke_llm, record_partial_response, response_text
+from app.services.model_cascade import escalation_source, merge_escalated, record_escalations, uncertain_clauses
+from app.services.section_index import select_clause_spans
 
-# Initialize LLM using Groq
-llm = create_llm(temperature=0.1)  # Lower temperature for more consistent, factual responses
+# LLM is created lazily on first use (see llm_factory.get_llm)
+SERVICE = "clause_extractor"
+TEMPERATURE = 0.1  # Lower temperature for more consistent, factual responses
+
+CLAUSE_KEYS = ("termination", "confidentiality", "payment_terms", "liability", "governing_law")
 
 
 CLAUSE_PROMPT = """Extract these 5 clause types from the contract. Return ONLY valid JSON, no markdown.
@@ -28,36 +39,223 @@ Contract:
 {content}"""
 
 
-def extract_clauses(content: str):
-    prompt = CLAUSE_PROMPT.format(content=content)
-    response = llm.invoke(prompt)
-    # Extract text content from LLM response
-    if hasattr(response, 'content'):
-        response = response.content
-    response = str(response)
-    
-    # Try to parse JSON from the response
+def _parse_response(response):
+    """
+    Parse an extraction response into the ClauseSet shape.
+
+    Fenced, prose-wrapped or truncated JSON is repaired locally (see json_repair) rather
+    than discarded; clause types missing from a truncated response come back "not_found".
+    """
+    response = response_text(response)
     try:
-        # Extract JSON from markdown code blocks if present
-        json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', response, re.DOTALL)
-        if json_match:
-            response = json_match.group(1)
-        
-        # Try to find JSON object in the response
-        json_match = re.search(r'\{.*\}', response, re.DOTALL)
-        if json_match:
-            return json.loads(json_match.group(0))
-        
-        # If no JSON found, try parsing the whole response
-        return json.loads(response)
-    except (json.JSONDecodeError, AttributeError):
+        data, status = repair_json(response)
+        clauses = ClauseSet.model_validate(data).model_dump()
+    except ValueError:
+        JSON_PARSE_FALLBACKS.labels(SERVICE).inc()
         # Fallback: return a dict with the raw response
         return {
             "error": "Failed to parse JSON response",
-            "raw_response": str(response),
-            "termination": "not_found",
-            "confidentiality": "not_found",
-            "payment_terms": "not_found",
-            "liability": "not_found",
-            "governing_law": "not_found"
-        }
\ No newline at end of file
+            "raw_response": response,
+            **{key: "not_found" for key in CLAUSE_KEYS},
+        }
+    if status != "clean":
+        JSON_REPAIRS.labels(SERVICE, status).inc()
+    if status == "partial":
+        record_partial_response()
+    return clauses
+
+
+def split_into_chunks(text: str, chunk_size: int, overlap: int):
+    """
+    Split text into overlapping windows of at most chunk_size characters.
+
+    Breaks fall on a line boundary in the last quarter of a window when one exists,
+    so clauses are rarely cut mid-sentence; the overlap covers the rest.
+    """
+    if len(text) <= chunk_size:
+        return [text]
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            boundary = text.rfind("\n", start + chunk_size * 3 // 4, end)
+            if boundary != -1:
+                end = boundary
+        chunks.append(text[start:end])
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, str) and value.strip().lower() in ("", "not_found"))
+
+
+def merge_clause_results(results):
+    """
+    Reduce per-chunk extraction results into a single five-key result.
+
+    Distinct findings for a clause type are concatenated in document order.
+    Chunks whose JSON could not be parsed are skipped unless every chunk failed;
+    skipping one counts as a partial response, so the incomplete review isn't cached.
+    """
+    parsed = [r for r in results if isinstance(r, dict) and "error" not in r]
+    if not parsed:
+        return results[0]
+    if len(parsed) < len(results):
+        record_partial_response()
+
+    merged = {}
+    for key in CLAUSE_KEYS:
+        values = []
+        seen = set()
+        for result in parsed:
+            value = result.get(key)
+            if _is_missing(value):
+                continue
+            marker = value.strip().lower() if isinstance(value, str) else json.dumps(value, sort_keys=True)
+            if marker in seen:
+                continue
+            seen.add(marker)
+            values.append(value)
+
+        if not values:
+            merged[key] = "not_found"
+        elif len(values) == 1:
+            merged[key] = values[0]
+        else:
+            merged[key] = " ".join(v if isinstance(v, str) else json.dumps(v) for v in values)
+    return merged
+
+
+def _extract_single(content: str, model=None):
+    prompt = CLAUSE_PROMPT.format(content=content)
+    response = invoke_llm(SERVICE, prompt, TEMPERATURE, model=model, json_mode=True)
+    with observe_stage("json_parse"):
+        return _parse_response(response)
+
+
+async def _aextract_single(content: str, model=None):
+    prompt = CLAUSE_PROMPT.format(content=content)
+    response = await ainvoke_llm(SERVICE, prompt, TEMPERATURE, model=model, json_mode=True)
+    with observe_stage("json_parse"):
+        return _parse_response(response)
+
+
+def extract_clauses_chunked(content: str, chunk_size=None, overlap=None, max_concurrency=None, model=None):
+    """
+    Map-reduce clause extraction for long contracts.
+
+    Args:
+        content: Full contract text
+        chunk_size: Characters per chunk (default: CLAUSE_CHUNK_SIZE)
+        overlap: Characters shared by neighbouring chunks (default: CLAUSE_CHUNK_OVERLAP)
+        max_concurrency: Chunks in flight at once (default: CLAUSE_CHUNK_CONCURRENCY)
+        model: Model name (default: GROQ_MODEL)
+
+    Returns:
+        Merged five-key clause dict
+    """
+    chunks = split_into_chunks(
+        content,
+        chunk_size or settings.CLAUSE_CHUNK_SIZE,
+        settings.CLAUSE_CHUNK_OVERLAP if overlap is None else overlap,
+    )
+    if len(chunks) == 1:
+        return _extract_single(chunks[0], model)
+
+    workers = min(len(chunks), max_concurrency or settings.CLAUSE_CHUNK_CONCURRENCY)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Each chunk runs in a copy of the caller's context so per-review usage tracking sees it
+        futures = [executor.submit(contextvars.copy_context().run, _extract_single, chunk, model) for chunk in chunks]
+        results = [future.result() for future in futures]
+    return merge_clause_results(results)
+
+
+async def aextract_clauses_chunked(content: str, chunk_size=None, overlap=None, max_concurrency=None, model=None):
+    """Async variant of extract_clauses_chunked"""
+    chunks = split_into_chunks(
+        content,
+        chunk_size or settings.CLAUSE_CHUNK_SIZE,
+        settings.CLAUSE_CHUNK_OVERLAP if overlap is None else overlap,
+    )
+    if len(chunks) == 1:
+        return await _aextract_single(chunks[0], model)
+
+    semaphore = asyncio.Semaphore(max_concurrency or settings.CLAUSE_CHUNK_CONCURRENCY)
+
+    async def run(chunk):
+        async with semaphore:
+            return await _aextract_single(chunk, model)
+
+    results = await asyncio.gather(*(run(chunk) for chunk in chunks))
+    return merge_clause_results(results)
+
+
+def _targeted(content: str, mode=None):
+    if (mode or settings.CLAUSE_EXTRACTION_MODE) == "targeted":
+        return select_clause_spans(content)
+    return content
+
+
+def _escalation(content: str, clauses, mode=None):
+    """(keys, source, mode) for re-running low-confidence clause types on the large model, or None"""
+    if not settings.MODEL_CASCADE_ENABLED:
+        return None
+    keys = uncertain_clauses(clauses, content)
+    if not keys:
+        return None
+    record_escalations(SERVICE, keys)
+    source = escalation_source(content, keys, CLAUSE_KEYS)
+    # Sections picked for the uncertain clause types are already targeted
+    return keys, source, mode if source is content else "full"
+
+
+def _extract(content: str, mode=None, model=None):
+    content = _targeted(content, mode)
+    if len(content) > settings.CLAUSE_CHUNK_SIZE:
+        return extract_clauses_chunked(content, model=model)
+    return _extract_single(content, model)
+
+
+async def _aextract(content: str, mode=None, model=None):
+    content = _targeted(content, mode)
+    if len(content) > settings.CLAUSE_CHUNK_SIZE:
+        return await aextract_clauses_chunked(content, model=model)
+    return await _aextract_single(content, model)
+
+
+def extract_clauses(content: str, mode=None):
+    """
+    Extract the five clause types.
+
+    Args:
+        content: Contract text
+        mode: "full" sends the whole contract; "targeted" first narrows it to the
+            sections the local index scores highest (default: CLAUSE_EXTRACTION_MODE)
+
+    Either way, text longer than CLAUSE_CHUNK_SIZE is extracted in parallel chunks.
+    With MODEL_CASCADE_ENABLED, clause types the answer is unsure about are
+    extracted again on CASCADE_LARGE_MODEL from their sections only.
+    """
+    with observe_stage("extract_clauses"):
+        clauses = _extract(content, mode)
+        escalation = _escalation(content, clauses, mode)
+        if escalation:
+            keys, source, source_mode = escalation
+            clauses = merge_escalated(clauses, _extract(source, source_mode, settings.CASCADE_LARGE_MODEL), keys)
+        return clauses
+
+
+async def aextract_clauses(content: str, mode=None):
+    """Async variant of extract_clauses - awaits the LLM instead of blocking a thread"""
+    with observe_stage("extract_clauses"):
+        clauses = await _aextract(content, mode)
+        escalation = _escalation(content, clauses, mode)
+        if escalation:
+            keys, source, source_mode = escalation
+            clauses = merge_escalated(clauses, await _aextract(source, source_mode, settings.CASCADE_LARGE_MODEL), keys)
+        return clauses
@@ -0,0 +1,296 @@
+"""Near-duplicate clause index (MinHash + LSH over SQLite) for reusing risk verdicts"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+from app.config import settings
+from app.metrics import CLAUSE_INDEX_LOOKUPS
+
+# Universal hashing modulo a Mersenne prime, as in standard MinHash implementations
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+SHINGLE_SIZE = 3
+# Compare at most this many candidate signatures per clause, those sharing the most bands first
+MAX_CANDIDATES = 64
+# Evict this share below max_entries at once, so the next few inserts don't each pay for an eviction
+EVICT_SLACK = 0.1
+
+WORD_RE = re.compile(r"[a-z0-9$%]+(?:[.,][0-9]+)*")
+NUMBER_RE = re.compile(r"[0-9]")
+
+
+def normalize_clause(text: str):
+    """Lowercased words and numbers; punctuation, case and spacing don't matter"""
+    return WORD_RE.findall(str(text).lower())
+
+
+def shingles(words, size=SHINGLE_SIZE):
+    """Hash each run of ``size`` consecutive words to a 32-bit integer"""
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    size = min(size, len(words))
+    grams = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "little") for g in grams),
+        dtype=np.uint64,
+        count=len(grams),
+    )
+
+
+class ClauseIndex:
+    """
+    Risk verdicts for previously classified clauses, found again by text similarity.
+
+    Each clause is reduced to a MinHash signature over word 3-gram shingles. The
+    signature is cut into ``bands`` bands; clauses that agree on a whole band share
+    an LSH bucket, so a lookup only reads the rows in its own buckets (one indexed
+    query, whatever the size of the index). Candidates are confirmed by the
+    estimated Jaccard similarity of the full signatures against ``threshold``.
+
+    Entries are partitioned by clause type, by a fingerprint of the model and risk
+    prompt, and by the numbers in the clause, so a verdict is only reused under the
+    same classification setup and never across different amounts or periods.
+    Past ``max_entries`` (0 = unbounded) the oldest entries are evicted.
+    """
+
+    def __init__(self, path="", threshold=0.85, permutations=128, bands=16, seed=1, max_entries=300000):
+        if permutations % bands:
+            raise ValueError("CLAUSE_INDEX_PERMUTATIONS must be a multiple of CLAUSE_INDEX_BANDS")
+        self.path = path
+        self.threshold = threshold
+        self.permutations = permutations
+        self.bands = bands
+        self.rows = permutations // bands
+        self.max_entries = max_entries
+        rng = np.random.RandomState(seed)
+        # a < 2**31 and hash values < 2**32 keep a * x + b inside uint64
+        self._a = rng.randint(1, 1 << 31, size=permutations, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 31, size=permutations, dtype=np.uint64)
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.added = 0
+        self._entries = None
+        self._lock = threading.Lock()
+        self._ready = False
+
+    @contextmanager
+    def _connect(self):
+        if not self._ready:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            if not self._ready:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS clause_entries ("
+                    "id INTEGER PRIMARY KEY, partition TEXT NOT NULL, text_hash TEXT NOT NULL, "
+                    "signature BLOB NOT NULL, verdict TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS clause_entries_text ON clause_entries (partition, text_hash)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS clause_bands ("
+                    "bucket INTEGER NOT NULL, entry_id INTEGER NOT NULL, "
+                    "PRIMARY KEY (bucket, entry_id)) WITHOUT ROWID"
+                )
+                self._ready = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def signature(self, text: str):
+        """MinHash signature (uint32 array of length ``permutations``), or None for empty text"""
+        values = shingles(normalize_clause(text))
+        if values.size == 0:
+            return None
+        hashed = (np.outer(values, self._a) + self._b) % MERSENNE_PRIME
+        return (hashed & MAX_HASH).min(axis=0).astype(np.uint32)
+
+    def _buckets(self, partition: str, signature):
+        # One 63-bit bucket id per band, salted with the partition and band number
+        buckets = []
+        for band in range(self.bands):
+            digest = hashlib.blake2b(f"{partition}:{band}:".encode("utf-8"), digest_size=8)
+            digest.update(signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            buckets.append(int.from_bytes(digest.digest(), "little") >> 1)
+        return buckets
+
+    @staticmethod
+    def _partition(clause_type: str, fingerprint: str, text: str):
+        # Clauses only match when their numbers (notice periods, caps, rates) are identical -
+        # "30 days" vs "90 days" is a one-word edit but may well change the verdict
+        numbers = sorted({word for word in normalize_clause(text) if NUMBER_RE.search(word)})
+        digest = hashlib.sha256(" ".join(numbers).encode("utf-8")).hexdigest()[:16]
+        return f"{clause_type}:{fingerprint}:{digest}"
+
+    @staticmethod
+    def _text_hash(text: str):
+        return hashlib.sha256(" ".join(normalize_clause(text)).encode("utf-8")).hexdigest()
+
+    def lookup(self, clauses: dict, fingerprint: str):
+        """
+        Find stored verdicts for near-identical clauses.
+
+        Args:
+            clauses: {clause_type: clause_text}
+            fingerprint: Identifies the model and prompt the verdicts must come from
+
+        Returns:
+            {clause_type: verdict} for the clauses with a match at or above the threshold
+        """
+        found = {}
+        if not clauses:
+            return found
+        exact = near = 0
+        try:
+            with self._connect() as conn:
+                for clause_type, text in clauses.items():
+                    partition = self._partition(clause_type, fingerprint, text)
+                    row = conn.execute(
+                        "SELECT verdict FROM clause_entries WHERE partition = ? AND text_hash = ?",
+                        (partition, self._text_hash(text)),
+                    ).fetchone()
+                    if row:
+                        found[clause_type] = row[0]
+                        exact += 1
+                        continue
+
+                    signature = self.signature(text)
+                    if signature is None:
+                        continue
+                    # Two indexed lookups: bucket -> candidate ids, then id -> signature. The more
+                    # bands a candidate shares, the more similar its signature is likely to be
+                    buckets = self._buckets(partition, signature)
+                    ids = [row[0] for row in conn.execute(
+                        f"SELECT entry_id FROM clause_bands WHERE bucket IN ({','.join('?' * len(buckets))}) "
+                        "GROUP BY entry_id ORDER BY COUNT(*) DESC LIMIT ?",
+                        (*buckets, MAX_CANDIDATES),
+                    )]
+                    rows = conn.execute(
+                        f"SELECT partition, signature, verdict FROM clause_entries WHERE id IN ({','.join('?' * len(ids))})",
+                        ids,
+                    ).fetchall() if ids else []
+                    best, verdict = 0.0, None
+                    for candidate_partition, blob, candidate_verdict in rows:
+                        if candidate_partition != partition:
+                            continue
+                        similarity = float(np.mean(np.frombuffer(blob, dtype=np.uint32) == signature))
+                        if similarity > best:
+                            best, verdict = similarity, candidate_verdict
+                    if verdict is not None and best >= self.threshold:
+                        found[clause_type] = verdict
+                        near += 1
+        except sqlite3.Error:
+            # The index is an optimization; a broken file means every clause goes to the LLM
+            pass
+
+        misses = len(clauses) - exact - near
+        with self._lock:
+            self.exact_hits += exact
+            self.near_hits += near
+            self.misses += misses
+        CLAUSE_INDEX_LOOKUPS.labels("exact").inc(exact)
+        CLAUSE_INDEX_LOOKUPS.labels("near").inc(near)
+        CLAUSE_INDEX_LOOKUPS.labels("miss").inc(misses)
+        return found
+
+    def add(self, clauses: dict, verdicts: dict, fingerprint: str):
+        """Store the verdict of each clause in ``clauses`` that has one in ``verdicts``; evicts past ``max_entries``"""
+        entries = []
+        for clause_type, text in clauses.items():
+            verdict = verdicts.get(clause_type)
+            signature = self.signature(text)
+            if not isinstance(verdict, str) or signature is None:
+                continue
+            entries.append((self._partition(clause_type, fingerprint, text), self._text_hash(text), signature, verdict))
+        if not entries:
+            return
+        try:
+            with self._connect() as conn:
+                now = time.time()
+                inserted = 0
+                for partition, text_hash, signature, verdict in entries:
+                    cursor = conn.execute(
+                        "INSERT OR IGNORE INTO clause_entries (partition, text_hash, signature, verdict, created_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (partition, text_hash, signature.tobytes(), verdict, now),
+                    )
+                    if cursor.rowcount:
+                        inserted += 1
+                        conn.executemany(
+                            "INSERT OR IGNORE INTO clause_bands (bucket, entry_id) VALUES (?, ?)",
+                            [(bucket, cursor.lastrowid) for bucket in self._buckets(partition, signature)],
+                        )
+                with self._lock:
+                    self.added += len(entries)
+                    if self._entries is None:
+                        self._entries = conn.execute("SELECT COUNT(*) FROM clause_entries").fetchone()[0]
+                    else:
+                        self._entries += inserted
+                    evict = self.max_entries > 0 and self._entries > self.max_entries
+                if evict:
+                    self._evict(conn)
+        except sqlite3.Error:
+            pass
+
+    def _evict(self, conn):
+        # Other workers insert too, so count again before deleting. Ids only grow, so the
+        # lowest are the oldest entries
+        entries = conn.execute("SELECT COUNT(*) FROM clause_entries").fetchone()[0]
+        keep = int(self.max_entries * (1 - EVICT_SLACK))
+        if entries > self.max_entries:
+            oldest_kept = conn.execute(
+                "SELECT id FROM clause_entries ORDER BY id DESC LIMIT 1 OFFSET ?", (keep - 1,)
+            ).fetchone()[0]
+            conn.execute("DELETE FROM clause_entries WHERE id < ?", (oldest_kept,))
+            conn.execute("DELETE FROM clause_bands WHERE entry_id < ?", (oldest_kept,))
+            entries = keep
+        with self._lock:
+            self._entries = entries
+
+    def count(self):
+        try:
+            with self._connect() as conn:
+                return conn.execute("SELECT COUNT(*) FROM clause_entries").fetchone()[0]
+        except sqlite3.Error:
+            return None
+
+    def stats(self):
+        """Hit/miss counters for this process and the size of the shared index"""
+        with self._lock:
+            hits = self.exact_hits + self.near_hits
+            lookups = hits + self.misses
+            counters = {
+                "exact_hits": self.exact_hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "added": self.added,
+            }
+        return {
+            **counters,
+            "entries": self.count(),
+            "threshold": self.threshold,
+            "permutations": self.permutations,
+            "bands": self.bands,
+            "max_entries": self.max_entries,
+            "path": self.path,
+        }
+
+
+clause_index = ClauseIndex(
+    path=settings.CLAUSE_INDEX_PATH,
+    threshold=settings.CLAUSE_INDEX_THRESHOLD,
+    permutations=settings.CLAUSE_INDEX_PERMUTATIONS,
+    bands=settings.CLAUSE_INDEX_BANDS,
+    max_entries=settings.CLAUSE_INDEX_MAX_ENTRIES,
+)
@@ -0,0 +1,194 @@
+"""Per-section hashes and stored results for incremental review of contract versions (SQLite)"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from app.config import settings
+from app.services.review_cache import normalize_text
+from app.services.section_index import split_sections
+from app.services.text_normalizer import drop_page_markers, strip_page_furniture
+
+
+def section_hash(text: str):
+    """
+    Hash of a section's text.
+
+    Whitespace-only edits (re-flowed PDF lines) and page numbers don't change it.
+    """
+    return hashlib.sha256(normalize_text(drop_page_markers(text)).encode("utf-8")).hexdigest()
+
+
+def build_blocks(text: str, max_chars=None, boundary_every=None):
+    """
+    Group a contract's sections into extraction blocks with content-defined boundaries.
+
+    Once a block holds at least half of ``max_chars``, it ends after any section whose
+    hash is divisible by ``boundary_every`` (and always before it would exceed ``max_chars``).
+    Because boundaries are chosen by the sections' own content, an edit changes the
+    block that holds it and at most its neighbour; later blocks line up again and keep
+    their hashes and stored extractions.
+
+    Args:
+        text: Contract text
+        max_chars: Largest block (default: CLAUSE_CHUNK_SIZE)
+        boundary_every: Average sections between boundaries past the minimum size
+            (default: VERSION_BLOCK_SECTIONS)
+
+    Returns:
+        List of dicts with ``hash``, ``text`` and ``sections`` (section hashes, in order)
+    """
+    max_chars = max_chars or settings.CLAUSE_CHUNK_SIZE
+    min_chars = max_chars // 2
+    boundary_every = max(1, boundary_every or settings.VERSION_BLOCK_SECTIONS)
+
+    blocks = []
+    current = []
+    size = 0
+
+    def flush():
+        if current:
+            hashes = [h for h, _ in current]
+            blocks.append({
+                "hash": hashlib.sha256("".join(hashes).encode("ascii")).hexdigest(),
+                "text": "\n\n".join(t for _, t in current),
+                "sections": hashes,
+            })
+
+    # When a revision adds or removes text every later page break moves; left in, page
+    # numbers and running headers would land in different sections and change their hashes
+    for section in split_sections(strip_page_furniture(text)):
+        if not section.text.strip():
+            continue
+        digest = section_hash(section.text)
+        if current and size + len(section.text) > max_chars:
+            flush()
+            current, size = [], 0
+        current.append((digest, section.text))
+        size += len(section.text) + 2
+        if size >= min_chars and int(digest[:8], 16) % boundary_every == 0:
+            flush()
+            current, size = [], 0
+    flush()
+    return blocks
+
+
+class ContractVersionStore:
+    """
+    Stored versions of each contract and the clause extraction of every block seen.
+
+    Block extractions are keyed by (contract_id, fingerprint, block hash), where the
+    fingerprint covers the model and prompts, so a prompt change never reuses stale results.
+    """
+
+    def __init__(self, path=""):
+        self.path = path
+        self._lock = threading.Lock()
+        self._ready = False
+
+    @contextmanager
+    def _connect(self):
+        if not self._ready:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            if not self._ready:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS contract_versions ("
+                    "contract_id TEXT NOT NULL, version INTEGER NOT NULL, created_at REAL NOT NULL, "
+                    "fingerprint TEXT NOT NULL, blocks TEXT NOT NULL, result TEXT NOT NULL, "
+                    "stats TEXT NOT NULL, PRIMARY KEY (contract_id, version))"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS contract_blocks ("
+                    "contract_id TEXT NOT NULL, fingerprint TEXT NOT NULL, block_hash TEXT NOT NULL, "
+                    "clauses TEXT NOT NULL, PRIMARY KEY (contract_id, fingerprint, block_hash))"
+                )
+                self._ready = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def latest(self, contract_id: str):
+        """Most recent version as a dict (version, fingerprint, blocks, result), or None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT version, fingerprint, blocks, result FROM contract_versions "
+                "WHERE contract_id = ? ORDER BY version DESC LIMIT 1",
+                (contract_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "version": row[0],
+            "fingerprint": row[1],
+            "blocks": json.loads(row[2]),
+            "result": json.loads(row[3]),
+        }
+
+    def get_blocks(self, contract_id: str, fingerprint: str, block_hashes):
+        """Return {block_hash: clauses} for the hashes that have a stored extraction"""
+        block_hashes = list(block_hashes)
+        found = {}
+        with self._connect() as conn:
+            # Stay under SQLite's bound-parameter limit for very long contracts
+            for start in range(0, len(block_hashes), 500):
+                batch = block_hashes[start:start + 500]
+                rows = conn.execute(
+                    "SELECT block_hash, clauses FROM contract_blocks WHERE contract_id = ? AND fingerprint = ? "
+                    f"AND block_hash IN ({','.join('?' * len(batch))})",
+                    (contract_id, fingerprint, *batch),
+                ).fetchall()
+                found.update((block_hash, json.loads(clauses)) for block_hash, clauses in rows)
+        return found
+
+    def add_version(self, contract_id: str, fingerprint: str, blocks, block_results, result, stats):
+        """
+        Record a new version and the extraction of its new blocks.
+
+        Args:
+            blocks: This version's blocks as {hash, sections} dicts, in document order
+            block_results: {block_hash: clauses} to store (failed extractions should be left out)
+            result: The merged review
+            stats: Diff statistics returned alongside the review
+
+        Returns:
+            The new version number (1 for the first upload)
+        """
+        with self._lock, self._connect() as conn:
+            # Take the write lock up front so concurrent uploads can't claim the same version number
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO contract_blocks (contract_id, fingerprint, block_hash, clauses) "
+                "VALUES (?, ?, ?, ?)",
+                [(contract_id, fingerprint, h, json.dumps(c)) for h, c in block_results.items()],
+            )
+            (version,) = conn.execute(
+                "SELECT COALESCE(MAX(version), 0) + 1 FROM contract_versions WHERE contract_id = ?",
+                (contract_id,),
+            ).fetchone()
+            conn.execute(
+                "INSERT INTO contract_versions (contract_id, version, created_at, fingerprint, blocks, result, stats) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (contract_id, version, time.time(), fingerprint, json.dumps(blocks), json.dumps(result),
+                 json.dumps(stats)),
+            )
+        return version
+
+    def list_versions(self, contract_id: str):
+        """Version number, timestamp and diff statistics of every stored version, oldest first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT version, created_at, stats FROM contract_versions WHERE contract_id = ? ORDER BY version",
+                (contract_id,),
+            ).fetchall()
+        return [{"version": v, "created_at": created_at, **json.loads(stats)} for v, created_at, stats in rows]
+
+
+contract_versions = ContractVersionStore(settings.CONTRACT_VERSIONS_PATH)
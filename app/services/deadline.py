@@ -0,0 +1,116 @@
+"""Per-review deadlines and cancellation, carried to every stage and LLM call through a context variable"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from app.config import settings
+from app.metrics import REVIEWS_CUT_SHORT
+
+_current = contextvars.ContextVar("review_deadline", default=None)
+
+
+class ReviewCancelled(Exception):
+    """Raised in place of an LLM call once the review's deadline has passed or its client went away"""
+
+    def __init__(self, reason="deadline"):
+        super().__init__(
+            "Review deadline exceeded" if reason == "deadline" else "Client disconnected - review cancelled"
+        )
+        self.reason = reason
+
+
+class PartialReview(Exception):
+    """
+    A review cut off by its deadline; ``result`` has the stages that finished.
+
+    Raised rather than returned inside the review so single-flight hands the review to a
+    waiter (which has its own deadline) instead of sharing it, and the review cache
+    doesn't keep it.
+    """
+
+    def __init__(self, result):
+        super().__init__("Review deadline exceeded")
+        self.result = result
+
+
+class Deadline:
+    """
+    Time budget for one review, shared by its stages and worker threads.
+
+    ``cancel()`` ends it early (e.g. when the client disconnects). Asyncio stages are
+    bounded by ``remaining()``; sync LLM calls check it before starting, so work already
+    in flight on a thread finishes but nothing new is sent.
+    """
+
+    def __init__(self, seconds=None):
+        self.expires_at = time.monotonic() + seconds if seconds else None
+        self.reason = None
+        self._cancelled = threading.Event()
+
+    def remaining(self):
+        """Seconds left (0 once cancelled or expired), or None without a time limit"""
+        if self._cancelled.is_set():
+            return 0.0
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.remaining() == 0.0
+
+    def cancel(self, reason="disconnected"):
+        """End the review's budget now; the first reason given wins"""
+        if not self._cancelled.is_set():
+            self.reason = reason
+            self._cancelled.set()
+            REVIEWS_CUT_SHORT.labels(reason).inc()
+
+    def check(self):
+        """
+        Raises:
+            ReviewCancelled: If the deadline has passed or the review was cancelled
+        """
+        if self.expired:
+            # Record the expiry once, so metrics and ``reason`` see it even if nothing cancelled it
+            self.cancel("deadline")
+            raise ReviewCancelled(self.reason)
+
+
+def new_deadline(seconds=None):
+    """
+    A deadline ``seconds`` from now (default: REVIEW_DEADLINE_SECONDS; 0 means no time limit).
+
+    A caller's tighter budget wins: ``seconds`` above REVIEW_DEADLINE_SECONDS is capped.
+    """
+    limit = settings.REVIEW_DEADLINE_SECONDS
+    if seconds is None or (limit and seconds > limit):
+        seconds = limit
+    return Deadline(seconds)
+
+
+def current_deadline():
+    """The deadline of the review running in this context, or None"""
+    return _current.get()
+
+
+@contextmanager
+def deadline_scope(deadline):
+    """
+    Bound every LLM call made inside the block by ``deadline``.
+
+    Asyncio tasks inherit it; worker threads do when their work is submitted through
+    ``contextvars.copy_context().run``.
+    """
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def check_deadline():
+    """Raise ReviewCancelled if the current review's deadline has passed (no-op outside a review)"""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check()
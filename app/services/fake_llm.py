@@ -0,0 +1,281 @@
+"""Deterministic local chat model for benchmarks and tests (LLM_PROVIDER=fake)"""
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from app.services.rate_limiter import SharedTokenBuckets
+
+
+# Keywords the fake "finds" for each clause type when answering an extraction prompt
+CLAUSE_HINTS = {
+    "termination": ("terminat",),
+    "confidentiality": ("confidential", "non-disclosure", "proprietary", "trade secret"),
+    "payment_terms": ("payment", "invoice", "fees", "payable", "compensation"),
+    "liability": ("liabilit", "indemn", "warrant"),
+    "governing_law": ("governed by", "governing law", "arbitration", "jurisdiction"),
+}
+HIGH_RISK_HINTS = ("unlimited", "may not terminate", "perpetuity", "automatically renew", "without warranties")
+LOW_RISK_HINTS = ("mutual", "either party", "reasonable", "thirty (30) days", "net 30")
+CHARS_PER_TOKEN = 4
+# Answers a noisy fake gives instead of the right one: some look unsure, some are silently wrong
+HEDGED_CLAUSE = "The contract may address this, but the terms appear unclear."
+HEDGED_VERDICT = "Medium Risk: possibly acceptable, but the terms are unclear"
+FLIPPED_LEVEL = {"High": "Low", "Medium": "High", "Low": "High"}
+# Ways a malformed response is broken; with JSON mode requested only truncation can happen
+MALFORMED_KINDS = ("fenced", "truncated", "prose", "trailing_comma")
+
+
+def malform_json(text: str, rng: random.Random, kind=None):
+    """Break a JSON response the way LLMs do (one of MALFORMED_KINDS; random if not given)"""
+    kind = kind or rng.choice(MALFORMED_KINDS)
+    if kind == "fenced":
+        return f"Here is the JSON:\n```json\n{text}\n```"
+    if kind == "truncated":
+        return text[: max(1, int(len(text) * rng.uniform(0.5, 0.9)))]
+    if kind == "prose":
+        return f"Sure! {text} Let me know if you need anything else."
+    return text[:-1] + ",}"
+
+
+class FakeRateLimitError(Exception):
+    """A provider 429, shaped like the Groq SDK's RateLimitError (status_code, response headers)"""
+
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit reached. Please try again in {retry_after:.2f}s")
+        self.response = httpx.Response(429, headers={"retry-after": f"{retry_after:.2f}"})
+
+
+# Simulated provider budgets, one per (requests, tokens, burst) setting, shared by every fake instance
+_server_budgets = {}
+_server_lock = threading.Lock()
+
+
+def reset_fake_server():
+    """Refill the simulated provider budgets"""
+    with _server_lock:
+        _server_budgets.clear()
+
+
+def _server_admit(requests_per_minute, tokens_per_minute, burst, tokens):
+    if not (requests_per_minute or tokens_per_minute):
+        return
+    with _server_lock:
+        key = (requests_per_minute, tokens_per_minute, burst)
+        budget = _server_budgets.get(key)
+        if budget is None:
+            budget = _server_budgets[key] = SharedTokenBuckets("", requests_per_minute, tokens_per_minute, burst)
+    wait = budget.take(tokens)
+    if wait:
+        raise FakeRateLimitError(wait)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Answers the pipeline's prompts locally with plausible, deterministic output.
+
+    The same prompt always produces the same response. Latency is
+    ``latency + completion_tokens / tokens_per_second``, and ``malformed_rate``
+    of responses are deliberately broken (fenced, truncated or prose-wrapped JSON).
+    When called with ``response_format={"type": "json_object"}``, as JSON mode does,
+    the only breakage is truncation, as with a real provider hitting its token limit.
+
+    With ``requests_per_minute`` / ``tokens_per_minute`` set, calls over budget fail
+    immediately with FakeRateLimitError (a 429 carrying retry-after), like Groq does;
+    ``burst_seconds`` is how much of a minute's budget can be spent at once.
+
+    ``noise`` is the fraction of clauses answered wrongly, as a small model might:
+    a third missed ("not_found"), a third hedged and a third silently wrong.
+    """
+
+    model_name: str = "fake-contract-model"
+    latency: float = 0.0
+    tokens_per_second: float = 0.0
+    malformed_rate: float = 0.0
+    seed: int = 0
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+    burst_seconds: float = 60.0
+    noise: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-contract"
+
+    def _rng(self, prompt: str):
+        digest = hashlib.sha256(f"{self.seed}:{self.model_name}:{prompt}".encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    @staticmethod
+    def _prompt_text(messages: List[BaseMessage]):
+        return "\n".join(str(message.content) for message in messages)
+
+    @staticmethod
+    def _json_mode(kwargs):
+        return (kwargs.get("response_format") or {}).get("type") == "json_object"
+
+    def _answer(self, prompt: str, json_mode=False):
+        rng = self._rng(prompt)
+        if "clause types from the contract and classify" in prompt:
+            clauses = self._extract(prompt)
+            text = json.dumps({"clauses": clauses, "risks": self._classify_clauses(clauses, prompt)})
+        elif "clause types from the contract" in prompt:
+            text = json.dumps(self._extract(prompt))
+        elif "Classify each contract clause" in prompt:
+            text = json.dumps(self._classify(prompt))
+        else:
+            text = self._revise(prompt)
+
+        if text.startswith("{") and rng.random() < self.malformed_rate:
+            text = malform_json(text, rng, "truncated" if json_mode else None)
+        return text
+
+    @staticmethod
+    def _section_after(prompt: str, marker: str):
+        index = prompt.rfind(marker)
+        return prompt[index + len(marker):] if index != -1 else prompt
+
+    def _mistake(self, prompt: str, key: str):
+        """None for a correct answer, else "missed", "hedged" or "wrong" (see ``noise``)"""
+        if not self.noise:
+            return None
+        draw = self._rng(f"{prompt}:{key}").random()
+        if draw >= self.noise:
+            return None
+        return ("missed", "hedged", "wrong")[min(2, int(3 * draw / self.noise))]
+
+    def _extract(self, prompt: str):
+        contract = self._section_after(prompt, "Contract:")
+        sentences = re.split(r"(?<=[.;])\s+", contract)
+        result = {}
+        for clause_type, hints in CLAUSE_HINTS.items():
+            index = next((i for i, s in enumerate(sentences) if any(h in s.lower() for h in hints)), None)
+            mistake = self._mistake(contract, clause_type) if index is not None else None
+            if mistake == "wrong":
+                # The sentence before the clause instead of the clause itself
+                index = index - 1 if index else min(1, len(sentences) - 1)
+            if index is None or mistake == "missed":
+                result[clause_type] = "not_found"
+            elif mistake == "hedged":
+                result[clause_type] = HEDGED_CLAUSE
+            else:
+                result[clause_type] = " ".join(sentences[index].split())[:300]
+        return result
+
+    def _classify(self, prompt: str):
+        clauses_text = self._section_after(prompt, "Clauses:")
+        try:
+            clauses = json.loads(clauses_text.strip())
+        except json.JSONDecodeError:
+            clauses = {}
+        return self._classify_clauses(clauses, prompt)
+
+    def _classify_clauses(self, clauses, prompt=""):
+        risks = {}
+        for name, value in clauses.items() if isinstance(clauses, dict) else []:
+            if name in ("error", "raw_response"):
+                continue
+            text = str(value).lower()
+            if text == "not_found":
+                risks[name] = "Medium Risk: clause is missing from the contract"
+            elif any(h in text for h in HIGH_RISK_HINTS):
+                risks[name] = "High Risk: one-sided or open-ended obligation"
+            elif any(h in text for h in LOW_RISK_HINTS):
+                risks[name] = "Low Risk: balanced, standard terms"
+            else:
+                risks[name] = "Medium Risk: some unfavorable terms, needs monitoring"
+            mistake = self._mistake(prompt, name)
+            if mistake == "hedged":
+                risks[name] = HEDGED_VERDICT
+            elif mistake:
+                level, reason = risks[name].split(" Risk", 1)
+                risks[name] = f"{FLIPPED_LEVEL[level]} Risk{reason}"
+        return risks
+
+    def _revise(self, prompt: str):
+        clauses_text = self._section_after(prompt, "Clauses:")
+        names = re.findall(r'"([a-z_]+)"\s*:', clauses_text)[:5] or ["contract"]
+        lines = [
+            "EXECUTIVE SUMMARY: The agreement is broadly workable but several provisions shift risk "
+            "to one party and should be tightened before signature.",
+            "",
+            "HIGH PRIORITY:",
+        ]
+        for name in names:
+            title = name.replace("_", " ").title()
+            lines.append(f"• {title}: Terms are broad. Narrow the obligation and add a cap. Limits exposure.")
+        lines += ["", "MEDIUM PRIORITY:", "• Notices: Add email notice. Speeds up communication."]
+        return "\n".join(lines)
+
+    def _admit(self, prompt: str, completion: str):
+        tokens = (len(prompt) + len(completion)) // CHARS_PER_TOKEN
+        _server_admit(self.requests_per_minute, self.tokens_per_minute, self.burst_seconds, tokens)
+
+    def _delay(self, completion: str):
+        delay = self.latency
+        if self.tokens_per_second > 0:
+            delay += (len(completion) / CHARS_PER_TOKEN) / self.tokens_per_second
+        return delay
+
+    def _message(self, prompt: str, completion: str):
+        usage = {
+            "input_tokens": max(1, len(prompt) // CHARS_PER_TOKEN),
+            "output_tokens": max(1, len(completion) // CHARS_PER_TOKEN),
+        }
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        return AIMessage(content=completion, usage_metadata=usage)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        prompt = self._prompt_text(messages)
+        completion = self._answer(prompt, self._json_mode(kwargs))
+        self._admit(prompt, completion)
+        time.sleep(self._delay(completion))
+        return ChatResult(generations=[ChatGeneration(message=self._message(prompt, completion))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        prompt = self._prompt_text(messages)
+        completion = self._answer(prompt, self._json_mode(kwargs))
+        self._admit(prompt, completion)
+        await asyncio.sleep(self._delay(completion))
+        return ChatResult(generations=[ChatGeneration(message=self._message(prompt, completion))])
+
+    @staticmethod
+    def _pieces(completion: str):
+        return re.findall(r"\S+\s*|\s+", completion)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        prompt = self._prompt_text(messages)
+        completion = self._answer(prompt, self._json_mode(kwargs))
+        self._admit(prompt, completion)
+        time.sleep(self.latency)
+        for piece in self._pieces(completion):
+            if self.tokens_per_second > 0:
+                time.sleep((len(piece) / CHARS_PER_TOKEN) / self.tokens_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="", usage_metadata=self._message(prompt, completion).usage_metadata))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        prompt = self._prompt_text(messages)
+        completion = self._answer(prompt, self._json_mode(kwargs))
+        self._admit(prompt, completion)
+        await asyncio.sleep(self.latency)
+        for piece in self._pieces(completion):
+            if self.tokens_per_second > 0:
+                await asyncio.sleep((len(piece) / CHARS_PER_TOKEN) / self.tokens_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="", usage_metadata=self._message(prompt, completion).usage_metadata))
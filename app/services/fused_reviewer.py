@@ -0,0 +1,202 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from app.config import settings
+from app.metrics import JSON_PARSE_FALLBACKS, JSON_REPAIRS, observe_stage
+from app.models.agent_models import ClauseSet, RiskMap
+from app.services.clause_extractor import CLAUSE_KEYS, merge_clause_results, split_into_chunks
+from app.services.json_repair import repair_json
+from app.services.llm_factory import ainvoke_llm, invoke_llm, record_partial_response, response_text
+from app.services.model_cascade import (
+    escalation_source,
+    merge_escalated,
+    record_escalations,
+    uncertain_clauses,
+    uncertain_verdicts,
+)
+from app.services.risk_classifier import normalize_risk_level
+from app.services.section_index import select_clause_spans
+
+# LLM is created lazily on first use (see llm_factory.get_llm)
+SERVICE = "fused_reviewer"
+TEMPERATURE = 0.1  # Lower temperature for more consistent, factual responses
+
+
+FUSED_PROMPT = """Extract these 5 clause types from the contract and classify the risk of each. Return ONLY valid JSON, no markdown.
+
+TERMINATION: termination conditions, notice periods, consequences, automatic triggers
+CONFIDENTIALITY: NDA obligations, confidential info definition, duration, exceptions
+PAYMENT_TERMS: amounts, schedules, due dates, late fees, currency, payment method
+LIABILITY: liability caps, indemnification, warranties, damage limits, insurance
+GOVERNING_LAW: jurisdiction, applicable law, dispute resolution (arbitration/courts)
+
+Use "not_found" if a clause type is missing. Extract actual provisions, not just mentions.
+
+HIGH RISK: unlimited liability, no termination rights, excessive penalties, one-sided terms, ambiguous language, regulatory violations
+MEDIUM RISK: moderate exposure, some unfavorable terms, minor concerns, needs monitoring
+LOW RISK: standard practices, balanced terms, clear language, minimal exposure
+
+{{
+  "clauses": {{
+    "termination": "summary or 'not_found'",
+    "confidentiality": "summary or 'not_found'",
+    "payment_terms": "summary or 'not_found'",
+    "liability": "summary or 'not_found'",
+    "governing_law": "summary or 'not_found'"
+  }},
+  "risks": {{
+    "clause_name": "High Risk: reason" | "Medium Risk: reason" | "Low Risk: reason"
+  }}
+}}
+
+Contract:
+{content}"""
+
+# Higher is more severe; used to keep the most cautious verdict when chunks disagree
+RISK_SEVERITY = {"high": 3, "medium": 2, "low": 1}
+
+
+def _parse_response(response):
+    """
+    Split a fused response into (clauses, risks), repairing malformed JSON locally.
+
+    A response truncated inside "risks" keeps the clauses and the verdicts that arrived.
+    """
+    response = response_text(response)
+    try:
+        data, status = repair_json(response)
+        clauses = ClauseSet.model_validate(data["clauses"]).model_dump()
+        risks = RiskMap.model_validate(data.get("risks") or {}).model_dump()
+    except (ValueError, KeyError):
+        JSON_PARSE_FALLBACKS.labels(SERVICE).inc()
+        error = {"error": "Failed to parse JSON response", "raw_response": response}
+        return {**error, **{key: "not_found" for key in CLAUSE_KEYS}}, dict(error)
+    if status != "clean":
+        JSON_REPAIRS.labels(SERVICE, status).inc()
+    if status == "partial":
+        record_partial_response()
+    return clauses, risks
+
+
+def _severity(verdict):
+    return RISK_SEVERITY.get(normalize_risk_level(verdict), 0)
+
+
+def merge_fused_results(results):
+    """
+    Reduce per-chunk (clauses, risks) pairs into one pair.
+
+    Clauses are merged as in chunked extraction; each clause keeps the most
+    severe risk verdict given by any chunk that found it.
+    """
+    parsed = [(c, r) for c, r in results if "error" not in c and "error" not in r]
+    if not parsed:
+        return results[0]
+    if len(parsed) < len(results):
+        # A chunk that failed to parse leaves the review incomplete (see merge_clause_results)
+        record_partial_response()
+
+    clauses = merge_clause_results([c for c, _ in parsed])
+    risks = {}
+    for key in clauses:
+        verdicts = [r[key] for c, r in parsed if key in r and c.get(key) not in (None, "not_found")]
+        verdicts = verdicts or [r[key] for _, r in parsed if key in r]
+        if verdicts:
+            risks[key] = max(verdicts, key=_severity)
+    return clauses, risks
+
+
+def _review_single(content: str, model=None):
+    prompt = FUSED_PROMPT.format(content=content)
+    response = invoke_llm(SERVICE, prompt, TEMPERATURE, model=model, json_mode=True)
+    with observe_stage("json_parse"):
+        return _parse_response(response)
+
+
+async def _areview_single(content: str, model=None):
+    prompt = FUSED_PROMPT.format(content=content)
+    response = await ainvoke_llm(SERVICE, prompt, TEMPERATURE, model=model, json_mode=True)
+    with observe_stage("json_parse"):
+        return _parse_response(response)
+
+
+def _prepare(content: str, mode=None):
+    if (mode or settings.CLAUSE_EXTRACTION_MODE) == "targeted":
+        content = select_clause_spans(content)
+    return split_into_chunks(content, settings.CLAUSE_CHUNK_SIZE, settings.CLAUSE_CHUNK_OVERLAP)
+
+
+def _review(content: str, mode=None, model=None):
+    chunks = _prepare(content, mode)
+    if len(chunks) == 1:
+        return _review_single(chunks[0], model)
+
+    workers = min(len(chunks), settings.CLAUSE_CHUNK_CONCURRENCY)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, _review_single, chunk, model) for chunk in chunks]
+        return merge_fused_results([future.result() for future in futures])
+
+
+async def _areview(content: str, mode=None, model=None):
+    chunks = _prepare(content, mode)
+    if len(chunks) == 1:
+        return await _areview_single(chunks[0], model)
+
+    semaphore = asyncio.Semaphore(settings.CLAUSE_CHUNK_CONCURRENCY)
+
+    async def run(chunk):
+        async with semaphore:
+            return await _areview_single(chunk, model)
+
+    return merge_fused_results(await asyncio.gather(*(run(chunk) for chunk in chunks)))
+
+
+def _escalation(content: str, clauses, risks, mode=None):
+    """(keys, source, mode) for re-running low-confidence clause types on the large model, or None"""
+    if not settings.MODEL_CASCADE_ENABLED:
+        return None
+    found = [key for key in clauses if key not in ("error", "raw_response")]
+    verdicts = uncertain_verdicts(risks, found)
+    unsure = set(uncertain_clauses(clauses, content)) | set(found if verdicts is None else verdicts)
+    keys = [key for key in CLAUSE_KEYS if key in unsure] + sorted(unsure - set(CLAUSE_KEYS))
+    if not keys:
+        return None
+    record_escalations(SERVICE, keys)
+    source = escalation_source(content, keys, CLAUSE_KEYS)
+    # Sections picked for the uncertain clause types are already targeted
+    return keys, source, mode if source is content else "full"
+
+
+def _merge_escalation(first, second, keys):
+    return merge_escalated(first[0], second[0], keys), merge_escalated(first[1], second[1], keys)
+
+
+def extract_and_classify(content: str, mode=None):
+    """
+    Extract the five clause types and classify their risk in a single LLM call.
+
+    Long contracts are split into chunks exactly as in extract_clauses, one
+    fused call per chunk. With MODEL_CASCADE_ENABLED, clause types with an
+    unsure extraction or verdict are reviewed again on CASCADE_LARGE_MODEL.
+
+    Returns:
+        (clauses, risks) dicts in the same shape as extract_clauses / classify_risks
+    """
+    with observe_stage("extract_and_classify"):
+        result = _review(content, mode)
+        escalation = _escalation(content, *result, mode)
+        if escalation:
+            keys, source, source_mode = escalation
+            result = _merge_escalation(result, _review(source, source_mode, settings.CASCADE_LARGE_MODEL), keys)
+        return result
+
+
+async def aextract_and_classify(content: str, mode=None):
+    """Async variant of extract_and_classify"""
+    with observe_stage("extract_and_classify"):
+        result = await _areview(content, mode)
+        escalation = _escalation(content, *result, mode)
+        if escalation:
+            keys, source, source_mode = escalation
+            result = _merge_escalation(result, await _areview(source, source_mode, settings.CASCADE_LARGE_MODEL), keys)
+        return result
@@ -0,0 +1,250 @@
+"""Single-pass repair of LLM JSON output (fences, surrounding prose, trailing commas, truncation)"""
+import json
+import re
+
+# A backslash escape cut off at the end of a truncated string
+INCOMPLETE_ESCAPE_RE = re.compile(r"\\(?:u[0-9a-fA-F]{0,3})?$")
+CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+CLOSERS = {"{": "}", "[": "]"}
+# A run of string characters that need no special handling, consumed in one step
+STRING_RUN_RE = re.compile(r'[^"\\\x00-\x1f]+')
+_decoder = json.JSONDecoder()
+# Python literals some models write inside JSON
+PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+class IncrementalJSONParser:
+    """
+    Read the first JSON object in LLM output, one chunk at a time, in a single pass.
+
+    Text before the object (prose, a ```json fence) and after it is ignored, trailing
+    and missing commas are fixed, and raw newlines inside strings are escaped. At any
+    point ``value()`` returns what has arrived so far as a complete object: an open
+    string value is closed, a half-written key or literal is dropped and open brackets
+    are closed, so a response cut off by the token limit still yields every finished field.
+    """
+
+    def __init__(self):
+        self._out = []
+        self._length = 0
+        # One [bracket, expecting] per open container; expecting is key/colon/value/comma
+        self._stack = []
+        self._in_string = False
+        self._string_is_key = False
+        self._escape = False
+        # Characters of the number / true / false / null being read, or None
+        self._literal = None
+        self._pending_comma = False
+        # (output length, closing brackets) after the last complete value
+        self._safe = (0, "")
+        self.started = False
+        self.done = False
+        self.broken = False
+        self.repaired = False
+
+    @property
+    def status(self):
+        """"clean", "repaired" (syntax fixed) or "partial" (cut off, or unreadable past some point)"""
+        if self.broken or not self.done:
+            return "partial"
+        return "repaired" if self.repaired else "clean"
+
+    def _closers(self):
+        return "".join(CLOSERS[bracket] for bracket, _ in reversed(self._stack))
+
+    def _append(self, text):
+        self._out.append(text)
+        self._length += len(text)
+
+    def _emit(self, text):
+        if self._pending_comma:
+            self._append(",")
+            self._pending_comma = False
+        self._append(text)
+
+    def _complete_value(self):
+        if not self._stack:
+            self.done = True
+            return
+        self._stack[-1][1] = "comma"
+        self._safe = (self._length, self._closers())
+
+    def feed(self, text: str):
+        """Consume the next chunk of the response"""
+        i, end = 0, len(text)
+        while i < end and not (self.done or self.broken):
+            if not self.started:
+                i = text.find("{", i)
+                if i == -1:
+                    return
+                self.started = True
+                self._open("{")
+                i += 1
+                continue
+            if self._in_string and not self._escape:
+                run = STRING_RUN_RE.match(text, i)
+                if run:
+                    self._append(run.group())
+                    i = run.end()
+                    continue
+            ch = text[i]
+            i += 1
+            if self._in_string:
+                self._string_char(ch)
+            else:
+                self._structural_char(ch)
+
+    def _string_char(self, ch):
+        if self._escape:
+            self._escape = False
+            self._append(ch)
+        elif ch == "\\":
+            self._escape = True
+            self._append(ch)
+        elif ch == '"':
+            self._append(ch)
+            self._in_string = False
+            if self._string_is_key:
+                self._stack[-1][1] = "colon"
+            else:
+                self._complete_value()
+        elif ch < " ":
+            self.repaired = True
+            self._append(CONTROL_ESCAPES.get(ch, f"\\u{ord(ch):04x}"))
+        else:
+            self._append(ch)
+
+    def _open(self, ch):
+        self._emit(ch)
+        self._stack.append([ch, "key" if ch == "{" else "value"])
+        self._safe = (self._length, self._closers())
+
+    def _structural_char(self, ch):
+        if self._literal is not None:
+            if not (ch.isspace() or ch in ",:}]"):
+                self._literal.append(ch)
+                return
+            self._end_literal()
+            if self.broken:
+                return
+        if ch.isspace():
+            return
+
+        bracket, expecting = self._stack[-1]
+        if ch == ",":
+            if expecting == "comma":
+                self._pending_comma = True
+                self._stack[-1][1] = "key" if bracket == "{" else "value"
+            else:
+                self.repaired = True  # doubled comma
+        elif ch in "}]":
+            if CLOSERS[bracket] != ch or expecting in ("colon", "value") and bracket == "{":
+                self.broken = True
+                return
+            if self._pending_comma:
+                self._pending_comma = False
+                self.repaired = True
+            self._stack.pop()
+            self._append(ch)
+            self._complete_value()
+        elif ch == ":":
+            if expecting != "colon":
+                self.broken = True
+                return
+            self._append(ch)
+            self._stack[-1][1] = "value"
+        else:
+            if expecting == "comma":
+                # Two values with no comma between them
+                self.repaired = True
+                self._pending_comma = True
+                expecting = self._stack[-1][1] = "key" if bracket == "{" else "value"
+            if ch == '"':
+                self._string_is_key = expecting == "key"
+                self._in_string = True
+                self._emit(ch)
+            elif expecting != "value":
+                self.broken = True
+            elif ch in "{[":
+                self._open(ch)
+            else:
+                self._emit("")
+                self._literal = [ch]
+
+    def _end_literal(self):
+        token = "".join(self._literal)
+        self._literal = None
+        if token in PYTHON_LITERALS:
+            token = PYTHON_LITERALS[token]
+            self.repaired = True
+        try:
+            json.loads(token)
+        except json.JSONDecodeError:
+            # An unquoted word - nothing after this point can be trusted
+            self.broken = True
+            return
+        self._append(token)
+        self._complete_value()
+
+    def value(self):
+        """
+        The object received so far, completed as described above.
+
+        Returns:
+            The parsed object, or None if no object has started yet
+
+        Raises:
+            ValueError: If the object received so far cannot be completed
+        """
+        if not self.started:
+            return None
+        text = "".join(self._out)
+        if self.done:
+            candidates = [text]
+        else:
+            candidates = []
+            expecting = self._stack[-1][1]
+            if self.broken:
+                pass
+            elif self._in_string and not self._string_is_key:
+                candidates.append(INCOMPLETE_ESCAPE_RE.sub("", text) + '"' + self._closers())
+            elif self._literal is None and not self._in_string and expecting in ("key", "value", "comma"):
+                # A literal still being read is dropped: "3" may be the start of "30"
+                candidates.append(text + self._closers())
+            length, closers = self._safe
+            candidates.append(text[:length] + closers)
+        for candidate in candidates:
+            try:
+                return json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+        raise ValueError("Response contains no valid JSON object")
+
+
+def repair_json(text: str):
+    """
+    Parse the first JSON object in ``text``, repairing it as IncrementalJSONParser does.
+
+    Returns:
+        (object, status) - status as in IncrementalJSONParser.status
+
+    Raises:
+        ValueError: If there is no usable JSON object
+    """
+    text = str(text)
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("Response contains no JSON object")
+    # Well-formed objects (however much prose or fencing surrounds them) take the C decoder
+    try:
+        result, _ = _decoder.raw_decode(text, start)
+        if isinstance(result, dict):
+            return result, "clean"
+    except json.JSONDecodeError:
+        pass
+    parser = IncrementalJSONParser()
+    parser.feed(text[start:])
+    result = parser.value()
+    if not isinstance(result, dict):
+        raise ValueError("Response JSON is not an object")
+    return result, parser.status
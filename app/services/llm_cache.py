@@ -0,0 +1,217 @@
+"""Call-level memoization of LLM responses (zlib-compressed SQLite, least recently used evicted)"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from app.config import settings
+from app.metrics import LLM_CACHE_LOOKUPS
+from app.services.review_cache import make_cache_key
+
+# A hit refreshes its entry's last use at most this often, so hot entries don't turn every read into a write
+TOUCH_INTERVAL = 60.0
+# Evict this share below max_entries at once, so the next few inserts don't each pay for an eviction
+EVICT_SLACK = 0.1
+
+
+def call_key(prompt: str, model: str, temperature, json_mode=False):
+    """
+    Key for one LLM call: the whitespace-normalized prompt, model, temperature and JSON mode.
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    return make_cache_key(prompt, model, temperature, bool(json_mode))
+
+
+class LLMResponseCache:
+    """
+    Responses of earlier LLM calls, keyed by call_key.
+
+    Sits below the review cache: two different contracts whose extractions agree send
+    the same classification and revision prompts, and a re-review after the review cache
+    expired resends the same extraction prompts. Entries are zlib-compressed JSON in one
+    SQLite file shared by every worker on the host; past ``max_entries`` the least
+    recently used are evicted, and entries older than ``ttl`` seconds are ignored.
+    """
+
+    def __init__(self, path="", max_entries=20000, ttl=0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # service -> [hits, misses, tokens saved] in this process
+        self.lookups = {}
+        self.stored = 0
+        self._entries = None
+        self._lock = threading.Lock()
+        self._ready = False
+
+    @contextmanager
+    def _connect(self):
+        if not self._ready:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            if not self._ready:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "key TEXT PRIMARY KEY, service TEXT NOT NULL, value BLOB NOT NULL, "
+                    "size INTEGER NOT NULL, created_at REAL NOT NULL, used_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_used ON llm_cache (used_at)")
+                self._ready = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _record(self, service, entry):
+        LLM_CACHE_LOOKUPS.labels(service, "miss" if entry is None else "hit").inc()
+        with self._lock:
+            counts = self.lookups.setdefault(service, [0, 0, 0])
+            if entry is None:
+                counts[1] += 1
+            else:
+                usage = entry.get("usage") or {}
+                counts[0] += 1
+                counts[2] += (usage.get("input_tokens") or 0) + (usage.get("output_tokens") or 0)
+
+    def get(self, service: str, key: str):
+        """
+        The cached response for ``key``, or None.
+
+        Returns:
+            (text, usage) - usage as reported for the original call
+        """
+        try:
+            now = time.time()
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value, created_at, used_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and self.ttl > 0 and now - row[1] > self.ttl:
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    row = None
+                if row and now - row[2] > TOUCH_INTERVAL:
+                    conn.execute("UPDATE llm_cache SET used_at = ? WHERE key = ?", (now, key))
+            entry = json.loads(zlib.decompress(row[0])) if row else None
+        except (sqlite3.Error, zlib.error, ValueError):
+            # Best-effort: a broken cache only costs the LLM call
+            entry = None
+        self._record(service, entry)
+        return (entry["text"], entry.get("usage")) if entry else None
+
+    def set(self, service: str, key: str, text: str, usage=None):
+        """Store a response, evicting the least recently used entries past ``max_entries``"""
+        now = time.time()
+        try:
+            value = zlib.compress(json.dumps({"text": text, "usage": usage or None}).encode("utf-8"))
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, service, value, size, created_at, used_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, service, value, len(value), now, now),
+                )
+                with self._lock:
+                    self.stored += 1
+                    if self._entries is None:
+                        self._entries = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+                    else:
+                        self._entries += 1
+                    evict = self.max_entries > 0 and self._entries > self.max_entries
+                if evict:
+                    self._evict(conn)
+        except (sqlite3.Error, TypeError, ValueError):
+            pass
+
+    def _evict(self, conn):
+        # Other workers insert too, so count again before deleting
+        entries = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        keep = int(self.max_entries * (1 - EVICT_SLACK))
+        if entries > self.max_entries:
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY used_at LIMIT ?)",
+                (entries - keep,),
+            )
+            entries = keep
+        with self._lock:
+            self._entries = entries
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self.lookups.clear()
+            self.stored = 0
+            self._entries = 0
+        if self.path and os.path.exists(self.path):
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM llm_cache")
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        """Hit rates per service (this process) and the size of the shared store"""
+        with self._lock:
+            services = {
+                service: {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 4),
+                    "tokens_saved": saved,
+                }
+                for service, (hits, misses, saved) in sorted(self.lookups.items())
+            }
+            hits = sum(counts[0] for counts in self.lookups.values())
+            lookups = sum(counts[0] + counts[1] for counts in self.lookups.values())
+            stored = self.stored
+        entries = compressed = 0
+        if self.path and os.path.exists(self.path):
+            try:
+                with self._connect() as conn:
+                    entries, compressed = conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+                    ).fetchone()
+            except sqlite3.Error:
+                pass
+        return {
+            "hits": hits,
+            "misses": lookups - hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "stored": stored,
+            "services": services,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "compressed_bytes": compressed,
+            "ttl_seconds": self.ttl,
+            "path": self.path or None,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """The process-wide response cache, or None when LLM_CACHE_ENABLED is off or LLM_CACHE_PATH is empty"""
+    global _cache
+    if not settings.LLM_CACHE_ENABLED or not settings.LLM_CACHE_PATH:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache(
+                settings.LLM_CACHE_PATH, settings.LLM_CACHE_MAX_ENTRIES, settings.LLM_CACHE_TTL
+            )
+        return _cache
+
+
+def reset_llm_cache(cache=None):
+    """Replace the process-wide cache (None: rebuild it from the current settings on next use)"""
+    global _cache
+    with _cache_lock:
+        _cache = cache
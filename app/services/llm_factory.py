@@ -1,30 +1,405 @@
-"""Factory to create LLM instances using Groq"""
+"""Factory and shared registry for Groq LLM instances"""
+import asyncio
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+import httpx
 from app.config import settings
-from langchain_groq import ChatGroq
+from app.metrics import IN_FLIGHT_LLM_CALLS, LLM_CALL_LATENCY, LLM_CALLS, record_llm_usage
+from app.services.deadline import check_deadline
+from app.services.json_repair import repair_json
+from app.services.llm_cache import call_key, get_llm_cache
+from app.services.rate_limiter import get_rate_limiter, rate_limit_retry_after
 
 
-def create_llm(temperature=0.1):
+_lock = threading.Lock()
+_llms = {}
+_http_client = None
+_http_async_client = None
+_override = None
+# Per-review usage totals (see track_llm_usage); None outside a tracked block
+_usage = contextvars.ContextVar("llm_usage", default=None)
+_usage_lock = threading.Lock()
+# Provider JSON mode: the model may only answer with a syntactically valid JSON object
+JSON_RESPONSE_FORMAT = {"type": "json_object"}
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=settings.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+    )
+
+
+def get_http_client():
+    """Process-wide pooled HTTP client shared by every sync LLM call"""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(limits=_limits(), timeout=settings.LLM_TIMEOUT)
+        return _http_client
+
+
+def get_async_http_client():
+    """Process-wide pooled HTTP client shared by every async LLM call"""
+    global _http_async_client
+    with _lock:
+        if _http_async_client is None:
+            _http_async_client = httpx.AsyncClient(limits=_limits(), timeout=settings.LLM_TIMEOUT)
+        return _http_async_client
+
+
+def create_llm(temperature=0.1, model=None):
     """
     Create Groq LLM instance.
-    
+
     Args:
         temperature: Temperature for LLM responses (0.0-1.0)
-        
+        model: Groq model name (default: GROQ_MODEL)
+
     Returns:
-        ChatGroq LLM instance
-        
+        ChatGroq LLM instance using the shared HTTP connection pools
+        (or a FakeChatModel when LLM_PROVIDER is "fake")
+
     Raises:
         ValueError: If GROQ_API_KEY is missing
     """
+    if settings.LLM_PROVIDER == "fake":
+        from app.services.fake_llm import FakeChatModel
+
+        return FakeChatModel(
+            model_name=model or settings.GROQ_MODEL,
+            latency=settings.FAKE_LLM_LATENCY,
+            tokens_per_second=settings.FAKE_LLM_TOKENS_PER_SECOND,
+            malformed_rate=settings.FAKE_LLM_MALFORMED_RATE,
+            requests_per_minute=settings.FAKE_LLM_REQUESTS_PER_MINUTE,
+            tokens_per_minute=settings.FAKE_LLM_TOKENS_PER_MINUTE,
+            # The large cascade model stands in for the accurate one
+            noise=0.0 if model == settings.CASCADE_LARGE_MODEL else settings.FAKE_LLM_NOISE,
+        )
+
     if not settings.GROQ_API_KEY:
         raise ValueError(
             "GROQ_API_KEY not found. Set it in .env file or environment variables. "
             "Get your free API key from: https://console.groq.com/"
         )
-    
+
+    # Imported lazily - langchain_groq is slow to import and isn't needed until the first call
+    from langchain_groq import ChatGroq
+
     return ChatGroq(
-        model=settings.GROQ_MODEL,
+        model=model or settings.GROQ_MODEL,
         groq_api_key=settings.GROQ_API_KEY,
         temperature=temperature,
+        # 429s are retried by the shared rate limiter, which also slows every other call down
+        max_retries=0,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
     )
 
+
+def get_llm(temperature=0.1, model=None, json_mode=False):
+    """
+    Return the shared LLM for (model, temperature), creating it on first use.
+
+    Args:
+        temperature: Temperature for LLM responses (0.0-1.0)
+        model: Model name (default: GROQ_MODEL)
+        json_mode: Bind the provider's JSON mode (only when LLM_JSON_MODE is enabled)
+    """
+    model = model or settings.GROQ_MODEL
+    json_mode = json_mode and settings.LLM_JSON_MODE
+    key = (model, temperature, json_mode)
+    llm = _llms.get(key)
+    if llm is None:
+        if _override is not None:
+            llm = _override(temperature=temperature, model=model) if callable(_override) else _override
+        else:
+            llm = create_llm(temperature=temperature, model=model)
+        if json_mode:
+            llm = llm.bind(response_format=JSON_RESPONSE_FORMAT)
+        with _lock:
+            llm = _llms.setdefault(key, llm)
+    return llm
+
+
+def response_text(response):
+    """Text content of an LLM response or stream chunk"""
+    if hasattr(response, 'content'):
+        response = response.content
+    return str(response)
+
+
+class _CallTracker:
+    """Records latency, outcome and token usage for one LLM call"""
+
+    def __init__(self, service, model, prompt):
+        self.service = service
+        self.model = model
+        self.prompt = prompt
+        self.started = time.perf_counter()
+        self.totals = _usage.get()
+        IN_FLIGHT_LLM_CALLS.labels(service).inc()
+
+    def finish(self, completion="", usage=None, error=None):
+        """Returns (prompt_tokens, completion_tokens) for a successful call"""
+        IN_FLIGHT_LLM_CALLS.labels(self.service).dec()
+        LLM_CALL_LATENCY.labels(self.service, self.model).observe(time.perf_counter() - self.started)
+        if error is not None:
+            outcome = "rate_limited" if rate_limit_retry_after(error) is not None else "error"
+            LLM_CALLS.labels(self.service, self.model, outcome).inc()
+            return None
+        LLM_CALLS.labels(self.service, self.model, "ok").inc()
+        prompt_tokens, completion_tokens = record_llm_usage(
+            self.service, self.model, self.prompt, completion, usage
+        )
+        if self.totals is not None:
+            with _usage_lock:
+                self.totals["llm_calls"] += 1
+                self.totals["prompt_tokens"] += prompt_tokens
+                self.totals["completion_tokens"] += completion_tokens
+        return prompt_tokens, completion_tokens
+
+
+def new_usage():
+    """Empty usage totals, as yielded by track_llm_usage"""
+    return {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "llm_cache_hits": 0, "partial_responses": 0}
+
+
+def record_partial_response():
+    """Count a response whose JSON was cut off or unreadable past some point in the tracked review"""
+    totals = _usage.get()
+    if totals is not None:
+        with _usage_lock:
+            totals["partial_responses"] += 1
+
+
+class _Memo:
+    """Lookup and store of one call in the LLM response cache (see llm_cache); inert when it is off"""
+
+    def __init__(self, service, prompt, model, temperature, json_mode=False):
+        self.service = service
+        self.json_mode = json_mode and settings.LLM_JSON_MODE
+        self.cache = get_llm_cache()
+        self.key = call_key(prompt, model, temperature, self.json_mode) if self.cache else None
+
+    def lookup(self):
+        """The cached response text, or None"""
+        if self.cache is None:
+            return None
+        entry = self.cache.get(self.service, self.key)
+        if entry is None:
+            return None
+        totals = _usage.get()
+        if totals is not None:
+            with _usage_lock:
+                totals["llm_cache_hits"] += 1
+        return entry[0]
+
+    def store(self, text, usage=None):
+        if self.cache is None or not text:
+            return
+        if self.json_mode:
+            # Don't pin a response nothing can be parsed from, or one cut off part way
+            # (usually by the token limit); the next call may do better
+            try:
+                _, status = repair_json(text)
+            except ValueError:
+                return
+            if status == "partial":
+                return
+        self.cache.set(self.service, self.key, text, dict(usage) if usage else None)
+
+
+@contextmanager
+def track_llm_usage():
+    """
+    Sum the calls and tokens of every LLM call made inside the block.
+
+    Asyncio tasks inherit the tracking; worker threads do when their work is
+    submitted through ``contextvars.copy_context().run``.
+
+    Yields:
+        Dict with llm_calls, prompt_tokens, completion_tokens, llm_cache_hits and
+        partial_responses, updated as calls finish
+    """
+    totals = new_usage()
+    token = _usage.set(totals)
+    try:
+        yield totals
+    finally:
+        _usage.reset(token)
+
+
+def invoke_llm(service: str, prompt: str, temperature=0.1, model=None, json_mode=False):
+    """
+    Invoke the shared LLM and record per-service metrics.
+
+    Args:
+        service: Name used to label metrics (e.g. "clause_extractor")
+        prompt: Prompt text
+        temperature: Temperature for LLM responses (0.0-1.0)
+        model: Model name (default: GROQ_MODEL)
+        json_mode: Ask for a JSON object response (see LLM_JSON_MODE); the prompt must mention JSON
+
+    Returns:
+        The raw LLM response (just its text when answered from the LLM response cache)
+
+    Raises:
+        LLMRateLimitError: If the call stays rate limited (see rate_limiter)
+        ReviewCancelled: If the current review's deadline passed or it was cancelled (see deadline)
+    """
+    model = model or settings.GROQ_MODEL
+    memo = _Memo(service, prompt, model, temperature, json_mode)
+    cached = memo.lookup()
+    if cached is not None:
+        return cached
+
+    def call(slot):
+        # The review may have timed out or lost its client while this call waited for admission
+        check_deadline()
+        tracker = _CallTracker(service, model, prompt)
+        try:
+            response = get_llm(temperature, model, json_mode).invoke(prompt)
+        except BaseException as e:
+            tracker.finish(error=e)
+            raise
+        text, usage = response_text(response), getattr(response, "usage_metadata", None)
+        slot.settle(tracker.finish(text, usage))
+        memo.store(text, usage)
+        return response
+
+    return get_rate_limiter().call(service, prompt, call)
+
+
+async def ainvoke_llm(service: str, prompt: str, temperature=0.1, model=None, json_mode=False):
+    """Async variant of invoke_llm"""
+    model = model or settings.GROQ_MODEL
+    memo = _Memo(service, prompt, model, temperature, json_mode)
+    # SQLite may block on another worker's write; keep that off the event loop
+    cached = await asyncio.to_thread(memo.lookup) if memo.cache else None
+    if cached is not None:
+        return cached
+
+    async def call(slot):
+        check_deadline()
+        tracker = _CallTracker(service, model, prompt)
+        try:
+            response = await get_llm(temperature, model, json_mode).ainvoke(prompt)
+        except BaseException as e:
+            tracker.finish(error=e)
+            raise
+        text, usage = response_text(response), getattr(response, "usage_metadata", None)
+        await slot.asettle(tracker.finish(text, usage))
+        await asyncio.to_thread(memo.store, text, usage)
+        return response
+
+    return await get_rate_limiter().acall(service, prompt, call)
+
+
+async def astream_llm(service: str, prompt: str, temperature=0.1, model=None):
+    """
+    Stream text chunks from the shared LLM, recording metrics once the stream ends.
+
+    A 429 is retried only before the first chunk; after that the error is raised. A response
+    found in the LLM response cache is yielded as one chunk; a completed stream is stored there.
+    """
+    model = model or settings.GROQ_MODEL
+    memo = _Memo(service, prompt, model, temperature)
+    cached = await asyncio.to_thread(memo.lookup) if memo.cache else None
+    if cached is not None:
+        yield cached
+        return
+    limiter = get_rate_limiter()
+    attempt = 0
+    while True:
+        async with limiter.aslot(service, prompt) as slot:
+            check_deadline()
+            tracker = _CallTracker(service, model, prompt)
+            parts = []
+            usage = {}
+            try:
+                async for chunk in get_llm(temperature, model).astream(prompt):
+                    # Providers that report streaming usage attach it to one (usually the last) chunk
+                    for key, value in (getattr(chunk, "usage_metadata", None) or {}).items():
+                        if isinstance(value, int):
+                            usage[key] = usage.get(key, 0) + value
+                    text = response_text(chunk)
+                    if text:
+                        parts.append(text)
+                        yield text
+            except Exception as e:
+                tracker.finish(error=e)
+                delay = None if parts else await limiter.aretry_delay(service, e, attempt)
+                if delay is None:
+                    raise
+            except BaseException as e:
+                tracker.finish(error=e)
+                raise
+            else:
+                await slot.asettle(tracker.finish("".join(parts), usage))
+                await asyncio.to_thread(memo.store, "".join(parts), usage)
+                return
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+def set_llm_override(llm):
+    """
+    Route every get_llm call to a substitute model (e.g. a local fake in tests).
+
+    Args:
+        llm: A chat model instance, a factory called as ``llm(temperature=..., model=...)``,
+            or None to go back to Groq
+    """
+    global _override
+    with _lock:
+        _override = llm
+        _llms.clear()
+
+
+def warm_up():
+    """
+    Open pooled connections to the Groq API ahead of the first review.
+
+    Failures are ignored - warming is an optimization, not a health check.
+    """
+    if not settings.GROQ_API_KEY or _override is not None or settings.LLM_PROVIDER != "groq":
+        return
+    try:
+        get_llm()
+        get_http_client().get(
+            f"{settings.GROQ_API_BASE}/openai/v1/models",
+            headers={"Authorization": f"Bearer {settings.GROQ_API_KEY}"},
+        )
+    except Exception:
+        pass
+
+
+async def awarm_up():
+    """Async variant of warm_up for the async connection pool"""
+    if not settings.GROQ_API_KEY or _override is not None or settings.LLM_PROVIDER != "groq":
+        return
+    try:
+        get_llm()
+        await get_async_http_client().get(
+            f"{settings.GROQ_API_BASE}/openai/v1/models",
+            headers={"Authorization": f"Bearer {settings.GROQ_API_KEY}"},
+        )
+    except Exception:
+        pass
+
+
+async def aclose_clients():
+    """Close the shared HTTP pools (called on application shutdown)"""
+    global _http_client, _http_async_client
+    with _lock:
+        client, async_client = _http_client, _http_async_client
+        _http_client = _http_async_client = None
+        _llms.clear()
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        await async_client.aclose()
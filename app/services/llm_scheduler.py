@@ -0,0 +1,214 @@
+"""
+Priority-aware fair scheduling of LLM calls shared by interactive, API and batch traffic.
+
+Every call is made on behalf of a caller: a priority class and a tenant (a Gradio session,
+an API key or client address, a batch job), set with ``llm_caller`` around the work and
+carried to worker threads and asyncio tasks in a context variable. When calls wait for
+rate-limit budget or a concurrency slot (see rate_limiter.FairGate), the FairQueue decides
+who goes next.
+"""
+import contextvars
+import hashlib
+import time
+from collections import deque
+from contextlib import contextmanager
+from app.config import settings
+from app.metrics import LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT
+
+PRIORITIES = ("interactive", "api", "batch")
+# Waits kept per priority class for the percentiles in snapshot()
+WAIT_WINDOW = 1000
+# Tenants listed in snapshot(), busiest first
+TOP_TENANTS = 10
+
+_caller = contextvars.ContextVar("llm_caller", default=("api", "default"))
+
+
+def parse_weights(spec: str):
+    """
+    Parse "interactive=8,api=2,batch=1" into {priority: weight}.
+
+    Raises:
+        ValueError: If a class is unknown or a weight isn't positive
+    """
+    weights = {priority: 1.0 for priority in PRIORITIES}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, value = part.partition("=")
+        name = name.strip().lower()
+        if name not in weights:
+            raise ValueError(f"Unknown priority class {name!r}; expected one of {', '.join(PRIORITIES)}")
+        weight = float(value)
+        if weight <= 0:
+            raise ValueError(f"Weight for {name} must be positive")
+        weights[name] = weight
+    return weights
+
+
+def tenant_id(api_key=None, client=None):
+    """
+    Tenant name for an API caller: a digest of its API key, else its client address.
+
+    The key itself never appears in stats or metrics.
+    """
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+    return f"client:{client}" if client else "default"
+
+
+@contextmanager
+def llm_caller(priority: str, tenant=None):
+    """
+    Schedule every LLM call made inside the block as ``priority`` on behalf of ``tenant``.
+
+    Asyncio tasks inherit it; worker threads do when their work is submitted through
+    ``contextvars.copy_context().run``.
+
+    Raises:
+        ValueError: If priority is not one of PRIORITIES
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+    token = _caller.set((priority, tenant or "default"))
+    try:
+        yield
+    finally:
+        _caller.reset(token)
+
+
+def current_caller():
+    """(priority, tenant) of the LLM calls made in this context (default: API traffic)"""
+    return _caller.get()
+
+
+class _Flow:
+    """A FIFO of waiters plus its start tag in the fair-queueing virtual clock"""
+
+    def __init__(self):
+        self.waiters = deque()
+        self.tag = 0.0
+
+
+class FairQueue:
+    """
+    Waiters for LLM budget or a slot, served by weighted fair queueing in two levels.
+
+    Priority classes share the slots in proportion to their weights (LLM_SCHEDULER_WEIGHTS),
+    so interactive calls overtake queued batch calls while batch still gets its share;
+    within a class, each tenant gets an equal share, so one bulk client can't starve the
+    others. Both levels use start-time fair queueing: a flow that goes idle doesn't bank
+    credit, and an empty queue costs nothing.
+
+    Not thread-safe on its own; the owning FairGate's lock guards every call.
+    """
+
+    def __init__(self, weights=None, name="slot"):
+        # Metric label: what the waiters queue for
+        self.name = name
+        self.weights = dict(weights or parse_weights(settings.LLM_SCHEDULER_WEIGHTS))
+        self.classes = {priority: _Flow() for priority in PRIORITIES}
+        # Per class: tenant -> flow, for tenants with calls waiting
+        self.tenants = {priority: {} for priority in PRIORITIES}
+        self.clock = 0.0
+        self.class_clocks = {priority: 0.0 for priority in PRIORITIES}
+        self.waiting = 0
+        # waiter -> (priority, tenant, enqueued at)
+        self._entries = {}
+        self.admitted = {priority: 0 for priority in PRIORITIES}
+        self.waits = {priority: deque(maxlen=WAIT_WINDOW) for priority in PRIORITIES}
+
+    def __len__(self):
+        return self.waiting
+
+    def push(self, waiter, priority: str, tenant: str):
+        """Queue ``waiter`` (called once it is admitted)"""
+        flow = self.classes[priority]
+        if not flow.waiters:
+            flow.tag = max(flow.tag, self.clock)
+        tenant_flow = self.tenants[priority].get(tenant)
+        if tenant_flow is None:
+            tenant_flow = self.tenants[priority][tenant] = _Flow()
+            tenant_flow.tag = self.class_clocks[priority]
+        tenant_flow.waiters.append(waiter)
+        # The class queue holds one marker per waiting call; the tenant flows hold the calls
+        flow.waiters.append(None)
+        self._entries[waiter] = (priority, tenant, time.monotonic())
+        self.waiting += 1
+        LLM_QUEUE_DEPTH.labels(self.name, priority).inc()
+
+    def pop(self):
+        """The next waiter to admit (the queue must not be empty)"""
+        priority = min(
+            (priority for priority in PRIORITIES if self.classes[priority].waiters),
+            key=lambda priority: self.classes[priority].tag,
+        )
+        flow = self.classes[priority]
+        self.clock = flow.tag
+        flow.tag += 1 / self.weights[priority]
+        flow.waiters.popleft()
+
+        tenants = self.tenants[priority]
+        tenant = min(tenants, key=lambda name: tenants[name].tag)
+        tenant_flow = tenants[tenant]
+        self.class_clocks[priority] = tenant_flow.tag
+        tenant_flow.tag += 1
+        waiter = tenant_flow.waiters.popleft()
+        if not tenant_flow.waiters:
+            del tenants[tenant]
+        _, _, enqueued = self._entries.pop(waiter)
+        self.waiting -= 1
+        LLM_QUEUE_DEPTH.labels(self.name, priority).dec()
+        self.admit(priority, time.monotonic() - enqueued)
+        return waiter
+
+    def remove(self, waiter):
+        """Take a waiter that gave up out of the queue; False if it was already admitted"""
+        entry = self._entries.pop(waiter, None)
+        if entry is None:
+            return False
+        priority, tenant, _ = entry
+        tenant_flow = self.tenants[priority][tenant]
+        tenant_flow.waiters.remove(waiter)
+        if not tenant_flow.waiters:
+            del self.tenants[priority][tenant]
+        self.classes[priority].waiters.popleft()
+        self.waiting -= 1
+        LLM_QUEUE_DEPTH.labels(self.name, priority).dec()
+        return True
+
+    def admit(self, priority: str, waited=0.0):
+        """Record an admission (calls that found a free place are admitted with no wait)"""
+        self.admitted[priority] += 1
+        self.waits[priority].append(waited)
+        LLM_QUEUE_WAIT.labels(self.name, priority).observe(waited)
+
+    def snapshot(self):
+        classes = {}
+        for priority in PRIORITIES:
+            waits = sorted(self.waits[priority])
+
+            def percentile(pct):
+                if not waits:
+                    return 0.0
+                return round(1000 * waits[min(len(waits) - 1, int(pct / 100 * len(waits)))], 1)
+
+            classes[priority] = {
+                "weight": self.weights[priority],
+                "waiting": len(self.classes[priority].waiters),
+                "tenants_waiting": len(self.tenants[priority]),
+                "admitted": self.admitted[priority],
+                "wait_p50_ms": percentile(50),
+                "wait_p99_ms": percentile(99),
+                "wait_max_ms": round(1000 * waits[-1], 1) if waits else 0.0,
+            }
+        busiest = sorted(
+            ((priority, tenant, len(flow.waiters)) for priority in PRIORITIES
+             for tenant, flow in self.tenants[priority].items()),
+            key=lambda item: -item[2],
+        )[:TOP_TENANTS]
+        return {
+            "waiting": self.waiting,
+            "classes": classes,
+            "tenants": [{"priority": p, "tenant": t, "waiting": n} for p, t, n in busiest],
+        }
@@ -0,0 +1,116 @@
+"""Confidence scoring for the small-to-large model cascade (MODEL_CASCADE_ENABLED)"""
+import re
+from app.config import settings
+from app.metrics import CASCADE_ESCALATIONS
+from app.services.section_index import clause_evidence, select_clause_spans
+
+# Phrases a model uses when it isn't sure of its answer
+HEDGE_RE = re.compile(
+    r"\b(?:may|might|possibly|perhaps|unclear|uncertain|appears? to|seems?|ambiguous|"
+    r"not (?:clearly )?(?:specified|stated|defined)|cannot (?:be )?determined?|unable to)\b",
+    re.IGNORECASE,
+)
+# A verdict in the requested "High Risk: reason" form
+VERDICT_RE = re.compile(r"^\s*(?:high|medium|low)\s+risk\s*:\s*\S", re.IGNORECASE)
+# Best section score (see section_index) above which a "not_found" answer is doubtful:
+# a heading naming the clause type, or repeated strong keywords
+EVIDENCE_SCORE = 12
+
+
+def cascade_fingerprint():
+    """The cascade settings that shape a result, for cache keys (empty when the cascade is off)"""
+    if not settings.MODEL_CASCADE_ENABLED:
+        return ""
+    return f"cascade:{settings.CASCADE_LARGE_MODEL}:{settings.CASCADE_CONFIDENCE_THRESHOLD}"
+
+
+def clause_confidence(value, evidence=0):
+    """
+    Score an extracted clause from 0 to 1.
+
+    Args:
+        value: The extraction for one clause type
+        evidence: Best section score for the clause type in the contract (see section_index.clause_evidence)
+    """
+    if isinstance(value, (dict, list)):
+        return 0.9 if value else 0.4
+    text = str(value or "").strip()
+    if text.lower() in ("", "not_found"):
+        # A missing clause is believable unless the contract clearly has a section for it
+        return 0.3 if evidence >= EVIDENCE_SCORE else 0.8
+    score = 1.0
+    if HEDGE_RE.search(text):
+        score -= 0.5
+    if len(text) < 25:
+        score -= 0.3
+    return max(0.0, score)
+
+
+def verdict_confidence(verdict):
+    """Score a risk verdict from 0 to 1: its form ("Level Risk: reason") and hedging in the reason"""
+    if not isinstance(verdict, str):
+        return 0.3
+    score = 1.0 if VERDICT_RE.match(verdict) else 0.4
+    if HEDGE_RE.search(verdict):
+        score -= 0.5
+    return max(0.0, score)
+
+
+def uncertain_clauses(clauses, text):
+    """Clause types whose extraction falls below CASCADE_CONFIDENCE_THRESHOLD (all of them after a parse failure)"""
+    keys = [key for key in clauses if key not in ("error", "raw_response")]
+    if "error" in clauses:
+        return keys
+    evidence = clause_evidence(text)
+    return [
+        key for key in keys
+        if clause_confidence(clauses[key], evidence.get(key, 0)) < settings.CASCADE_CONFIDENCE_THRESHOLD
+    ]
+
+
+def uncertain_verdicts(risks, expected=()):
+    """
+    Clause types whose risk verdict falls below CASCADE_CONFIDENCE_THRESHOLD.
+
+    Clause types in ``expected`` with no verdict at all count as uncertain.
+    Returns None after a parse failure - every clause needs re-classifying.
+    """
+    if "error" in risks:
+        return None
+    keys = [
+        key for key, verdict in risks.items()
+        if verdict_confidence(verdict) < settings.CASCADE_CONFIDENCE_THRESHOLD
+    ]
+    missing = [key for key in expected if key not in risks and key not in ("error", "raw_response")]
+    return keys + missing
+
+
+def escalation_source(text, keys, clause_types):
+    """
+    Contract text for re-running ``keys`` on the large model.
+
+    Only the sections relevant to those clause types are sent, unless every type is uncertain.
+    """
+    if set(clause_types) <= set(keys):
+        return text
+    return select_clause_spans(text, clause_types=keys)
+
+
+def merge_escalated(first, second, keys):
+    """
+    Take ``keys`` from the large model's result ``second`` and everything else from ``first``.
+
+    A failed re-run keeps the first answer; a failed first answer is replaced outright.
+    """
+    if "error" in second:
+        return first
+    if "error" in first:
+        return second
+    merged = {key: second.get(key, value) if key in keys else value for key, value in first.items()}
+    merged.update((key, second[key]) for key in keys if key in second and key not in merged)
+    return merged
+
+
+def record_escalations(service, keys):
+    for key in keys:
+        CASCADE_ESCALATIONS.labels(service, key).inc()
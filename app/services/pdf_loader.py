@@ -1,13 +1,68 @@
-from langchain_community.document_loaders import PyPDFLoader
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pypdf import PdfReader
+from app.config import settings
+from app.metrics import observe_stage
+from app.services.text_normalizer import normalize_pages
 
 
-def load_pdf(path: str):
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _extract_page_range(path: str, start: int, stop: int):
+    """Extract text for pages [start, stop) - runs inside a worker process"""
+    reader = PdfReader(path)
+    return [(index, reader.pages[index].extract_text() or "") for index in range(start, stop)]
+
+
+def iter_pdf_pages(path: str, use_pool=None):
+    """
+    Yield (page_index, text) pairs as pages finish extracting.
+
+    Documents with at least PDF_PARALLEL_MIN_PAGES pages are split into batches of
+    at least PDF_PAGE_BATCH pages and extracted across the PDF process pool, so pages
+    arrive out of order. Smaller documents are extracted in order in the calling thread.
+
+    Args:
+        path: Path to the PDF file
+        use_pool: Force (True) or skip (False) the process pool; None decides by page count
+    """
+    reader = PdfReader(path)
+    page_count = len(reader.pages)
+    if use_pool is None:
+        use_pool = page_count >= settings.PDF_PARALLEL_MIN_PAGES
+
+    if not use_pool:
+        for index, page in enumerate(reader.pages):
+            yield index, page.extract_text() or ""
+        return
+
+    # Every batch re-opens the PDF in its worker, so keep batches large enough to
+    # amortize that while still giving each worker a few batches to balance load
+    batch = max(1, settings.PDF_PAGE_BATCH, -(-page_count // (settings.PDF_WORKERS * 4)))
+    futures = [
+        _get_pool().submit(_extract_page_range, path, start, min(start + batch, page_count))
+        for start in range(0, page_count, batch)
+    ]
+    try:
+        for future in as_completed(futures):
+            yield from future.result()
+    finally:
+        # Don't leave work queued if the caller stops early or a batch failed
+        for future in futures:
+            future.cancel()
+
+
+def load_pdf_pages(path: str, use_pool=None):
+    """Text of every page, in order"""
     try:
-        loader = PyPDFLoader(path)
-        docs = loader.load()
-        if not docs:
+        with observe_stage("load_pdf"):
+            pages = dict(iter_pdf_pages(path, use_pool=use_pool))
+        if not pages:
             raise ValueError("PDF file is empty or could not be read")
-        return "\n".join([d.page_content for d in docs])
+        return [pages[index] for index in sorted(pages)]
     except Exception as e:
         error_msg = str(e)
         if "cryptography" in error_msg.lower() or "AES" in error_msg:
@@ -18,4 +73,54 @@ def load_pdf(path: str):
         elif "password" in error_msg.lower():
             raise ValueError("PDF is password-protected. Please provide an unencrypted PDF.") from e
         else:
-            raise ValueError(f"Error reading PDF: {error_msg}") from e
\ No newline at end of file
+            raise ValueError(f"Error reading PDF: {error_msg}") from e
+
+
+def load_pdf(path: str, use_pool=None):
+    """The PDF's text exactly as extracted, pages joined with newlines"""
+    return "\n".join(load_pdf_pages(path, use_pool=use_pool))
+
+
+def load_contract(path: str, use_pool=None):
+    """
+    Extract a contract's text for review, normalized when TEXT_NORMALIZATION_ENABLED.
+
+    Returns:
+        (text, normalization) - normalization holds the characters and estimated tokens
+        removed (see text_normalizer.normalize_pages), or None when disabled
+    """
+    pages = load_pdf_pages(path, use_pool=use_pool)
+    if not settings.TEXT_NORMALIZATION_ENABLED:
+        return "\n".join(pages), None
+    return normalize_pages(pages)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=settings.PDF_WORKERS)
+        return _pool
+
+
+async def aload_pdf(path: str):
+    """
+    Async variant of load_pdf.
+
+    Page extraction always runs in the shared process pool; only the (cheap)
+    coordination happens on a thread, so the event loop is never blocked.
+    """
+    return await asyncio.to_thread(load_pdf, path, True)
+
+
+async def aload_contract(path: str):
+    """Async variant of load_contract, extracting pages in the shared process pool"""
+    return await asyncio.to_thread(load_contract, path, True)
+
+
+def shutdown_pool():
+    """Stop the PDF worker processes (called on application shutdown)"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,545 @@
+"""Shared LLM rate limiting: cross-worker token buckets (SQLite), adaptive concurrency and 429 retries"""
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from app.config import settings
+from app.metrics import (
+    LLM_CONCURRENCY_LIMIT,
+    LLM_RATE_LIMIT_WAIT,
+    LLM_RETRIES,
+    LLM_THROTTLED,
+    estimate_tokens,
+)
+from app.services.deadline import current_deadline
+from app.services.llm_scheduler import FairQueue, current_caller, parse_weights
+
+
+class LLMRateLimitError(Exception):
+    """Raised when an LLM call is still rate limited after every retry, or would wait too long for budget"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def rate_limit_retry_after(error):
+    """
+    Check whether ``error`` is a provider 429.
+
+    Returns:
+        None if it isn't; otherwise the seconds the provider asked us to wait
+        (its ``retry-after`` header), or 0.0 when it didn't say
+    """
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status != 429 and type(error).__name__ != "RateLimitError":
+        return None
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return max(0.0, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class SharedTokenBuckets:
+    """
+    Requests-per-minute and tokens-per-minute budgets shared by every worker process.
+
+    Each bucket holds ``burst`` seconds of budget (default: a full minute, as providers
+    meter per minute) and refills continuously. The state
+    is a single SQLite row, updated in a write transaction per call, so all uvicorn
+    workers on the host draw from the same budget; with an empty path it is kept in
+    memory for this process only. A 429's retry-after pauses every worker.
+    """
+
+    def __init__(self, path="", requests_per_minute=30, tokens_per_minute=6000, burst=60.0):
+        self.path = path
+        self.requests_per_minute = max(0, requests_per_minute)
+        self.tokens_per_minute = max(0, tokens_per_minute)
+        self.request_capacity = self.requests_per_minute * burst / 60
+        self.token_capacity = self.tokens_per_minute * burst / 60
+        self._lock = threading.Lock()
+        self._ready = False
+        self._memory = None
+
+    def _full(self, now):
+        return {
+            "requests": float(self.request_capacity),
+            "tokens": float(self.token_capacity),
+            "updated": now,
+            "pause_until": 0.0,
+        }
+
+    @contextmanager
+    def _state(self):
+        """Yield the bucket state for update; changes are saved when the block exits"""
+        now = time.time()
+        if not self.path:
+            with self._lock:
+                if self._memory is None:
+                    self._memory = self._full(now)
+                yield self._memory
+            return
+
+        if not self._ready:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            if not self._ready:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_rate_limit ("
+                    "id INTEGER PRIMARY KEY CHECK (id = 1), requests REAL NOT NULL, tokens REAL NOT NULL, "
+                    "updated REAL NOT NULL, pause_until REAL NOT NULL)"
+                )
+                self._ready = True
+            # Take the write lock first so two workers can't spend the same budget
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT requests, tokens, updated, pause_until FROM llm_rate_limit").fetchone()
+            state = dict(zip(("requests", "tokens", "updated", "pause_until"), row)) if row else self._full(now)
+            try:
+                yield state
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_rate_limit (id, requests, tokens, updated, pause_until) "
+                "VALUES (1, ?, ?, ?, ?)",
+                (state["requests"], state["tokens"], state["updated"], state["pause_until"]),
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def _refill(self, state, now):
+        elapsed = max(0.0, now - state["updated"])
+        state["requests"] = min(self.request_capacity, state["requests"] + elapsed * self.requests_per_minute / 60)
+        state["tokens"] = min(self.token_capacity, state["tokens"] + elapsed * self.tokens_per_minute / 60)
+        state["updated"] = now
+
+    def take(self, tokens: int):
+        """
+        Spend one request and ``tokens`` tokens if both budgets allow it.
+
+        A call estimated above the whole token capacity waits for a full bucket.
+
+        Returns:
+            0.0 if the budget was spent, otherwise the seconds to wait before trying again
+        """
+        with self._state() as state:
+            now = time.time()
+            self._refill(state, now)
+            if now < state["pause_until"]:
+                return state["pause_until"] - now
+            wait = 0.0
+            if self.requests_per_minute and state["requests"] < 1:
+                wait = (1 - state["requests"]) * 60 / self.requests_per_minute
+            if self.tokens_per_minute:
+                needed = min(tokens, self.token_capacity)
+                if state["tokens"] < needed:
+                    wait = max(wait, (needed - state["tokens"]) * 60 / self.tokens_per_minute)
+            if wait:
+                return wait
+            if self.requests_per_minute:
+                state["requests"] -= 1
+            if self.tokens_per_minute:
+                state["tokens"] -= tokens
+            return 0.0
+
+    def adjust(self, tokens: int):
+        """Return ``tokens`` to the token budget (negative: charge more), once real usage is known"""
+        if not self.tokens_per_minute or not tokens:
+            return
+        with self._state() as state:
+            self._refill(state, time.time())
+            state["tokens"] = min(self.token_capacity, state["tokens"] + tokens)
+
+    def pause(self, seconds: float):
+        """Stop every worker from starting calls for ``seconds`` (a provider's retry-after)"""
+        with self._state() as state:
+            self._refill(state, time.time())
+            state["pause_until"] = max(state["pause_until"], time.time() + seconds)
+
+    def snapshot(self):
+        with self._state() as state:
+            self._refill(state, time.time())
+            return {
+                "requests_available": round(state["requests"], 2),
+                "tokens_available": round(state["tokens"], 1),
+                "paused_for": round(max(0.0, state["pause_until"] - time.time()), 2),
+            }
+
+
+class FairGate:
+    """
+    Admission of up to ``capacity()`` holders at a time.
+
+    Threads and asyncio tasks wait in one FairQueue, which hands free places out by
+    priority class and tenant (see llm_scheduler). With the default capacity of one,
+    the gate serializes a wait - such as the wait for rate-limit budget - in
+    fair-queueing order.
+    """
+
+    def __init__(self, weights=None, name="budget"):
+        self.in_flight = 0
+        self._waiters = FairQueue(weights, name)
+        self._lock = threading.Lock()
+
+    def capacity(self):
+        return 1
+
+    def _wake(self):
+        # Lock held: hand free places to waiters in fair-queueing order
+        while self._waiters and self.in_flight < self.capacity():
+            self.in_flight += 1
+            self._waiters.pop()()
+
+    def _try_acquire(self, priority):
+        # Lock held: take a free place if nobody is queued for one
+        if not self._waiters and self.in_flight < self.capacity():
+            self.in_flight += 1
+            self._waiters.admit(priority)
+            return True
+        return False
+
+    def acquire(self):
+        priority, tenant = current_caller()
+        with self._lock:
+            if self._try_acquire(priority):
+                return
+            event = threading.Event()
+            self._waiters.push(event.set, priority, tenant)
+        event.wait()
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve():
+            if future.cancelled():
+                self.release()  # handed a place after giving up
+            else:
+                future.set_result(None)
+
+        def wake():
+            loop.call_soon_threadsafe(resolve)
+
+        priority, tenant = current_caller()
+        with self._lock:
+            if self._try_acquire(priority):
+                return
+            self._waiters.push(wake, priority, tenant)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if self._waiters.remove(wake):
+                    raise
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._wake()
+
+    def scheduler_snapshot(self):
+        """Queue depth, admissions and wait percentiles per priority class, plus the busiest tenants"""
+        with self._lock:
+            return self._waiters.snapshot()
+
+
+class AdaptiveConcurrency(FairGate):
+    """
+    Limit on LLM calls in flight in this process, adjusted AIMD-style.
+
+    Every successful call within the latency target raises the limit by 1/limit (about
+    one more slot per round of calls); a 429 halves it and a slow call shrinks it by
+    10%, at most once per ``cooldown`` seconds so a burst of failures counts once.
+    Free slots go to waiters in fair-queueing order (see FairGate).
+    """
+
+    def __init__(self, maximum=16, minimum=1, latency_target=30.0, cooldown=1.0, weights=None):
+        super().__init__(weights, "slot")
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self.limit = float(self.maximum)
+        self._last_decrease = 0.0
+        LLM_CONCURRENCY_LIMIT.set(self.maximum)
+
+    def capacity(self):
+        return int(self.limit)
+
+    def snapshot(self):
+        with self._lock:
+            return {"concurrency_limit": int(self.limit), "in_flight": self.in_flight, "waiting": len(self._waiters)}
+
+    def _decrease(self, factor):
+        now = time.monotonic()
+        if now - self._last_decrease >= self.cooldown:
+            self._last_decrease = now
+            self.limit = max(self.minimum, self.limit * factor)
+
+    def record(self, latency=None, throttled=False):
+        """Feed back the outcome of one call"""
+        with self._lock:
+            if throttled:
+                self._decrease(0.5)
+            elif latency is not None and latency > self.latency_target:
+                self._decrease(0.9)
+            elif latency is not None:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._wake()
+            limit = self.limit
+        LLM_CONCURRENCY_LIMIT.set(int(limit))
+
+
+class _Slot:
+    """One admitted call: the tokens reserved for it and when it started"""
+
+    def __init__(self, limiter, service, reserved):
+        self.limiter = limiter
+        self.service = service
+        self.reserved = reserved
+        self.started = time.perf_counter()
+
+    def settle(self, usage=None):
+        """
+        Record a successful call.
+
+        Args:
+            usage: (prompt_tokens, completion_tokens) as reported, to correct the token estimate
+        """
+        self.limiter.concurrency.record(latency=time.perf_counter() - self.started)
+        if usage and self.reserved:
+            self.limiter.buckets.adjust(self.reserved - sum(usage))
+
+    async def asettle(self, usage=None):
+        """Async variant of settle; the token buckets (SQLite) are written off the event loop"""
+        self.limiter.concurrency.record(latency=time.perf_counter() - self.started)
+        if usage and self.reserved:
+            await asyncio.to_thread(self.limiter.buckets.adjust, self.reserved - sum(usage))
+
+
+class LLMRateLimiter:
+    """
+    Admission control in front of every LLM call.
+
+    A call first waits for request and token budget (tokens estimated from the prompt plus
+    LLM_EXPECTED_COMPLETION_TOKENS, corrected from reported usage afterwards), then for a
+    concurrency slot. Both waits are ordered by the fair scheduler: one call at a time
+    holds the budget turn, so a queued interactive call gets the next budget ahead of
+    batch calls. A call that would wait longer than ``max_wait`` for budget fails fast
+    with LLMRateLimitError. With rate limiting disabled, calls still share the
+    concurrency slots in fair order. After a 429 the call is retried after the provider's retry-after
+    (which also pauses every worker) or full-jitter exponential backoff.
+    """
+
+    def __init__(self, buckets, concurrency, enabled=True, max_wait=120.0, max_retries=4,
+                 backoff_base=1.0, backoff_max=30.0, budget=None):
+        self.buckets = buckets
+        self.concurrency = concurrency
+        self.budget = budget or FairGate()
+        self.enabled = enabled
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.throttled = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def _estimate(self, prompt: str):
+        return estimate_tokens(prompt) + settings.LLM_EXPECTED_COMPLETION_TOKENS
+
+    def _check_wait(self, waited, wait):
+        if waited + wait > self.max_wait:
+            raise LLMRateLimitError(
+                f"LLM rate limit: no budget for another {wait:.0f}s", retry_after=wait
+            )
+        self._check_deadline(wait)
+
+    @staticmethod
+    def _check_deadline(wait):
+        # Don't wait for budget (or a retry) the review will no longer be around to use
+        deadline = current_deadline()
+        if deadline is not None:
+            remaining = deadline.remaining()
+            if remaining is not None and wait >= remaining:
+                deadline.cancel("deadline")
+                deadline.check()
+
+    def _wait_budget(self, tokens, started):
+        # Budget turn held: sleep until the buckets grant ``tokens``
+        while wait := self.buckets.take(tokens):
+            self._check_wait(time.perf_counter() - started, wait)
+            time.sleep(wait + random.uniform(0, 0.05))
+
+    async def _await_budget(self, tokens, started):
+        # SQLite may block on another worker's transaction; keep that off the event loop
+        while wait := await asyncio.to_thread(self.buckets.take, tokens):
+            self._check_wait(time.perf_counter() - started, wait)
+            await asyncio.sleep(wait + random.uniform(0, 0.05))
+
+    @contextmanager
+    def slot(self, service: str, prompt: str):
+        """Wait for admission; yields a _Slot whose settle() must be called on success"""
+        started = time.perf_counter()
+        tokens = 0
+        if self.enabled:
+            tokens = self._estimate(prompt)
+            self.budget.acquire()
+            try:
+                self._wait_budget(tokens, started)
+            finally:
+                self.budget.release()
+        self.concurrency.acquire()
+        try:
+            LLM_RATE_LIMIT_WAIT.labels(service).observe(time.perf_counter() - started)
+            yield _Slot(self, service, tokens)
+        finally:
+            self.concurrency.release()
+
+    @asynccontextmanager
+    async def aslot(self, service: str, prompt: str):
+        """Async variant of slot; yields a _Slot whose asettle() must be awaited on success"""
+        started = time.perf_counter()
+        tokens = 0
+        if self.enabled:
+            tokens = self._estimate(prompt)
+            await self.budget.aacquire()
+            try:
+                await self._await_budget(tokens, started)
+            finally:
+                self.budget.release()
+        await self.concurrency.aacquire()
+        try:
+            LLM_RATE_LIMIT_WAIT.labels(service).observe(time.perf_counter() - started)
+            yield _Slot(self, service, tokens)
+        finally:
+            self.concurrency.release()
+
+    def retry_delay(self, service: str, error: BaseException, attempt: int):
+        """
+        Decide what to do after a failed call.
+
+        Returns:
+            None if ``error`` isn't a 429 (re-raise it), else the seconds to wait before retry ``attempt + 1``
+
+        Raises:
+            LLMRateLimitError: If the call was rate limited and retries are used up
+        """
+        retry_after = rate_limit_retry_after(error)
+        if retry_after is None:
+            return None
+        LLM_THROTTLED.labels(service).inc()
+        with self._lock:
+            self.throttled += 1
+        if self.enabled:
+            self.concurrency.record(throttled=True)
+            if retry_after:
+                self.buckets.pause(retry_after)
+        if attempt >= self.max_retries:
+            raise LLMRateLimitError(
+                f"LLM rate limit: still throttled after {attempt + 1} attempts",
+                retry_after=retry_after or self.backoff_max,
+            ) from error
+        LLM_RETRIES.labels(service).inc()
+        with self._lock:
+            self.retries += 1
+        if retry_after:
+            return retry_after + random.uniform(0, self.backoff_base)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def aretry_delay(self, service: str, error: BaseException, attempt: int):
+        """Async variant of retry_delay; a retry-after pause is written to the buckets off the event loop"""
+        return await asyncio.to_thread(self.retry_delay, service, error, attempt)
+
+    def call(self, service: str, prompt: str, fn):
+        """Run ``fn(slot)`` under admission control, retrying it after 429s"""
+        attempt = 0
+        while True:
+            try:
+                with self.slot(service, prompt) as slot:
+                    return fn(slot)
+            except Exception as e:
+                delay = self.retry_delay(service, e, attempt)
+                if delay is None:
+                    raise
+            self._check_deadline(delay)
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(self, service: str, prompt: str, fn):
+        """Async variant of call; ``fn(slot)`` returns an awaitable"""
+        attempt = 0
+        while True:
+            try:
+                async with self.aslot(service, prompt) as slot:
+                    return await fn(slot)
+            except Exception as e:
+                delay = await self.aretry_delay(service, e, attempt)
+                if delay is None:
+                    raise
+            self._check_deadline(delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            **self.concurrency.snapshot(),
+            **(self.buckets.snapshot() if self.enabled else {}),
+            "requests_per_minute": self.buckets.requests_per_minute,
+            "tokens_per_minute": self.buckets.tokens_per_minute,
+            "throttled": self.throttled,
+            "retries": self.retries,
+        }
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """The process-wide limiter, built from settings on first use"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            weights = parse_weights(settings.LLM_SCHEDULER_WEIGHTS)
+            _limiter = LLMRateLimiter(
+                SharedTokenBuckets(
+                    settings.LLM_RATE_LIMIT_PATH,
+                    settings.GROQ_REQUESTS_PER_MINUTE,
+                    settings.GROQ_TOKENS_PER_MINUTE,
+                ),
+                AdaptiveConcurrency(
+                    settings.LLM_MAX_CONCURRENCY,
+                    settings.LLM_MIN_CONCURRENCY,
+                    settings.LLM_LATENCY_TARGET,
+                    weights=weights,
+                ),
+                enabled=settings.LLM_RATE_LIMIT_ENABLED,
+                max_wait=settings.LLM_RATE_LIMIT_MAX_WAIT,
+                max_retries=settings.LLM_MAX_RETRIES,
+                backoff_base=settings.LLM_BACKOFF_BASE,
+                backoff_max=settings.LLM_BACKOFF_MAX,
+                budget=FairGate(weights),
+            )
+        return _limiter
+
+
+def reset_rate_limiter(limiter=None):
+    """Replace the process-wide limiter (None: rebuild it from the current settings on next use)"""
+    global _limiter
+    with _limiter_lock:
+        _limiter = limiter
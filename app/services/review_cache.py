@@ -0,0 +1,184 @@
+"""Content-addressed cache for full contract reviews (in-memory LRU + SQLite)"""
+import copy
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from app.config import settings
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different extractions share a cache key"""
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def make_cache_key(text: str, *parts) -> str:
+    """
+    Build a cache key from the normalized contract text and the configuration.
+
+    Args:
+        text: Contract text
+        *parts: Anything else that changes the review output (model, prompts, temperatures)
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    digest.update(normalize_text(text).encode("utf-8"))
+    for part in parts:
+        digest.update(b"\x00")
+        digest.update(str(part).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ReviewCache:
+    """
+    Two-tier review cache.
+
+    The memory tier is an LRU bounded by ``max_entries``. The disk tier is a
+    SQLite file shared by every process (FastAPI and Gradio) on the host.
+    Both tiers drop entries older than ``ttl`` seconds.
+    """
+
+    def __init__(self, max_entries=256, ttl=86400, path=""):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_ready = False
+
+    @contextmanager
+    def _connect(self):
+        if not self._disk_ready:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            if not self._disk_ready:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS review_cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                self._disk_ready = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _expired(self, created_at):
+        return self.ttl > 0 and time.time() - created_at > self.ttl
+
+    def _remember(self, key, value, created_at):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key, record=True):
+        """
+        Return the cached review for ``key`` or None.
+
+        Pass ``record=False`` to look without touching the hit/miss counters.
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if not self._expired(created_at):
+                    self._memory.move_to_end(key)
+                    if record:
+                        self.hits += 1
+                    # Callers are free to mutate the result; keep the cached copy pristine
+                    return copy.deepcopy(value)
+                del self._memory[key]
+
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        "SELECT value, created_at FROM review_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row and self._expired(row[1]):
+                        conn.execute("DELETE FROM review_cache WHERE key = ?", (key,))
+                        row = None
+                if row:
+                    value = json.loads(row[0])
+                    with self._lock:
+                        self._remember(key, copy.deepcopy(value), row[1])
+                        if record:
+                            self.hits += 1
+                            self.disk_hits += 1
+                    return value
+            except sqlite3.Error:
+                # The disk tier is best-effort; fall through to a miss
+                pass
+
+        if record:
+            with self._lock:
+                self.misses += 1
+        return None
+
+    def set(self, key, value):
+        """Store a review in both tiers"""
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, copy.deepcopy(value), created_at)
+
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO review_cache (key, value, created_at) VALUES (?, ?, ?)",
+                        (key, json.dumps(value), created_at),
+                    )
+                    if self.ttl > 0:
+                        conn.execute(
+                            "DELETE FROM review_cache WHERE created_at < ?", (created_at - self.ttl,)
+                        )
+            except sqlite3.Error:
+                pass
+
+    def clear(self):
+        """Drop every entry from both tiers and reset the counters"""
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.disk_hits = self.misses = 0
+        if self.path and os.path.exists(self.path):
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM review_cache")
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "disk_path": self.path or None,
+            }
+
+
+review_cache = ReviewCache(
+    max_entries=settings.REVIEW_CACHE_SIZE,
+    ttl=settings.REVIEW_CACHE_TTL,
+    path=settings.REVIEW_CACHE_PATH,
+)
@@ -0,0 +1,306 @@
+"""Persistent review store: every completed review, indexed by clause type and risk level (SQLite + FTS5)"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from app.config import settings
+from app.services.review_cache import make_cache_key
+from app.services.risk_classifier import normalize_risk_level
+
+RISK_LEVELS = ("high", "medium", "low")
+MAX_PAGE_SIZE = 200
+
+
+def clause_summary(value):
+    """A clause extraction as searchable text (structured answers are stored as JSON)"""
+    return value if isinstance(value, str) else json.dumps(value, sort_keys=True)
+
+
+def fts_query(q: str):
+    """
+    Turn free text into an FTS5 query: every word must match, ``word*`` matches a prefix.
+
+    Words are quoted, so FTS5 operators and punctuation in user input are taken literally.
+    """
+    terms = []
+    for word in q.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return " ".join(terms)
+
+
+class ReviewStore:
+    """
+    Completed reviews kept for portfolio-wide queries.
+
+    One row per document (keyed by the hash of its normalized text, so a re-upload
+    updates the existing row) plus one row per clause type with its normalized risk
+    level. Clause summaries and verdicts are full-text indexed (FTS5, falling back to
+    LIKE when SQLite was built without it). Queries read only the index - no LLM calls.
+    """
+
+    def __init__(self, path=""):
+        self.path = path
+        self.fts = True
+        self._lock = threading.Lock()
+        self._ready = False
+
+    @contextmanager
+    def _connect(self):
+        if not self._ready:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            if not self._ready:
+                self._create_schema(conn)
+                self._ready = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _create_schema(self, conn):
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS reviews ("
+            "id INTEGER PRIMARY KEY, document_hash TEXT NOT NULL UNIQUE, filename TEXT, source TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL, result TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS reviews_updated ON reviews (updated_at)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS review_clauses ("
+            "id INTEGER PRIMARY KEY, review_id INTEGER NOT NULL, clause_type TEXT NOT NULL, "
+            "risk_level TEXT, summary TEXT NOT NULL, verdict TEXT NOT NULL, "
+            "UNIQUE (review_id, clause_type))"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS review_clauses_type_level "
+            "ON review_clauses (clause_type, risk_level, review_id)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS review_clauses_level ON review_clauses (risk_level, review_id)")
+        try:
+            # External-content FTS table kept in step with review_clauses by triggers
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS review_clauses_fts USING fts5("
+                "summary, verdict, content='review_clauses', content_rowid='id')"
+            )
+        except sqlite3.OperationalError:
+            self.fts = False
+            return
+        conn.executescript(
+            """
+            CREATE TRIGGER IF NOT EXISTS review_clauses_ai AFTER INSERT ON review_clauses BEGIN
+                INSERT INTO review_clauses_fts (rowid, summary, verdict) VALUES (new.id, new.summary, new.verdict);
+            END;
+            CREATE TRIGGER IF NOT EXISTS review_clauses_ad AFTER DELETE ON review_clauses BEGIN
+                INSERT INTO review_clauses_fts (review_clauses_fts, rowid, summary, verdict)
+                VALUES ('delete', old.id, old.summary, old.verdict);
+            END;
+            """
+        )
+
+    def save(self, text: str, result, filename=None, source=None):
+        """
+        Store a completed review of ``text``, replacing any earlier review of the same document.
+
+        Returns:
+            The review id
+        """
+        document_hash = make_cache_key(text)
+        clauses = result.get("clauses") if isinstance(result.get("clauses"), dict) else {}
+        risks = result.get("risks") if isinstance(result.get("risks"), dict) else {}
+        keys = [key for key in {**clauses, **risks} if key not in ("error", "raw_response", "raw")]
+        rows = []
+        for key in keys:
+            verdict = risks.get(key)
+            rows.append((
+                key,
+                normalize_risk_level(verdict) if verdict is not None else None,
+                clause_summary(clauses.get(key, "not_found")),
+                clause_summary(verdict) if verdict is not None else "",
+            ))
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO reviews (document_hash, filename, source, created_at, updated_at, result) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (document_hash) DO UPDATE SET "
+                "filename = COALESCE(excluded.filename, filename), source = excluded.source, "
+                "updated_at = excluded.updated_at, result = excluded.result",
+                (document_hash, filename, source, now, now, json.dumps(result)),
+            )
+            (review_id,) = conn.execute(
+                "SELECT id FROM reviews WHERE document_hash = ?", (document_hash,)
+            ).fetchone()
+            conn.execute("DELETE FROM review_clauses WHERE review_id = ?", (review_id,))
+            conn.executemany(
+                "INSERT INTO review_clauses (review_id, clause_type, risk_level, summary, verdict) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(review_id, *row) for row in rows],
+            )
+        return review_id
+
+    def get(self, review_id: int):
+        """A stored review with its metadata, or None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, document_hash, filename, source, created_at, updated_at, result "
+                "FROM reviews WHERE id = ?",
+                (review_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {**self._metadata(row), **json.loads(row[6])}
+
+    @staticmethod
+    def _metadata(row):
+        return {
+            "id": row[0],
+            "document_hash": row[1],
+            "filename": row[2],
+            "source": row[3],
+            "created_at": row[4],
+            "updated_at": row[5],
+        }
+
+    def _clause_filter(self, clause_type=None, risk_level=None, q=None):
+        """SQL conditions on review_clauses ``c`` and their parameters"""
+        conditions, params = [], []
+        if clause_type:
+            conditions.append("c.clause_type = ?")
+            params.append(clause_type)
+        if risk_level:
+            conditions.append("c.risk_level = ?")
+            params.append(risk_level)
+        if q and fts_query(q):
+            if self.fts:
+                conditions.append("c.id IN (SELECT rowid FROM review_clauses_fts WHERE review_clauses_fts MATCH ?)")
+                params.append(fts_query(q))
+            else:
+                for word in q.split():
+                    conditions.append("(c.summary LIKE ? OR c.verdict LIKE ?)")
+                    params.extend([f"%{word.rstrip('*')}%"] * 2)
+        return conditions, params
+
+    def query(self, clause_type=None, risk_level=None, q=None, document_hash=None,
+              since=None, until=None, limit=50, offset=0):
+        """
+        Find stored reviews, most recently reviewed first.
+
+        Clause filters apply to the same clause: ``clause_type="liability", risk_level="high"``
+        matches reviews whose liability clause is high risk, not any high-risk clause.
+
+        Args:
+            clause_type: Clause type the filters apply to (any clause type when omitted)
+            risk_level: "high", "medium" or "low"
+            q: Full-text search over clause summaries and risk verdicts (all words must match)
+            document_hash: A single document, by the hash of its normalized text
+            since: Only reviews updated at or after this Unix timestamp
+            until: Only reviews updated before this Unix timestamp
+            limit: Page size (at most MAX_PAGE_SIZE)
+            offset: Reviews to skip
+
+        Returns:
+            Dict with ``total`` matching reviews and this page of ``reviews``, each with its
+            clause ``risk_levels`` and the clauses that matched the filters (``matches``)
+
+        Raises:
+            ValueError: If risk_level is not a known level
+        """
+        if risk_level and risk_level not in RISK_LEVELS:
+            raise ValueError(f"risk_level must be one of {', '.join(RISK_LEVELS)}")
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        offset = max(0, offset)
+        with self._connect() as conn:
+            # Built after connecting: the schema check decides between FTS5 and LIKE
+            clause_conditions, clause_params = self._clause_filter(clause_type, risk_level, q)
+            return self._query(conn, clause_conditions, clause_params, document_hash, since, until, limit, offset)
+
+    def _query(self, conn, clause_conditions, clause_params, document_hash, since, until, limit, offset):
+        conditions, params = [], []
+        if clause_conditions:
+            conditions.append(
+                f"r.id IN (SELECT c.review_id FROM review_clauses c WHERE {' AND '.join(clause_conditions)})"
+            )
+            params.extend(clause_params)
+        if document_hash:
+            conditions.append("r.document_hash = ?")
+            params.append(document_hash)
+        if since is not None:
+            conditions.append("r.updated_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("r.updated_at < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        (total,) = conn.execute(f"SELECT COUNT(*) FROM reviews r {where}", params).fetchone()
+        rows = conn.execute(
+            "SELECT r.id, r.document_hash, r.filename, r.source, r.created_at, r.updated_at FROM reviews r "
+            f"{where} ORDER BY r.updated_at DESC, r.id DESC LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+        ).fetchall()
+        reviews = {row[0]: {**self._metadata(row), "risk_levels": {}, "matches": []} for row in rows}
+        if reviews:
+            ids = ",".join("?" * len(reviews))
+            for review_id, key, level in conn.execute(
+                f"SELECT review_id, clause_type, risk_level FROM review_clauses WHERE review_id IN ({ids})",
+                list(reviews),
+            ):
+                reviews[review_id]["risk_levels"][key] = level
+            if clause_conditions:
+                # "+" keeps SQLite off the review_id index: probing it once per id would
+                # re-run the full-text subquery each time instead of once
+                for review_id, key, level, summary, verdict in conn.execute(
+                    "SELECT c.review_id, c.clause_type, c.risk_level, c.summary, c.verdict "
+                    f"FROM review_clauses c WHERE +c.review_id IN ({ids}) AND {' AND '.join(clause_conditions)}",
+                    (*reviews, *clause_params),
+                ):
+                    reviews[review_id]["matches"].append(
+                        {"clause_type": key, "risk_level": level, "summary": summary, "verdict": verdict}
+                    )
+        return {"total": total, "limit": limit, "offset": offset, "reviews": list(reviews.values())}
+
+    def iter_clauses(self):
+        """(clause_type, summary, risk_level, verdict) of every classified clause, oldest review first"""
+        with self._connect() as conn:
+            yield from conn.execute(
+                "SELECT c.clause_type, c.summary, c.risk_level, c.verdict FROM review_clauses c "
+                "JOIN reviews r ON r.id = c.review_id WHERE c.risk_level IS NOT NULL "
+                "ORDER BY r.updated_at, c.id"
+            )
+
+    def summary(self):
+        """Portfolio overview: stored reviews and the count of each risk level per clause type"""
+        with self._connect() as conn:
+            (total,) = conn.execute("SELECT COUNT(*) FROM reviews").fetchone()
+            rows = conn.execute(
+                "SELECT clause_type, risk_level, COUNT(*) FROM review_clauses GROUP BY clause_type, risk_level"
+            ).fetchall()
+        clause_types = {}
+        for key, level, count in rows:
+            clause_types.setdefault(key, {})[level or "unclassified"] = count
+        return {"reviews": total, "clause_types": clause_types, "full_text_search": "fts5" if self.fts else "like"}
+
+
+review_store = ReviewStore(settings.REVIEW_STORE_PATH)
+
+
+def store_review(text: str, result, filename=None, source=None):
+    """
+    Save a completed review when REVIEW_STORE_ENABLED; best-effort, so a store failure never fails a review.
+
+    Partial reviews (cut off by their deadline) are not stored.
+    """
+    if not settings.REVIEW_STORE_ENABLED or result.get("partial"):
+        return None
+    try:
+        return review_store.save(text, result, filename, source)
+    except (sqlite3.Error, TypeError, ValueError):
+        return None
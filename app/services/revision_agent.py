@@ -1,7 +1,9 @@
-from app.services.llm_factory import create_llm
+from app.metrics import observe_stage
+from app.services.llm_factory import ainvoke_llm, astream_llm, invoke_llm, response_text
 
-# Initialize LLM using Groq
-llm = create_llm(temperature=0.2)  # Slightly higher for more creative suggestions
+# LLM is created lazily on first use (see llm_factory.get_llm)
+SERVICE = "revision_agent"
+TEMPERATURE = 0.2  # Slightly higher for more creative suggestions
 
 
 REVISION_PROMPT = """Analyze contract clauses and provide prioritized revision suggestions. Focus on: unlimited liability, missing protections, ambiguous terms, unfair provisions, compliance issues.
@@ -22,9 +24,23 @@ Clauses:
 
 
 def suggest_revisions(clauses: str):
-    prompt = REVISION_PROMPT.format(clauses=clauses)
-    response = llm.invoke(prompt)
-    # Extract text content from LLM response
-    if hasattr(response, 'content'):
-        response = response.content
-    return str(response)
\ No newline at end of file
+    with observe_stage("suggest_revisions"):
+        prompt = REVISION_PROMPT.format(clauses=clauses)
+        response = invoke_llm(SERVICE, prompt, TEMPERATURE)
+        return response_text(response)
+
+
+async def asuggest_revisions(clauses: str):
+    """Async variant of suggest_revisions - awaits the LLM instead of blocking a thread"""
+    with observe_stage("suggest_revisions"):
+        prompt = REVISION_PROMPT.format(clauses=clauses)
+        response = await ainvoke_llm(SERVICE, prompt, TEMPERATURE)
+        return response_text(response)
+
+
+async def astream_revisions(clauses: str):
+    """Yield revision suggestions chunk by chunk as the LLM streams them"""
+    with observe_stage("suggest_revisions"):
+        prompt = REVISION_PROMPT.format(clauses=clauses)
+        async for text in astream_llm(SERVICE, prompt, TEMPERATURE):
+            yield text
\ No newline at end of file
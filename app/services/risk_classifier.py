@@ -1,9 +1,18 @@
+import asyncio
 import json
-import re
-from app.services.llm_factory import create_llm
+from app.config import settings
+from app.metrics import JSON_PARSE_FALLBACKS, JSON_REPAIRS, observe_stage
+from app.models.agent_models import RiskMap
+from app.services.clause_index import clause_index
+from app.services.json_repair import repair_json
+from app.services.llm_factory import ainvoke_llm, invoke_llm, record_partial_response, response_text
+from app.services.model_cascade import cascade_fingerprint, merge_escalated, record_escalations, uncertain_verdicts
+from app.services.review_cache import make_cache_key
+from app.services.risk_prefilter import prefilter_clauses
 
-# Initialize LLM using Groq
-llm = create_llm(temperature=0.1)  # Lower temperature for more consistent, factual responses
+# LLM is created lazily on first use (see llm_factory.get_llm)
+SERVICE = "risk_classifier"
+TEMPERATURE = 0.1  # Lower temperature for more consistent, factual responses
 
 
 RISK_PROMPT = """Classify each contract clause as High/Medium/Low Risk. Return ONLY valid JSON.
@@ -22,31 +31,217 @@ Clauses:
 {clauses}"""
 
 
-def classify_risks(clauses: str):
-    prompt = RISK_PROMPT.format(clauses=clauses)
-    response = llm.invoke(prompt)
-    # Extract text content from LLM response
-    if hasattr(response, 'content'):
-        response = response.content
-    response = str(response)
-    
-    # Try to parse JSON from the response
+def _parse_response(response):
+    """
+    Parse a classification response into the RiskMap shape, repairing malformed JSON locally.
+
+    Returns:
+        (risks, status) - status as from json_repair.repair_json, or "error" if nothing parsed
+    """
+    response = response_text(response)
     try:
-        # Extract JSON from markdown code blocks if present
-        json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', response, re.DOTALL)
-        if json_match:
-            response = json_match.group(1)
-        
-        # Try to find JSON object in the response
-        json_match = re.search(r'\{.*\}', response, re.DOTALL)
-        if json_match:
-            return json.loads(json_match.group(0))
-        
-        # If no JSON found, try parsing the whole response
-        return json.loads(response)
-    except (json.JSONDecodeError, AttributeError):
+        data, status = repair_json(response)
+        risks = RiskMap.model_validate(data).model_dump()
+    except ValueError:
+        JSON_PARSE_FALLBACKS.labels(SERVICE).inc()
         # Fallback: return a dict with the raw response
         return {
             "error": "Failed to parse JSON response",
-            "raw_response": str(response)
-        }
\ No newline at end of file
+            "raw_response": response
+        }, "error"
+    if status != "clean":
+        JSON_REPAIRS.labels(SERVICE, status).inc()
+    if status == "partial":
+        record_partial_response()
+    return risks, status
+
+
+def normalize_risk_level(verdict):
+    """
+    Map a free-text verdict ("High Risk: ...", "critical", "moderate") to "high", "medium" or "low".
+
+    The label before the first colon wins, so a reason that mentions another level doesn't
+    change the result. Returns None when no level is recognizable.
+    """
+    text = str(verdict or "").lower()
+    for part in (text.split(":", 1)[0], text):
+        if "high" in part or "critical" in part:
+            return "high"
+        if "medium" in part or "moderate" in part:
+            return "medium"
+        if "low" in part:
+            return "low"
+    return None
+
+
+def verdict_fingerprint():
+    """The model and prompt settings that produce risk verdicts"""
+    return make_cache_key("", settings.GROQ_MODEL, RISK_PROMPT, TEMPERATURE, cascade_fingerprint())
+
+
+class _IndexedClauses:
+    """
+    Clauses split into those with a reusable verdict in the clause index, those the
+    local prefilter is confident about, and those that still need the LLM. With both
+    disabled, or input that isn't a JSON object, everything goes to the LLM unchanged.
+
+    ``resolve()`` and ``merge()`` read and write the clause index (SQLite) and run the
+    prefilter model; async callers run them on a worker thread.
+    """
+
+    def __init__(self, clauses: str):
+        self.raw = clauses
+        self.known = {}
+        self.texts = None
+        if not settings.CLAUSE_INDEX_ENABLED and not settings.RISK_PREFILTER_ENABLED:
+            return
+        try:
+            parsed = json.loads(clauses)
+        except (json.JSONDecodeError, TypeError):
+            return
+        if not isinstance(parsed, dict):
+            return
+        self.parsed = parsed
+        self.texts = {
+            key: value if isinstance(value, str) else json.dumps(value, sort_keys=True)
+            for key, value in parsed.items()
+            if key not in ("error", "raw_response")
+        }
+
+    @property
+    def uses_index(self):
+        """Whether resolve() and merge() have index or prefilter work to do"""
+        return self.texts is not None
+
+    def resolve(self):
+        """Find the clauses the clause index or the prefilter can answer"""
+        if self.texts is None:
+            return
+        fingerprint = verdict_fingerprint()
+        if settings.CLAUSE_INDEX_ENABLED:
+            self.known = clause_index.lookup(self.texts, fingerprint)
+        self.known.update(prefilter_clauses(
+            {key: text for key, text in self.texts.items() if key not in self.known}, fingerprint
+        ))
+
+    @property
+    def all_known(self):
+        return self.texts is not None and len(self.known) == len(self.texts)
+
+    def pending(self):
+        """The clauses sent to the LLM, as a JSON string"""
+        if self.texts is None:
+            return self.raw
+        return json.dumps({key: self.parsed[key] for key in self.texts if key not in self.known})
+
+    def prompt(self):
+        return RISK_PROMPT.format(clauses=self.pending())
+
+    def merge(self, risks=None, status="clean"):
+        """
+        Combine LLM verdicts with reused ones, in clause order, and index the new verdicts.
+
+        Verdicts from a response cut off part way (``status`` "partial") are returned but
+        not indexed: the last one may itself be truncated, and the index keeps it for good.
+        """
+        if self.texts is None:
+            return risks
+        if risks is None:
+            risks = {}
+        elif "error" in risks:
+            return {**self.known, **risks}
+        else:
+            if settings.CLAUSE_INDEX_ENABLED and status != "partial":
+                new = {key: text for key, text in self.texts.items() if key not in self.known}
+                clause_index.add(new, risks, verdict_fingerprint())
+        merged = {key: self.known.get(key, risks.get(key)) for key in self.texts if key in self.known or key in risks}
+        merged.update((key, value) for key, value in risks.items() if key not in merged)
+        return merged
+
+
+def _escalation(sent: str, risks):
+    """
+    (keys, prompt) for re-classifying low-confidence verdicts on the large model, or None.
+
+    ``keys`` is None when every clause in ``sent`` needs re-classifying.
+    """
+    if not settings.MODEL_CASCADE_ENABLED:
+        return None
+    try:
+        parsed = json.loads(sent)
+    except (json.JSONDecodeError, TypeError):
+        parsed = None
+    if not isinstance(parsed, dict):
+        parsed = None
+    keys = uncertain_verdicts(risks, parsed or ())
+    if keys == []:
+        return None
+    if keys is None or parsed is None:
+        record_escalations(SERVICE, list(parsed or ("all",)))
+        return None, RISK_PROMPT.format(clauses=sent)
+    record_escalations(SERVICE, keys)
+    return keys, RISK_PROMPT.format(clauses=json.dumps({key: parsed[key] for key in keys if key in parsed}))
+
+
+def _merge_escalation(risks, status, keys, response):
+    # Returns (risks, status); a partial response on either model makes the result partial
+    escalated, escalated_status = _parse_response(response)
+    if keys is None:
+        return (escalated, escalated_status) if "error" not in escalated else (risks, status)
+    partial = "partial" in (status, escalated_status)
+    return merge_escalated(risks, escalated, keys), "partial" if partial else status
+
+
+def classify_risks(clauses: str):
+    """
+    Classify the risk of each clause.
+
+    Clauses near-identical to ones classified before (see clause_index) reuse the stored
+    verdict and, with RISK_PREFILTER_ENABLED, clauses the local prefilter is confident
+    about are answered by it; only the rest are sent to the LLM, and no call is made if
+    none are left.
+    With MODEL_CASCADE_ENABLED, low-confidence verdicts are re-classified on CASCADE_LARGE_MODEL.
+    """
+    with observe_stage("classify_risks"):
+        indexed = _IndexedClauses(clauses)
+        indexed.resolve()
+        if indexed.all_known:
+            return indexed.merge()
+        response = invoke_llm(SERVICE, indexed.prompt(), TEMPERATURE, json_mode=True)
+        with observe_stage("json_parse"):
+            risks, status = _parse_response(response)
+        escalation = _escalation(indexed.pending(), risks)
+        if escalation:
+            keys, prompt = escalation
+            response = invoke_llm(SERVICE, prompt, TEMPERATURE, model=settings.CASCADE_LARGE_MODEL, json_mode=True)
+            with observe_stage("json_parse"):
+                risks, status = _merge_escalation(risks, status, keys, response)
+        return indexed.merge(risks, status)
+
+
+async def _amerge(indexed, risks=None, status="clean"):
+    if not indexed.uses_index:
+        return indexed.merge(risks, status)
+    return await asyncio.to_thread(indexed.merge, risks, status)
+
+
+async def aclassify_risks(clauses: str):
+    """Async variant of classify_risks - awaits the LLM instead of blocking a thread"""
+    with observe_stage("classify_risks"):
+        indexed = _IndexedClauses(clauses)
+        if indexed.uses_index:
+            await asyncio.to_thread(indexed.resolve)
+        if indexed.all_known:
+            return await _amerge(indexed)
+        response = await ainvoke_llm(SERVICE, indexed.prompt(), TEMPERATURE, json_mode=True)
+        with observe_stage("json_parse"):
+            risks, status = _parse_response(response)
+        escalation = _escalation(indexed.pending(), risks)
+        if escalation:
+            keys, prompt = escalation
+            response = await ainvoke_llm(
+                SERVICE, prompt, TEMPERATURE, model=settings.CASCADE_LARGE_MODEL, json_mode=True
+            )
+            with observe_stage("json_parse"):
+                risks, status = _merge_escalation(risks, status, keys, response)
+        return await _amerge(indexed, risks, status)
\ No newline at end of file
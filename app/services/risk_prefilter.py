@@ -0,0 +1,357 @@
+"""
+Local risk pre-classifier (RISK_PREFILTER_ENABLED): TF-IDF features and a logistic
+regression in NumPy, trained offline on verdicts the LLM gave in past reviews.
+
+Clauses it is confident about are answered locally; the rest still go to the LLM.
+"""
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+import zlib
+import numpy as np
+from app.config import settings
+from app.metrics import RISK_PREFILTER_DECISIONS
+
+LEVELS = ("high", "medium", "low")
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+# Marks verdicts given by the prefilter, so they are never used as training labels
+MARKER = "local classifier"
+# Share of the (deduplicated) examples held out to measure precision
+HOLDOUT_SHARE = 0.2
+# Thresholds reported alongside the configured one
+REPORT_THRESHOLDS = (0.8, 0.9, 0.95, 0.98, 0.99)
+
+
+def tokenize(clause_type: str, text: str):
+    """Words and word pairs of a clause, plus its clause type"""
+    words = TOKEN_RE.findall(text.lower())
+    return [f"type={clause_type}", *words, *(f"{a} {b}" for a, b in zip(words, words[1:]))]
+
+
+class RiskPrefilter:
+    """A trained model: vocabulary, IDF weights and per-level linear weights"""
+
+    def __init__(self, vocabulary, idf, weights, bias, metadata):
+        self.vocabulary = vocabulary
+        self.index = {token: i for i, token in enumerate(vocabulary)}
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+        self.metadata = metadata
+
+    @property
+    def id(self):
+        return self.metadata["id"]
+
+    def _features(self, items):
+        """Sparse rows (row, column, value) of L2-normalized, sublinear TF-IDF vectors"""
+        rows, cols, values = [], [], []
+        for row, (clause_type, text) in enumerate(items):
+            counts = {}
+            for token in tokenize(clause_type, text):
+                column = self.index.get(token)
+                if column is not None:
+                    counts[column] = counts.get(column, 0) + 1
+            if not counts:
+                continue
+            row_values = [(1 + math.log(count)) * self.idf[column] for column, count in counts.items()]
+            norm = math.sqrt(sum(v * v for v in row_values))
+            rows.extend([row] * len(counts))
+            cols.extend(counts)
+            values.extend(v / norm for v in row_values)
+        return (
+            np.asarray(rows, dtype=np.int64),
+            np.asarray(cols, dtype=np.int64),
+            np.asarray(values, dtype=np.float32),
+        )
+
+    def predict_proba(self, items):
+        """Probability of each level (columns in LEVELS order) for (clause_type, text) pairs"""
+        rows, cols, values = self._features(items)
+        scores = np.tile(self.bias, (len(items), 1))
+        np.add.at(scores, rows, self.weights[cols] * values[:, None])
+        return _softmax(scores)
+
+    def answer(self, clauses: dict, threshold=None, levels=None):
+        """
+        Verdicts for the clauses the model is confident about.
+
+        Args:
+            clauses: {clause_type: clause text}
+            threshold: Minimum probability (default: RISK_PREFILTER_THRESHOLD)
+            levels: Levels it may answer (default: RISK_PREFILTER_LEVELS)
+
+        Returns:
+            {clause_type: "Low Risk: ..."} for the confident clauses only
+        """
+        threshold = settings.RISK_PREFILTER_THRESHOLD if threshold is None else threshold
+        levels = _levels() if levels is None else levels
+        items = [(key, text) for key, text in clauses.items() if text.strip().lower() != "not_found"]
+        if not items:
+            return {}
+        probabilities = self.predict_proba(items)
+        answered = {}
+        for (key, _), p in zip(items, probabilities):
+            best = int(np.argmax(p))
+            if p[best] >= threshold and LEVELS[best] in levels:
+                answered[key] = (
+                    f"{LEVELS[best].capitalize()} Risk: matches clauses rated {LEVELS[best]} risk "
+                    f"in past reviews ({MARKER}, p={p[best]:.2f})"
+                )
+        return answered
+
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write then rename, so a running worker never loads a half-written file
+        tmp = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp,
+            vocabulary=np.asarray(self.vocabulary),
+            idf=self.idf,
+            weights=self.weights,
+            bias=self.bias,
+            metadata=np.asarray(json.dumps(self.metadata)),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["vocabulary"].tolist(),
+                data["idf"],
+                data["weights"],
+                data["bias"],
+                json.loads(str(data["metadata"])),
+            )
+
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _levels():
+    return {level.strip().lower() for level in settings.RISK_PREFILTER_LEVELS.split(",") if level.strip()}
+
+
+def _is_holdout(clause_type: str, text: str):
+    # By content, so a clause lands on the same side on every run
+    return zlib.crc32(f"{clause_type}\n{text}".encode("utf-8")) % 100 < HOLDOUT_SHARE * 100
+
+
+def _fit(model, items, labels, epochs, learning_rate, l2):
+    """Softmax regression by full-batch Adam on the sparse TF-IDF matrix"""
+    rows, cols, values = model._features(items)
+    targets = np.zeros((len(items), len(LEVELS)), dtype=np.float32)
+    targets[np.arange(len(items)), labels] = 1.0
+    params = [model.weights, model.bias]
+    moments = [np.zeros_like(p) for p in params]
+    velocities = [np.zeros_like(p) for p in params]
+    for step in range(1, epochs + 1):
+        scores = np.tile(model.bias, (len(items), 1))
+        np.add.at(scores, rows, model.weights[cols] * values[:, None])
+        error = (_softmax(scores) - targets) / len(items)
+        grad_weights = np.stack(
+            [np.bincount(cols, weights=values * error[rows, k], minlength=len(model.vocabulary))
+             for k in range(len(LEVELS))],
+            axis=1,
+        ).astype(np.float32) + l2 * model.weights
+        grads = [grad_weights, error.sum(axis=0)]
+        for param, grad, m, v in zip(params, grads, moments, velocities):
+            m[:] = 0.9 * m + 0.1 * grad
+            v[:] = 0.999 * v + 0.001 * grad * grad
+            param -= learning_rate * (m / (1 - 0.9 ** step)) / (np.sqrt(v / (1 - 0.999 ** step)) + 1e-8)
+
+
+def evaluate(model, items, labels, thresholds, levels):
+    """
+    Precision and coverage against the LLM's labels at each threshold.
+
+    Only answers the prefilter would give count: probability at or above the threshold
+    and a level in ``levels``. Precision is the share of those answers that match the LLM.
+    """
+    if not items:
+        return {}
+    probabilities = model.predict_proba(items)
+    best = probabilities.argmax(axis=1)
+    confidence = probabilities.max(axis=1)
+    allowed = np.isin(best, [LEVELS.index(level) for level in levels])
+    labels = np.asarray(labels)
+    report = {}
+    for threshold in thresholds:
+        answered = allowed & (confidence >= threshold)
+        count = int(answered.sum())
+        report[str(threshold)] = {
+            "answered": count,
+            "coverage": round(count / len(items), 4),
+            "precision": round(float((best[answered] == labels[answered]).mean()), 4) if count else None,
+        }
+    return report
+
+
+def train(examples, fingerprint="", threshold=None, levels=None, max_features=20000, min_df=2,
+          epochs=300, learning_rate=0.05, l2=1e-4):
+    """
+    Train a prefilter on past LLM verdicts.
+
+    Args:
+        examples: (clause_type, clause text, level) triples; "not_found" clauses and
+            verdicts given by the prefilter itself should already be left out
+        fingerprint: Model and prompt that produced the labels; the prefilter is only
+            used while they are unchanged
+        threshold: Confidence threshold to report precision at (default: RISK_PREFILTER_THRESHOLD)
+        levels: Levels the prefilter may answer (default: RISK_PREFILTER_LEVELS)
+
+    Returns:
+        (RiskPrefilter, report) - report has precision and coverage on held-out examples
+
+    Raises:
+        ValueError: If there are too few examples to train on
+    """
+    threshold = settings.RISK_PREFILTER_THRESHOLD if threshold is None else threshold
+    levels = _levels() if levels is None else set(levels)
+    # Repeated clauses (templates) would otherwise appear on both sides of the split
+    unique = {}
+    for clause_type, text, level in examples:
+        if level in LEVELS:
+            unique[(clause_type, text)] = LEVELS.index(level)
+    train_set = [(key, label) for key, label in unique.items() if not _is_holdout(*key)]
+    holdout = [(key, label) for key, label in unique.items() if _is_holdout(*key)]
+    if len(train_set) < 10:
+        raise ValueError(f"Need at least 10 distinct labelled clauses to train, found {len(train_set)}")
+
+    document_frequency = {}
+    for (clause_type, text), _ in train_set:
+        for token in set(tokenize(clause_type, text)):
+            document_frequency[token] = document_frequency.get(token, 0) + 1
+    vocabulary = sorted(
+        (token for token, df in document_frequency.items() if df >= min_df or token.startswith("type=")),
+        key=lambda token: (-document_frequency[token], token),
+    )[:max_features]
+    idf = np.asarray(
+        [math.log((1 + len(train_set)) / (1 + document_frequency[token])) + 1 for token in vocabulary],
+        dtype=np.float32,
+    )
+    model = RiskPrefilter(
+        vocabulary,
+        idf,
+        np.zeros((len(vocabulary), len(LEVELS)), dtype=np.float32),
+        np.zeros(len(LEVELS), dtype=np.float32),
+        {},
+    )
+    _fit(model, [key for key, _ in train_set], [label for _, label in train_set], epochs, learning_rate, l2)
+
+    thresholds = sorted({*REPORT_THRESHOLDS, threshold})
+    holdout_report = evaluate(model, [key for key, _ in holdout], [label for _, label in holdout], thresholds, levels)
+    report = {
+        "examples": len(unique),
+        "train": len(train_set),
+        "holdout": len(holdout),
+        "labels": {level: sum(1 for label in unique.values() if label == i) for i, level in enumerate(LEVELS)},
+        "levels": sorted(levels),
+        "threshold": threshold,
+        "at_threshold": holdout_report.get(str(threshold)),
+        "thresholds": holdout_report,
+    }
+    digest = hashlib.sha256(model.weights.tobytes() + "\n".join(vocabulary).encode("utf-8")).hexdigest()
+    model.metadata = {
+        "id": digest[:16],
+        "fingerprint": fingerprint,
+        "trained_at": time.time(),
+        "report": report,
+    }
+    return model, report
+
+
+class _Loaded:
+    """The model at RISK_PREFILTER_PATH, reloaded when the file changes"""
+
+    def __init__(self):
+        self.model = None
+        self.mtime = None
+        self.answered = 0
+        self.deferred = 0
+        self.stale = False
+        self.lock = threading.Lock()
+
+    def get(self):
+        path = settings.RISK_PREFILTER_PATH
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            self.model = self.mtime = None
+            return None
+        if mtime != self.mtime:
+            with self.lock:
+                if mtime != self.mtime:
+                    try:
+                        self.model = RiskPrefilter.load(path)
+                    except (OSError, ValueError, KeyError):
+                        self.model = None
+                    self.mtime = mtime
+        return self.model
+
+
+_loaded = _Loaded()
+
+
+def get_prefilter(fingerprint: str):
+    """
+    The trained prefilter, or None when disabled, missing or trained for another model or prompt.
+
+    Args:
+        fingerprint: Model and prompt currently producing verdicts (see risk_classifier.verdict_fingerprint)
+    """
+    if not settings.RISK_PREFILTER_ENABLED:
+        return None
+    model = _loaded.get()
+    _loaded.stale = model is not None and model.metadata.get("fingerprint") != fingerprint
+    return None if model is None or _loaded.stale else model
+
+
+def prefilter_fingerprint(fingerprint: str):
+    """The prefilter settings that shape a result, for cache keys (empty when it's not in use)"""
+    model = get_prefilter(fingerprint)
+    if model is None:
+        return ""
+    return f"prefilter:{model.id}:{settings.RISK_PREFILTER_THRESHOLD}:{','.join(sorted(_levels()))}"
+
+
+def prefilter_clauses(clauses: dict, fingerprint: str):
+    """Verdicts the prefilter is confident about for {clause_type: text} ({} when it's not in use)"""
+    model = get_prefilter(fingerprint)
+    if model is None or not clauses:
+        return {}
+    answered = model.answer(clauses)
+    with _loaded.lock:
+        _loaded.answered += len(answered)
+        _loaded.deferred += len(clauses) - len(answered)
+    RISK_PREFILTER_DECISIONS.labels("answered").inc(len(answered))
+    RISK_PREFILTER_DECISIONS.labels("deferred").inc(len(clauses) - len(answered))
+    return answered
+
+
+def prefilter_stats():
+    """Decisions in this process and the loaded model's training report"""
+    model = _loaded.model if settings.RISK_PREFILTER_ENABLED else None
+    with _loaded.lock:
+        decided = _loaded.answered + _loaded.deferred
+        return {
+            "enabled": settings.RISK_PREFILTER_ENABLED,
+            "model_id": model.id if model else None,
+            "stale": _loaded.stale,
+            "threshold": settings.RISK_PREFILTER_THRESHOLD,
+            "levels": sorted(_levels()),
+            "answered": _loaded.answered,
+            "deferred": _loaded.deferred,
+            "answer_rate": round(_loaded.answered / decided, 4) if decided else 0.0,
+            "training": model.metadata.get("report") if model else None,
+        }
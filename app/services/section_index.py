@@ -0,0 +1,166 @@
+"""Local section segmentation and keyword scoring used to target clause extraction"""
+import re
+from dataclasses import dataclass
+from app.config import settings
+
+
+# Headings such as "1.", "4.2", "12)", "Section 7", "ARTICLE IV", "§ 3" at the start of a line
+HEADING_RE = re.compile(
+    r"^\s*(?:(?:section|article|clause)\s+[0-9ivxlc]+(?:\.\d+)*\b|§\s*\d+(?:\.\d+)*|\d{1,3}(?:\.\d{1,3})*[.)])",
+    re.IGNORECASE,
+)
+# Short all-caps lines ("CONFIDENTIALITY", "GOVERNING LAW AND JURISDICTION") also start a section
+CAPS_HEADING_RE = re.compile(r"^\s*[A-Z][A-Z0-9 ,;&/'()-]{3,80}$")
+
+# Keyword weights per clause type; matches in a heading count HEADING_WEIGHT times
+CLAUSE_KEYWORDS = {
+    "termination": {
+        "terminat": 3, "notice period": 2, "expir": 1, "renewal": 1, "for cause": 2,
+        "for convenience": 2, "breach": 1, "wind down": 1, "survive": 1,
+    },
+    "confidentiality": {
+        "confidential": 3, "non-disclosure": 3, "nondisclosure": 3, "proprietary": 2,
+        "trade secret": 2, "disclos": 1, "receiving party": 2, "disclosing party": 2,
+    },
+    "payment_terms": {
+        "payment": 3, "invoice": 3, "fee": 2, "price": 1, "late": 1, "interest": 1,
+        "payable": 2, "installment": 2, "net 30": 2, "net 45": 2, "net 60": 2, "currency": 1,
+        "compensation": 2, "tax": 1, "$": 1,
+    },
+    "liability": {
+        "liabilit": 3, "indemn": 3, "warrant": 2, "damages": 2, "consequential": 2,
+        "limitation": 1, "insurance": 2, "hold harmless": 2, "cap": 1,
+    },
+    "governing_law": {
+        "governing law": 4, "governed by": 3, "jurisdiction": 3, "arbitration": 3,
+        "venue": 2, "courts of": 2, "dispute": 2, "laws of the state": 3, "mediation": 1,
+    },
+}
+HEADING_WEIGHT = 4
+
+
+@dataclass
+class Section:
+    index: int
+    heading: str
+    text: str
+
+
+def _is_heading(line: str):
+    stripped = line.strip()
+    if not stripped:
+        return False
+    if HEADING_RE.match(stripped):
+        return True
+    return bool(CAPS_HEADING_RE.match(stripped)) and any(c.isalpha() for c in stripped)
+
+
+def split_sections(text: str, fallback_size=1500):
+    """
+    Split a contract into sections at numbered or all-caps headings.
+
+    Text with no recognizable headings falls back to blank-line separated blocks
+    of roughly fallback_size characters, so scoring still has something to rank.
+    """
+    sections = []
+    heading = ""
+    lines = []
+
+    def flush():
+        body = "\n".join(lines).strip()
+        if body or heading:
+            sections.append(Section(len(sections), heading, body))
+
+    for line in text.splitlines():
+        if _is_heading(line):
+            flush()
+            heading = line.strip()
+            lines = [line]
+        else:
+            lines.append(line)
+    flush()
+
+    if len(sections) > 1:
+        return sections
+
+    # No headings - group paragraphs into blocks
+    sections = []
+    block = []
+    size = 0
+    for paragraph in re.split(r"\n\s*\n", text):
+        block.append(paragraph)
+        size += len(paragraph)
+        if size >= fallback_size:
+            sections.append(Section(len(sections), "", "\n\n".join(block).strip()))
+            block, size = [], 0
+    if block:
+        sections.append(Section(len(sections), "", "\n\n".join(block).strip()))
+    return sections
+
+
+def score_section(section: Section):
+    """Return {clause_type: score} for one section"""
+    heading = section.heading.lower()
+    body = section.text.lower()
+    scores = {}
+    for clause_type, keywords in CLAUSE_KEYWORDS.items():
+        score = 0
+        for keyword, weight in keywords.items():
+            if keyword in heading:
+                score += weight * HEADING_WEIGHT
+            score += weight * min(body.count(keyword), 5)
+        scores[clause_type] = score
+    return scores
+
+
+def clause_evidence(text: str):
+    """Return {clause_type: score of the best-matching section} - how clearly the contract covers each type"""
+    best = dict.fromkeys(CLAUSE_KEYWORDS, 0)
+    for section in split_sections(text):
+        for clause_type, score in score_section(section).items():
+            best[clause_type] = max(best[clause_type], score)
+    return best
+
+
+def select_clause_spans(text: str, max_chars=None, per_clause=None, clause_types=None):
+    """
+    Keep only the sections most likely to hold the five clause types.
+
+    The top ``per_clause`` sections for each clause type are selected, then
+    emitted in document order until ``max_chars`` is reached (highest-scoring
+    sections are kept first when the budget is tight).
+
+    Args:
+        text: Full contract text
+        max_chars: Character budget for the selected text (default: CLAUSE_TARGET_MAX_CHARS)
+        per_clause: Sections kept per clause type (default: CLAUSE_TARGET_TOP_K)
+        clause_types: Only select sections for these clause types (default: all five)
+
+    Returns:
+        The selected text, or the original text if nothing matched
+    """
+    max_chars = max_chars or settings.CLAUSE_TARGET_MAX_CHARS
+    per_clause = per_clause or settings.CLAUSE_TARGET_TOP_K
+    sections = split_sections(text)
+    scored = [(section, score_section(section)) for section in sections]
+
+    best = {}
+    for clause_type in clause_types or CLAUSE_KEYWORDS:
+        ranked = sorted(scored, key=lambda item: item[1][clause_type], reverse=True)
+        for section, scores in ranked[:per_clause]:
+            if scores[clause_type] > 0:
+                best[section.index] = max(best.get(section.index, 0), scores[clause_type])
+
+    if not best:
+        return text
+
+    # Fill the budget with the strongest sections, then restore document order
+    chosen = []
+    used = 0
+    for index in sorted(best, key=best.get, reverse=True):
+        length = len(sections[index].text) + 2
+        if used + length > max_chars and chosen:
+            continue
+        chosen.append(index)
+        used += length
+    return "\n\n".join(sections[index].text for index in sorted(chosen))
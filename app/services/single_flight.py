@@ -0,0 +1,335 @@
+"""Single-flight deduplication: identical reviews in flight at the same time share one computation"""
+import asyncio
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from contextlib import contextmanager
+from app.config import settings
+from app.metrics import REVIEWS_COALESCED
+from app.services.deadline import PartialReview, ReviewCancelled, current_deadline
+
+# Finished results stay readable this long for workers polling another worker's lease
+RESULT_LINGER = 60.0
+
+
+class _Abandoned(Exception):
+    """The leader was cancelled or cut off by its deadline; a waiter takes over"""
+
+
+def _time_left():
+    # A waiter waits no longer than its own review's deadline allows
+    deadline = current_deadline()
+    return deadline.remaining() if deadline is not None else None
+
+
+def _give_up():
+    """Raise ReviewCancelled for a waiter whose deadline passed before the result arrived"""
+    deadline = current_deadline()
+    deadline.cancel("deadline")
+    raise ReviewCancelled(deadline.reason)
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one computation.
+
+    Within a process the first caller (the leader) runs the computation and later
+    callers wait on its future; threads and asyncio tasks share the same futures.
+    Across processes (uvicorn workers, Gradio) the leader also holds a lease in a
+    SQLite file: a worker that finds another worker's lease polls until the result
+    is published there, and takes over if the lease is released without one or
+    expires after ``lease_ttl`` seconds. With an empty path only in-process calls
+    are coalesced.
+
+    Every waiter gets its own copy of the result. A failure is shared with the
+    in-process waiters; waiters in other processes retry once the lease is gone.
+    A waiter whose own deadline (see deadline.current_deadline) passes first stops
+    waiting with ReviewCancelled("deadline").
+    """
+
+    def __init__(self, path="", lease_ttl=300.0, poll_interval=0.25):
+        self.path = path
+        self.lease_ttl = lease_ttl
+        self.poll_interval = poll_interval
+        self.owner = uuid.uuid4().hex
+        self.leaders = 0
+        self.local_waits = 0
+        self.remote_waits = 0
+        self.takeovers = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._ready = False
+
+    @contextmanager
+    def _connect(self):
+        if not self._ready:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            if not self._ready:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS single_flight ("
+                    "key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL, result TEXT)"
+                )
+                self._ready = True
+            yield conn
+        finally:
+            conn.close()
+
+    def _join(self, key):
+        """Return (future, is_leader) for ``key`` in this process"""
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self.local_waits += 1
+                REVIEWS_COALESCED.labels("local").inc()
+                return future, False
+            future = Future()
+            # A running future can't be cancelled by a waiter that goes away
+            future.set_running_or_notify_cancel()
+            self._flights[key] = future
+            return future, True
+
+    def _claim(self, key, waiting=False):
+        """
+        Try to take the cross-process lease for ``key``.
+
+        A result published before we started waiting is not reused - this is not a cache.
+
+        Returns:
+            ("lease", None) when this process now holds it, ("done", result) when
+            the worker we were waiting on published a result, or ("wait", None)
+        """
+        if not self.path:
+            return "lease", None
+        try:
+            with self._connect() as conn:
+                now = time.time()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.execute("DELETE FROM single_flight WHERE expires_at < ?", (now,))
+                    row = conn.execute(
+                        "SELECT owner, result FROM single_flight WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row and row[1] is not None and waiting:
+                        conn.execute("COMMIT")
+                        return "done", json.loads(row[1])
+                    if row and row[1] is None and row[0] != self.owner:
+                        conn.execute("COMMIT")
+                        return "wait", None
+                    conn.execute(
+                        "INSERT OR REPLACE INTO single_flight (key, owner, expires_at, result) VALUES (?, ?, ?, NULL)",
+                        (key, self.owner, now + self.lease_ttl),
+                    )
+                    conn.execute("COMMIT")
+                    return "lease", None
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error:
+            # The lease store is best-effort; compute locally rather than fail the review
+            return "lease", None
+
+    def _release(self, key, result=None):
+        """Give up the lease, publishing ``result`` for workers polling it (None: just drop the lease)"""
+        if not self.path:
+            return
+        try:
+            with self._connect() as conn:
+                if result is None:
+                    conn.execute("DELETE FROM single_flight WHERE key = ? AND owner = ?", (key, self.owner))
+                else:
+                    conn.execute(
+                        "UPDATE single_flight SET result = ?, expires_at = ? WHERE key = ? AND owner = ?",
+                        (json.dumps(result), time.time() + RESULT_LINGER, key, self.owner),
+                    )
+        except (sqlite3.Error, TypeError, ValueError):
+            pass
+
+    @staticmethod
+    def _published(result, error):
+        # Only complete results are published; a partial one belongs to its own caller's deadline
+        complete = error is None and not (isinstance(result, dict) and result.get("partial"))
+        return result if complete else None
+
+    def _settle(self, key, future, result, error):
+        # After the lease is released: a caller arriving until now joined as a waiter,
+        # so none took a lease this process was about to drop
+        with self._lock:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _finish(self, key, future, result=None, error=None):
+        try:
+            self._release(key, self._published(result, error))
+        finally:
+            self._settle(key, future, result, error)
+
+    async def _aclaim(self, key, waiting):
+        # SQLite may block on another worker's transaction; keep it off the event loop. If we
+        # are cancelled meanwhile, the claim still finishes before _afinish drops the lease
+        claim = asyncio.ensure_future(asyncio.to_thread(self._claim, key, waiting))
+        try:
+            return await asyncio.shield(claim)
+        except asyncio.CancelledError:
+            await asyncio.wait([claim])
+            raise
+
+    async def _afinish(self, key, future, result=None, error=None):
+        """Async variant of _finish; the lease is released off the event loop"""
+        try:
+            await asyncio.to_thread(self._release, key, self._published(result, error))
+        finally:
+            # Waiters hear the outcome even if we are cancelled while releasing
+            self._settle(key, future, result, error)
+
+    def _poll_delay(self):
+        """Seconds to sleep before polling the lease again; gives up once the waiter's deadline passed"""
+        left = _time_left()
+        if left is None:
+            return self.poll_interval
+        if left == 0:
+            _give_up()
+        return min(self.poll_interval, left)
+
+    def _lead(self, waited):
+        with self._lock:
+            self.leaders += 1
+            # The lease we waited on was released without a result, or expired
+            if waited:
+                self.takeovers += 1
+
+    def run(self, key, compute):
+        """
+        Return ``(result, shared)``: ``compute()``'s result, computed here or by a concurrent caller.
+
+        ``shared`` is True when another caller (in this process or another) computed it.
+        """
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    return copy.deepcopy(future.result(timeout=_time_left())), True
+                except _Abandoned:
+                    continue
+                except TimeoutError:
+                    if future.done():
+                        raise
+                    _give_up()
+
+            waited = False
+            try:
+                while True:
+                    state, result = self._claim(key, waited)
+                    if state != "wait":
+                        break
+                    if not waited:
+                        waited = True
+                        with self._lock:
+                            self.remote_waits += 1
+                        REVIEWS_COALESCED.labels("remote").inc()
+                    time.sleep(self._poll_delay())
+            except ReviewCancelled:
+                self._finish(key, future, error=_Abandoned())
+                raise
+            if state == "done":
+                self._finish(key, future, result)
+                return copy.deepcopy(result), True
+
+            self._lead(waited)
+            try:
+                result = compute()
+            except (ReviewCancelled, PartialReview):
+                # The leader's client went away or its deadline passed; that says nothing about
+                # the waiters' reviews, so one of them takes over under its own deadline
+                self._finish(key, future, error=_Abandoned())
+                raise
+            except BaseException as e:
+                self._finish(key, future, error=e)
+                raise
+            self._finish(key, future, result)
+            return copy.deepcopy(result), False
+
+    async def arun(self, key, compute):
+        """
+        Async variant of run; ``compute`` is a coroutine function.
+
+        A cancelled leader hands the computation to one of its waiters. The lease store
+        is read and written on worker threads, so a busy SQLite file doesn't stall the loop.
+        """
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    # Shielded: timing out must not cancel the shared future
+                    result = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), _time_left())
+                except _Abandoned:
+                    continue
+                except TimeoutError:
+                    if future.done():
+                        raise
+                    _give_up()
+                return copy.deepcopy(result), True
+
+            waited = False
+            try:
+                while True:
+                    state, result = await self._aclaim(key, waited)
+                    if state != "wait":
+                        break
+                    if not waited:
+                        waited = True
+                        with self._lock:
+                            self.remote_waits += 1
+                        REVIEWS_COALESCED.labels("remote").inc()
+                    await asyncio.sleep(self._poll_delay())
+            except (asyncio.CancelledError, ReviewCancelled):
+                await self._afinish(key, future, error=_Abandoned())
+                raise
+            if state == "done":
+                await self._afinish(key, future, result)
+                return copy.deepcopy(result), True
+
+            self._lead(waited)
+            try:
+                result = await compute()
+            except (asyncio.CancelledError, ReviewCancelled, PartialReview):
+                await self._afinish(key, future, error=_Abandoned())
+                raise
+            except BaseException as e:
+                await self._afinish(key, future, error=e)
+                raise
+            await self._afinish(key, future, result)
+            return copy.deepcopy(result), False
+
+    def stats(self):
+        """Coalescing counters for monitoring"""
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "local_waits": self.local_waits,
+                "remote_waits": self.remote_waits,
+                "takeovers": self.takeovers,
+                "in_flight": len(self._flights),
+                "lease_ttl_seconds": self.lease_ttl,
+                "lease_path": self.path or None,
+            }
+
+
+single_flight = SingleFlight(
+    path=settings.SINGLE_FLIGHT_PATH,
+    lease_ttl=settings.SINGLE_FLIGHT_LEASE_TTL,
+    poll_interval=settings.SINGLE_FLIGHT_POLL_INTERVAL,
+)
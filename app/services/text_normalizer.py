@@ -0,0 +1,231 @@
+"""Token-reducing clean-up of extracted PDF text before it reaches the LLM"""
+import math
+import re
+from app.config import settings
+from app.metrics import TEXT_NORMALIZATION_SAVED, estimate_tokens, observe_stage
+
+# "12", "Page 12 of 40", "- 12 -" on a line of its own, at the top or bottom of a page
+PAGE_MARKER_RE = re.compile(r"^[-–—\s]*(?:page\s+)?\d+(?:\s+of\s+\d+)?(?:\s*\|\s*page)?[-–—\s]*$", re.IGNORECASE)
+# An exhibit heading on a line of its own: "EXHIBIT A", "Schedule 2 - Fees", "ANNEX III: Data Processing"
+EXHIBIT_RE = re.compile(
+    r"^(?:exhibit|schedule|annex|appendix|attachment)\s+[a-z0-9][a-z0-9.]{0,5}\s*(?:[-–—:]\s*.*)?$",
+    re.IGNORECASE,
+)
+SIGNATURE_RE = re.compile(r"\bin witness whereof\b", re.IGNORECASE)
+SPACE_RE = re.compile(r"[ \t\u00a0\f\v]+")
+DIGITS_RE = re.compile(r"\d+")
+# A word broken across lines: "indemni-\nfication"; a capital after the hyphen is a real compound
+HYPHEN_BREAK_RE = re.compile(r"\b([A-Za-z]+)([-\u00ad])\n([a-z]+)")
+# A hyphenated compound written on one line: "non-exclusive", "third-party"
+COMPOUND_RE = re.compile(r"\b[A-Za-z]+-[a-z]+\b")
+# Prefixes that in contracts start a hyphenated compound rather than a broken word
+COMPOUND_PREFIXES = frozenset({"non", "self", "third", "cross"})
+
+# Lines at each end of a page where running headers and footers are looked for
+EDGE_LINES = 3
+# A header/footer is on at least this share of pages (and at least 3 of them)
+REPEAT_SHARE = 0.5
+# Consecutive lines at a page's top or bottom that must repeat verbatim before they count
+# as a duplicated header/footer block; longer lines are body text, whatever repeats
+DUPLICATE_BLOCK_LINES = 2
+DUPLICATE_BLOCK_MAX_LINE_CHARS = 80
+
+
+def _edge_indexes(lines):
+    """Indexes of the first and last EDGE_LINES non-blank lines"""
+    filled = [i for i, line in enumerate(lines) if line]
+    return set(filled[:EDGE_LINES]) | set(filled[-EDGE_LINES:])
+
+
+def _furniture_key(line: str):
+    # Page numbers inside a header ("Acme MSA - page 3") must not make every page's copy unique
+    return DIGITS_RE.sub("#", line.lower())
+
+
+def _strip_furniture(pages):
+    """
+    Drop page numbers and running headers/footers from the edges of each page.
+
+    The first copy of a repeated header without numbers (often the document title) is kept.
+    Returns (pages, lines_removed).
+    """
+    edges = [_edge_indexes(lines) for lines in pages]
+    page_counts = {}
+    for lines, edge in zip(pages, edges):
+        for key in {_furniture_key(lines[i]) for i in edge}:
+            page_counts[key] = page_counts.get(key, 0) + 1
+    threshold = max(3, math.ceil(len(pages) * REPEAT_SHARE))
+    running = {key for key, count in page_counts.items() if count >= threshold}
+
+    kept_first = set()
+    removed = 0
+    cleaned = []
+    for lines, edge in zip(pages, edges):
+        out = []
+        for i, line in enumerate(lines):
+            if i in edge and len(pages) > 1 and PAGE_MARKER_RE.match(line):
+                removed += 1
+                continue
+            if i in edge:
+                key = _furniture_key(line)
+                if key in running:
+                    if "#" in key or key in kept_first:
+                        removed += 1
+                        continue
+                    kept_first.add(key)
+            out.append(line)
+        cleaned.append(out)
+    return cleaned, removed
+
+
+def strip_page_furniture(text: str):
+    """
+    Drop page numbers and running headers/footers from text whose pages were already joined.
+
+    A page is taken to end at each page-number line, then the same rules as in
+    normalize_pages apply. Text without page numbers (e.g. already normalized) comes
+    back unchanged.
+    """
+    pages = [[]]
+    for line in text.splitlines():
+        line = SPACE_RE.sub(" ", line).strip()
+        pages[-1].append(line)
+        if PAGE_MARKER_RE.match(line):
+            pages.append([])
+    if len(pages) < 2:
+        return text
+    pages, _ = _strip_furniture(pages)
+    return "\n".join(line for page in pages for line in page)
+
+
+def drop_page_markers(text: str):
+    """``text`` without lines that are only a page number"""
+    return "\n".join(line for line in text.splitlines() if not PAGE_MARKER_RE.match(line))
+
+
+def _drop_duplicate_blocks(pages):
+    """
+    Remove runs of DUPLICATE_BLOCK_LINES short lines at the top or bottom of a page that
+    repeat such a run from an earlier page: letterheads, legends and notices repeated on
+    too few pages to count as running headers. Repeated text in the body of a page (a
+    clause restated in a schedule) is kept. Linear: one hash per edge window.
+
+    Returns (pages, lines_removed).
+    """
+    size = DUPLICATE_BLOCK_LINES
+    seen = set()
+    removed = 0
+    cleaned = []
+    for lines in pages:
+        edge = _edge_indexes(lines)
+        drop = set()
+        for i in sorted(edge):
+            window = range(i, i + size)
+            if not all(
+                j in edge and lines[j] and len(lines[j]) <= DUPLICATE_BLOCK_MAX_LINE_CHARS for j in window
+            ):
+                continue
+            key = tuple(lines[j] for j in window)
+            if key in seen:
+                drop.update(window)
+            else:
+                seen.add(key)
+        removed += len(drop)
+        cleaned.append([line for i, line in enumerate(lines) if i not in drop])
+    return cleaned, removed
+
+
+def _join_hyphenations(text: str):
+    """
+    Rejoin words broken across lines. A hyphen is kept ("non-\nexclusive" becomes
+    "non-exclusive") when the document writes the same compound on one line elsewhere
+    or the first part is one of COMPOUND_PREFIXES; soft hyphens always go.
+
+    Returns (text, breaks_joined).
+    """
+    compounds = {match.lower() for match in COMPOUND_RE.findall(text)}
+
+    def join(match):
+        first, hyphen, rest = match.groups()
+        compound = f"{first}-{rest}"
+        if hyphen == "-" and (compound.lower() in compounds or first.lower() in COMPOUND_PREFIXES):
+            return compound
+        return first + rest
+
+    return HYPHEN_BREAK_RE.subn(join, text)
+
+
+def _exhibit_start(lines):
+    """
+    Index of the line opening the exhibits, or None.
+
+    Only headings after the signature block (or, without one, in the second half of the
+    document) count, so "Schedule 1 - Fees" inside the body is kept.
+    """
+    start = len(lines) // 2
+    for i, line in enumerate(lines):
+        if SIGNATURE_RE.search(line):
+            start = i
+            break
+    for i in range(start, len(lines)):
+        if len(lines[i]) <= 80 and EXHIBIT_RE.match(lines[i]):
+            return i
+    return None
+
+
+def normalize_pages(pages, strip_exhibits=None, dedupe_blocks=None):
+    """
+    Clean extracted page texts and join them into one document.
+
+    Removes running headers/footers and page numbers, rejoins words hyphenated across
+    lines, collapses whitespace, drops header/footer blocks repeated at page edges and,
+    optionally, everything from the first exhibit heading on. Runs in linear time.
+
+    Args:
+        pages: Text of each page, in order
+        strip_exhibits: Drop exhibits and schedules after the signature block
+            (default: TEXT_NORMALIZATION_STRIP_EXHIBITS)
+        dedupe_blocks: Drop short blocks repeated at page edges (default: TEXT_NORMALIZATION_DEDUPE_BLOCKS)
+
+    Returns:
+        (text, stats) - stats has characters and estimated tokens before, after and saved,
+        plus what was removed
+    """
+    if strip_exhibits is None:
+        strip_exhibits = settings.TEXT_NORMALIZATION_STRIP_EXHIBITS
+    if dedupe_blocks is None:
+        dedupe_blocks = settings.TEXT_NORMALIZATION_DEDUPE_BLOCKS
+    raw = "\n".join(pages)
+    with observe_stage("normalize_text"):
+        split = [[SPACE_RE.sub(" ", line).strip() for line in page.splitlines()] for page in pages]
+        split, furniture = _strip_furniture(split)
+        duplicates = 0
+        if dedupe_blocks:
+            split, duplicates = _drop_duplicate_blocks(split)
+        lines = [line for page in split for line in page]
+        exhibit_chars = 0
+        if strip_exhibits:
+            start = _exhibit_start(lines)
+            if start is not None:
+                exhibit_chars = sum(len(line) + 1 for line in lines[start:])
+                lines = lines[:start]
+        # Keep single blank lines (paragraph breaks) but not runs of them
+        lines = [line for i, line in enumerate(lines) if line or (i and lines[i - 1])]
+        text, hyphenations = _join_hyphenations("\n".join(lines).strip())
+        text = text.replace("\u00ad", "")
+
+    stats = {
+        "chars_before": len(raw),
+        "chars_after": len(text),
+        "chars_saved": len(raw) - len(text),
+        "tokens_before": estimate_tokens(raw),
+        "tokens_after": estimate_tokens(text),
+        "tokens_saved": estimate_tokens(raw) - estimate_tokens(text),
+        "furniture_lines_removed": furniture,
+        "duplicate_lines_removed": duplicates,
+        "hyphenations_joined": hyphenations,
+        "exhibit_chars_removed": exhibit_chars,
+    }
+    TEXT_NORMALIZATION_SAVED.labels("chars").inc(max(0, stats["chars_saved"]))
+    TEXT_NORMALIZATION_SAVED.labels("tokens").inc(max(0, stats["tokens_saved"]))
+    return text, stats
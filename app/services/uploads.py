@@ -0,0 +1,92 @@
+"""Bounded-memory handling of uploaded files"""
+import os
+import tempfile
+import zipfile
+from fastapi import UploadFile
+from app.config import settings
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds MAX_UPLOAD_MB"""
+
+
+async def save_upload(file: UploadFile, suffix=".pdf"):
+    """
+    Stream an upload to a uniquely named file in UPLOAD_DIR.
+
+    The body is copied UPLOAD_CHUNK_SIZE bytes at a time, so memory use stays
+    flat regardless of file size, and concurrent uploads with the same file
+    name never collide.
+
+    Returns:
+        Path of the saved file (the caller is responsible for removing it)
+
+    Raises:
+        UploadTooLargeError: If the upload exceeds MAX_UPLOAD_MB
+        ValueError: If the upload is empty
+    """
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    limit = settings.MAX_UPLOAD_MB * 1024 * 1024
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=settings.UPLOAD_DIR)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > limit:
+                    raise UploadTooLargeError(f"File exceeds the {settings.MAX_UPLOAD_MB} MB upload limit")
+                f.write(chunk)
+        if size == 0:
+            raise ValueError("Uploaded file is empty")
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def extract_pdfs_from_zip(zip_path: str):
+    """
+    Unpack the PDFs in a zip archive to uniquely named files in UPLOAD_DIR.
+
+    Members are streamed out one chunk at a time and each is held to MAX_UPLOAD_MB;
+    non-PDF members and directories are skipped.
+
+    Returns:
+        List of (member_name, path) tuples
+
+    Raises:
+        UploadTooLargeError: If a member exceeds MAX_UPLOAD_MB
+        ValueError: If the archive is not a valid zip file
+    """
+    limit = settings.MAX_UPLOAD_MB * 1024 * 1024
+    extracted = []
+    try:
+        with zipfile.ZipFile(zip_path) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not info.filename.lower().endswith(".pdf"):
+                    continue
+                if info.file_size > limit:
+                    raise UploadTooLargeError(f"{info.filename} exceeds the {settings.MAX_UPLOAD_MB} MB upload limit")
+                fd, path = tempfile.mkstemp(suffix=".pdf", dir=settings.UPLOAD_DIR)
+                extracted.append((os.path.basename(info.filename), path))
+                size = 0
+                with os.fdopen(fd, "wb") as out, archive.open(info) as member:
+                    while chunk := member.read(settings.UPLOAD_CHUNK_SIZE):
+                        # Don't trust the header size - a crafted archive can understate it
+                        size += len(chunk)
+                        if size > limit:
+                            raise UploadTooLargeError(
+                                f"{info.filename} exceeds the {settings.MAX_UPLOAD_MB} MB upload limit"
+                            )
+                        out.write(chunk)
+    except BaseException as e:
+        for _, path in extracted:
+            if os.path.exists(path):
+                os.remove(path)
+        if isinstance(e, zipfile.BadZipFile):
+            raise ValueError("Uploaded zip archive is invalid") from e
+        raise
+    return extracted
@@ -0,0 +1,219 @@
+"""Synthetic contract corpus with known clause locations"""
+import os
+import random
+import textwrap
+
+
+# Each clause type has a few interchangeable provisions; the chosen one is the ground truth
+CLAUSE_LIBRARY = {
+    "termination": [
+        "Either party may terminate this Agreement for convenience upon sixty (60) days prior written notice to the other party.",
+        "This Agreement may be terminated by either party immediately upon written notice if the other party commits a material breach that remains uncured for thirty (30) days.",
+        "The Customer may not terminate this Agreement prior to the end of the Initial Term of five (5) years, and the Agreement shall automatically renew for successive one-year terms.",
+    ],
+    "confidentiality": [
+        "Each party shall hold the other party's Confidential Information in strict confidence and shall not disclose it to any third party for a period of three (3) years after disclosure.",
+        "The Receiving Party shall protect all proprietary and non-public information of the Disclosing Party using at least reasonable care, save for information that becomes publicly available.",
+        "All trade secrets disclosed under this Agreement shall remain confidential in perpetuity and may only be shared with employees on a need-to-know basis.",
+    ],
+    "payment_terms": [
+        "The Client shall pay all invoices within thirty (30) days of receipt in United States dollars by wire transfer; late payments accrue interest at 1.5% per month.",
+        "Fees of $12,000 per month are payable in advance on the first business day of each month, exclusive of applicable taxes.",
+        "Compensation shall be paid in three installments: 40% on signature, 40% on delivery, and 20% on final acceptance, each due net 45.",
+    ],
+    "liability": [
+        "In no event shall either party's aggregate liability exceed the fees paid in the twelve (12) months preceding the claim, and neither party is liable for consequential damages.",
+        "The Supplier shall indemnify and hold harmless the Customer from all third-party claims, and the Supplier's liability under this Agreement shall be unlimited.",
+        "Except as expressly stated, the Services are provided without warranties of any kind, and the Provider shall maintain commercial general liability insurance of $2,000,000.",
+    ],
+    "governing_law": [
+        "This Agreement shall be governed by the laws of the State of New York, and the parties submit to the exclusive jurisdiction of the courts of New York County.",
+        "Any dispute arising out of this Agreement shall be finally resolved by binding arbitration in London under the LCIA Rules, governed by the laws of England and Wales.",
+        "The validity and interpretation of this Agreement are governed by the laws of the State of Delaware without regard to its conflict of law principles.",
+    ],
+}
+
+CLAUSE_HEADINGS = {
+    "termination": ["Termination", "Term and Termination", "Duration and Termination"],
+    "confidentiality": ["Confidentiality", "Confidential Information", "Non-Disclosure"],
+    "payment_terms": ["Payment Terms", "Fees and Payment", "Compensation"],
+    "liability": ["Limitation of Liability", "Indemnification and Liability", "Warranties and Liability"],
+    "governing_law": ["Governing Law", "Governing Law and Jurisdiction", "Dispute Resolution"],
+}
+
+FILLER_SECTIONS = [
+    ("Recitals", "WHEREAS, the Company is engaged in the business of providing professional services; and WHEREAS, the Client wishes to engage the Company on the terms set out herein; NOW, THEREFORE, in consideration of the mutual covenants contained herein, the parties agree as follows."),
+    ("Definitions", "In this Agreement, \"Affiliate\" means any entity controlling, controlled by or under common control with a party; \"Business Day\" means a day other than a Saturday, Sunday or public holiday; \"Deliverables\" means all documents and materials produced by the Company in performing the Services."),
+    ("Scope of Services", "The Company shall perform the services described in each Statement of Work with due skill and care, in accordance with good industry practice, and shall provide suitably qualified personnel."),
+    ("Assignment", "Neither party may assign or transfer any of its rights or obligations under this Agreement without the prior written consent of the other party, such consent not to be unreasonably withheld."),
+    ("Force Majeure", "Neither party shall be in breach of this Agreement if it is prevented from performing its obligations by events beyond its reasonable control, including acts of God, war, flood or pandemic."),
+    ("Notices", "Any notice given under this Agreement shall be in writing and delivered by hand, by registered post or by email to the address specified on the signature page."),
+    ("Entire Agreement", "This Agreement constitutes the entire agreement between the parties and supersedes all prior negotiations, representations and understandings, whether written or oral."),
+    ("Severability", "If any provision of this Agreement is held invalid or unenforceable, the remaining provisions shall continue in full force and effect."),
+    ("Counterparts", "This Agreement may be executed in any number of counterparts, each of which shall be deemed an original and all of which together constitute one instrument."),
+    ("Intellectual Property", "All intellectual property rights in the Deliverables shall vest in the Client upon full payment, save for the Company's pre-existing materials, which are licensed on a non-exclusive basis."),
+    ("Non-Solicitation", "During the term and for twelve months thereafter, neither party shall solicit for employment any employee of the other party who was involved in the Services."),
+    ("Audit", "The Company shall keep complete and accurate records relating to the Services and permit the Client to inspect them on reasonable notice during normal business hours."),
+]
+
+SIGNATURE_BLOCK = (
+    "IN WITNESS WHEREOF, the parties have executed this Agreement as of the Effective Date.\n"
+    "COMPANY: ______________________  Name: ______________  Title: ______________  Date: ________\n"
+    "CLIENT: _______________________  Name: ______________  Title: ______________  Date: ________"
+)
+
+HEADING_STYLES = ("numbered", "section", "article", "caps")
+# A generate_contract "page" (~3,000 characters) renders to about 1.6 pages in write_contract_pdf
+PDF_PAGES_PER_CONTRACT_PAGE = 1.6
+ROMAN = ["I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX", "X", "XI", "XII", "XIII", "XIV", "XV",
+         "XVI", "XVII", "XVIII", "XIX", "XX"]
+
+
+def _heading(style, number, title):
+    if style == "numbered":
+        return f"{number}. {title.upper()}"
+    if style == "section":
+        return f"Section {number}. {title}"
+    if style == "article":
+        return f"ARTICLE {ROMAN[(number - 1) % len(ROMAN)]} - {title.upper()}"
+    return title.upper()
+
+
+def generate_contract(seed: int, pages=3, missing_rate=0.15, misplaced_rate=0.1):
+    """
+    Build a synthetic contract whose clause provisions are known.
+
+    Args:
+        seed: Random seed - the same seed always yields the same contract
+        pages: Approximate length in pages (~3,000 characters each); filler is repeated to fit
+        missing_rate: Probability that a clause type is left out entirely
+        misplaced_rate: Probability that a provision is buried under an unrelated heading
+
+    Returns:
+        (text, labels) where labels maps each clause type to its provision, or None if absent
+    """
+    rng = random.Random(seed)
+    style = rng.choice(HEADING_STYLES)
+    labels = {}
+    sections = []
+    for clause_type, provisions in CLAUSE_LIBRARY.items():
+        if rng.random() < missing_rate:
+            labels[clause_type] = None
+            continue
+        provision = rng.choice(provisions)
+        labels[clause_type] = provision
+        if rng.random() < misplaced_rate:
+            title, body = rng.choice(FILLER_SECTIONS)
+            sections.append((title, f"{body} {provision}"))
+        else:
+            sections.append((rng.choice(CLAUSE_HEADINGS[clause_type]), provision))
+
+    # Pad with filler sections until the target length is reached
+    target_chars = max(1, pages) * 3000
+    length = sum(len(body) for _, body in sections)
+    while length < target_chars:
+        title, body = rng.choice(FILLER_SECTIONS)
+        sections.append((title, body))
+        length += len(body)
+
+    rng.shuffle(sections)
+    # Recitals and definitions read naturally at the front
+    sections.sort(key=lambda section: section[0] not in ("Recitals", "Definitions"))
+
+    parts = ["MASTER SERVICES AGREEMENT",
+             f"This Master Services Agreement is entered into as of the Effective Date between Party A and Party B (reference {seed})."]
+    for number, (title, body) in enumerate(sections, start=1):
+        parts.append(_heading(style, number, title))
+        parts.append(body)
+    parts.append(SIGNATURE_BLOCK)
+    return "\n\n".join(parts), labels
+
+
+def generate_corpus(count: int, seed=0, pages=3):
+    """Yield (text, labels) for ``count`` contracts; pages may be an int or a (min, max) range"""
+    rng = random.Random(seed)
+    for index in range(count):
+        doc_pages = rng.randint(*pages) if isinstance(pages, tuple) else pages
+        yield generate_contract(seed * 100_003 + index, pages=doc_pages)
+
+
+def _pdf_escape(line: str):
+    # Helvetica in a simple PDF only covers Latin-1
+    line = line.encode("latin-1", "replace").decode("latin-1")
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_contract_pdf(text: str, path: str, lines_per_page=56, chars_per_line=95,
+                       header="CONFIDENTIAL - MASTER SERVICES AGREEMENT"):
+    """
+    Render text as a simple multi-page PDF (Helvetica, one text stream per page).
+
+    Every page carries the same header and a "Page N of M" footer, as real contracts do.
+
+    Returns:
+        Number of pages written
+    """
+    lines = []
+    for paragraph in text.split("\n"):
+        lines.extend(textwrap.wrap(paragraph, chars_per_line) or [""])
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page objects are numbered
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+    for number, page_lines in enumerate(pages, start=1):
+        body = [header, ""] + page_lines + ["", f"Page {number} of {len(pages)}"]
+        stream = "BT /F1 9 Tf 50 770 Td 12.5 TL " + " ".join(f"({_pdf_escape(line)}) '" for line in body) + " ET"
+        content_id = len(objects) + 2
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        page_refs.append(f"{len(objects)} 0 R")
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(page_refs)}] /Count {len(pages)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+
+    with open(path, "wb") as f:
+        f.write(out)
+    return len(pages)
+
+
+def contract_pages_for_pdf(pdf_pages: int):
+    """generate_contract ``pages`` value that renders to roughly pdf_pages PDF pages"""
+    return max(1, round(pdf_pages / PDF_PAGES_PER_CONTRACT_PAGE))
+
+
+def write_pdf_corpus(directory: str, count: int, seed=0, pages=(2, 300)):
+    """
+    Write ``count`` synthetic contract PDFs to directory.
+
+    Args:
+        pages: Target PDF page count, an int or a (min, max) range
+
+    Returns:
+        List of (path, labels, page_count)
+    """
+    os.makedirs(directory, exist_ok=True)
+    if isinstance(pages, tuple):
+        pages = tuple(contract_pages_for_pdf(p) for p in pages)
+    else:
+        pages = contract_pages_for_pdf(pages)
+    written = []
+    for index, (text, labels) in enumerate(generate_corpus(count, seed=seed, pages=pages)):
+        path = os.path.join(directory, f"contract_{seed}_{index:05d}.pdf")
+        written.append((path, labels, write_contract_pdf(text, path)))
+    return written
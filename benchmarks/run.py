@@ -0,0 +1,923 @@
+"""
+Offline performance benchmarks for the review pipeline.
+
+Every LLM call is answered by the local FakeChatModel (LLM_PROVIDER=fake) and the
+review cache is disabled, so results depend only on the code under test and can be
+compared between commits.
+
+Measures:
+    load_pdf     - pages/second for synthetic PDFs, serial vs. process pool
+    normalize    - text normalization time and characters/tokens removed, up to 500-page PDFs
+    review       - run_full_review latency (p50/p95) on synthetic contracts
+    topologies   - run_full_review latency, LLM calls and tokens per pipeline topology
+    json         - extraction responses recovered from malformed JSON, regex parser vs. json_repair
+    rate_limit   - a burst of reviews against a fake provider that answers 429 over its budget
+    llm_cache    - LLM calls and tokens with the call-level response cache off, on, and on a re-review
+    scheduler    - interactive review latency while a batch job saturates the LLM slots, FIFO vs. fair
+    review_store - save rate and portfolio query latency over many stored reviews (no LLM calls)
+    api          - concurrent POST /review throughput (in-process ASGI transport)
+    gradio       - concurrent analyze_contract throughput (one thread per session)
+
+Usage:
+    python -m benchmarks.run --output bench_results.json
+    python -m benchmarks.run --quick --baseline bench_results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from app.config import settings
+
+# Configure the fake provider before anything builds an LLM
+settings.LLM_PROVIDER = "fake"
+settings.REVIEW_CACHE_ENABLED = False
+settings.LLM_CACHE_ENABLED = False
+# Reruns over the same corpus would otherwise be answered from the clause index
+settings.CLAUSE_INDEX_ENABLED = False
+# The fake provider has no limits unless a benchmark sets them (see bench_rate_limit)
+settings.LLM_RATE_LIMIT_ENABLED = False
+# Coalesce within the benchmark process only, so no lease file is left behind
+settings.SINGLE_FLIGHT_PATH = ""
+# Benchmark reviews are not part of anyone's portfolio (see bench_review_store)
+settings.REVIEW_STORE_ENABLED = False
+
+from benchmarks.corpus import (  # noqa: E402
+    contract_pages_for_pdf,
+    generate_contract,
+    generate_corpus,
+    write_contract_pdf,
+    write_pdf_corpus,
+)
+
+# Metrics where a smaller value is an improvement (everything else: bigger is better)
+LOWER_IS_BETTER = ("seconds", "_ms", "_us", "failures", "throttled", "llm_calls", "_tokens", "_cost")
+BENCHMARKS = ("load_pdf", "normalize", "review", "topologies", "json", "rate_limit", "single_flight", "cascade", "review_store", "prefilter", "llm_cache", "deadline", "scheduler", "api", "gradio")
+# Workload sizes, not measurements - left out of baseline comparisons
+WORKLOAD_KEYS = ("pages", "concurrency", "requests", "sessions", "contracts", "responses", "stored_reviews", "training_reviews")
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _latency_summary(samples):
+    return {
+        "p50_ms": round(_percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(_percentile(samples, 95) * 1000, 2),
+        "mean_ms": round(statistics.mean(samples) * 1000, 2),
+    }
+
+
+def bench_load_pdf(workdir, page_counts, repeats):
+    from app.services.pdf_loader import load_pdf, shutdown_pool
+
+    results = {}
+    for pages in page_counts:
+        text, _ = generate_contract(pages, pages=contract_pages_for_pdf(pages))
+        path = os.path.join(workdir, f"load_{pages}.pdf")
+        actual_pages = write_contract_pdf(text, path)
+        entry = {"pages": actual_pages}
+        for label, use_pool in (("serial", False), ("pool", True)):
+            load_pdf(path, use_pool=use_pool)  # warm the pool and the page cache
+            samples = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                load_pdf(path, use_pool=use_pool)
+                samples.append(time.perf_counter() - started)
+            best = min(samples)
+            entry[f"{label}_seconds"] = round(best, 4)
+            entry[f"{label}_pages_per_second"] = round(actual_pages / best, 1)
+        results[str(pages)] = entry
+    shutdown_pool()
+    return results
+
+
+def bench_normalize(workdir, page_counts, repeats):
+    """Normalize synthetic PDFs' pages, with and without duplicate-block removal"""
+    from app.services.pdf_loader import load_pdf_pages
+    from app.services.text_normalizer import normalize_pages
+
+    results = {}
+    for pages in page_counts:
+        text, _ = generate_contract(pages, pages=contract_pages_for_pdf(pages))
+        path = os.path.join(workdir, f"normalize_{pages}.pdf")
+        actual_pages = write_contract_pdf(text, path)
+        page_texts = load_pdf_pages(path, use_pool=False)
+        entry = {"pages": actual_pages}
+        # The synthetic contracts repeat filler sections; they are body text, which dedupe must keep
+        for label, dedupe in (("furniture", False), ("dedupe", True)):
+            samples = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                _, stats = normalize_pages(page_texts, dedupe_blocks=dedupe)
+                samples.append(time.perf_counter() - started)
+            entry[label] = {
+                "ms": round(min(samples) * 1000, 2),
+                "chars_saved_percent": round(100 * stats["chars_saved"] / stats["chars_before"], 1),
+                "tokens_saved": stats["tokens_saved"],
+            }
+        results[str(pages)] = entry
+    return results
+
+
+def bench_review(contracts):
+    from app.orchestrator import run_full_review
+
+    samples = []
+    for text, _ in contracts:
+        started = time.perf_counter()
+        run_full_review(text)
+        samples.append(time.perf_counter() - started)
+    return {"contracts": len(contracts), **_latency_summary(samples)}
+
+
+def bench_topologies(contracts):
+    from app.orchestrator import TOPOLOGIES, run_full_review
+
+    results = {}
+    for topology in TOPOLOGIES:
+        samples = []
+        totals = {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        for text, _ in contracts:
+            started = time.perf_counter()
+            pipeline = run_full_review(text, topology=topology)["pipeline"]
+            samples.append(time.perf_counter() - started)
+            for key in totals:
+                totals[key] += pipeline[key]
+        results[topology] = {
+            **_latency_summary(samples),
+            **{f"{key}_per_review": round(value / len(contracts), 1) for key, value in totals.items()},
+        }
+    return results
+
+
+def _regex_parse(text):
+    # The parser the services used before json_repair: greedy regex, then json.loads or nothing
+    try:
+        match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', text, re.DOTALL)
+        if match:
+            text = match.group(1)
+        match = re.search(r'\{.*\}', text, re.DOTALL)
+        return json.loads(match.group(0) if match else text)
+    except (json.JSONDecodeError, AttributeError):
+        return None
+
+
+def bench_llm_cache(workdir, contracts):
+    """
+    Review ``contracts`` with the call-level LLM response cache off, then twice with it on.
+
+    The first cached pass only hits where contracts share an extraction (or a chunk);
+    the second re-reviews the same contracts, as after the review cache expired.
+    Reported per pass: LLM calls, tokens and latency, then hit rates per service and
+    the compressed size of the store.
+    """
+    from app.orchestrator import run_full_review
+    from app.services.llm_cache import get_llm_cache, reset_llm_cache
+
+    def run_pass():
+        totals = {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "llm_cache_hits": 0}
+        samples = []
+        for text, _ in contracts:
+            started = time.perf_counter()
+            pipeline = run_full_review(text)["pipeline"]
+            samples.append(time.perf_counter() - started)
+            for key in totals:
+                totals[key] += pipeline[key]
+        return {**totals, **_latency_summary(samples)}
+
+    results = {"contracts": len(contracts), "off": run_pass()}
+    settings.LLM_CACHE_ENABLED = True
+    settings.LLM_CACHE_PATH = os.path.join(workdir, "llm_cache.db")
+    reset_llm_cache()
+    try:
+        results["first_pass"] = run_pass()
+        results["second_pass"] = run_pass()
+        stats = get_llm_cache().stats()
+        results["hit_rate"] = {service: counts["hit_rate"] for service, counts in stats["services"].items()}
+        results["entries"] = stats["entries"]
+        results["compressed_bytes"] = stats["compressed_bytes"]
+    finally:
+        settings.LLM_CACHE_ENABLED = False
+        reset_llm_cache()
+    return results
+
+
+def bench_json(contracts, seed):
+    """
+    Parse every kind of malformed extraction response with both parsers.
+
+    A response is usable when the parser returns clause data instead of the
+    "Failed to parse" fallback, i.e. when it spares the user a re-run;
+    ``recalls_avoided`` counts responses only the repairing parser could use.
+    """
+    from app.services.clause_extractor import CLAUSE_KEYS, CLAUSE_PROMPT
+    from app.services.fake_llm import MALFORMED_KINDS, FakeChatModel, malform_json
+    from app.services.json_repair import repair_json
+
+    fake = FakeChatModel()
+    rng = random.Random(seed)
+    clean = [fake.invoke(CLAUSE_PROMPT.format(content=text)).content for text, _ in contracts]
+
+    results = {}
+    totals = {"responses": 0, "regex_usable": 0, "repair_usable": 0}
+    for kind in ("clean",) + MALFORMED_KINDS:
+        responses = clean if kind == "clean" else [malform_json(text, rng, kind) for text in clean]
+        entry = {"responses": len(responses), "regex_usable": 0, "repair_usable": 0, "repair_complete": 0}
+        for label, parse in (("regex", _regex_parse), ("repair", repair_json)):
+            started = time.perf_counter()
+            for response, expected in zip(responses, clean):
+                try:
+                    parsed = parse(response)
+                except ValueError:
+                    parsed = None
+                if label == "repair" and parsed is not None:
+                    parsed = parsed[0]
+                if parsed:
+                    entry[f"{label}_usable"] += 1
+                    if label == "repair":
+                        reference = json.loads(expected)
+                        entry["repair_complete"] += all(parsed.get(k) == reference[k] for k in CLAUSE_KEYS)
+            entry[f"{label}_parse_us"] = round((time.perf_counter() - started) / len(responses) * 1e6, 1)
+        entry["recalls_avoided"] = entry["repair_usable"] - entry["regex_usable"]
+        results[kind] = entry
+        if kind != "clean":
+            for key in totals:
+                totals[key] += entry[key]
+
+    malformed = totals["responses"]
+    results["malformed"] = {
+        "responses": malformed,
+        "regex_usable_percent": round(100 * totals["regex_usable"] / malformed, 1),
+        "repair_usable_percent": round(100 * totals["repair_usable"] / malformed, 1),
+        "recalls_avoided_percent": round(100 * (totals["repair_usable"] - totals["regex_usable"]) / malformed, 1),
+    }
+    return results
+
+
+async def _review_burst(contracts, concurrency):
+    from app.orchestrator import arun_full_review
+
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def review(text):
+        nonlocal failures
+        async with semaphore:
+            try:
+                await arun_full_review(text)
+            except Exception:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(review(text) for text, _ in contracts))
+    return time.perf_counter() - started, failures
+
+
+def bench_rate_limit(contracts, concurrency, requests_per_minute=600, burst_seconds=5.0):
+    """
+    Review a burst of contracts against a fake provider limited to ``requests_per_minute``.
+
+    Cases: no limiter and no retries (what callers saw before), 429 retries with backoff
+    only, and the shared limiter budgeting to the same limit.
+    """
+    from app.services.fake_llm import FakeChatModel, reset_fake_server
+    from app.services.llm_factory import set_llm_override
+    from app.services.rate_limiter import AdaptiveConcurrency, LLMRateLimiter, SharedTokenBuckets, reset_rate_limiter
+
+    set_llm_override(lambda temperature, model: FakeChatModel(
+        model_name=model,
+        latency=settings.FAKE_LLM_LATENCY,
+        tokens_per_second=settings.FAKE_LLM_TOKENS_PER_SECOND,
+        requests_per_minute=requests_per_minute,
+        burst_seconds=burst_seconds,
+    ))
+    cases = {
+        "no_retry": dict(enabled=False, max_retries=0),
+        "retry_only": dict(enabled=False, max_retries=8, backoff_base=0.25, backoff_max=4.0),
+        "limiter": dict(enabled=True, max_retries=8, backoff_base=0.25, backoff_max=4.0),
+    }
+    results = {"requests_per_minute": requests_per_minute}
+    try:
+        for name, options in cases.items():
+            reset_fake_server()
+            limiter = LLMRateLimiter(
+                SharedTokenBuckets("", requests_per_minute, 0, burst_seconds),
+                AdaptiveConcurrency(settings.LLM_MAX_CONCURRENCY, settings.LLM_MIN_CONCURRENCY, settings.LLM_LATENCY_TARGET),
+                **options,
+            )
+            reset_rate_limiter(limiter)
+            seconds, failures = asyncio.run(_review_burst(contracts, concurrency))
+            results[name] = {
+                "seconds": round(seconds, 3),
+                "failures": failures,
+                "throttled": limiter.throttled,
+                "retries": limiter.retries,
+            }
+    finally:
+        set_llm_override(None)
+        reset_rate_limiter()
+    return results
+
+
+def bench_deadline(contracts, deadline=0.8, latency=0.1, llm_slots=4):
+    """
+    Overload: submit every contract at once to a provider that serves ``llm_slots`` calls
+    at a time, each taking ``latency`` seconds, from clients that give up after ``deadline``.
+
+    Without deadlines every review runs to the end, so the tokens of reviews finishing
+    after the client left are wasted. With them, stages still running at the deadline are
+    cancelled and the client gets a partial review.
+    """
+    from app.orchestrator import arun_full_review
+    from app.services.deadline import Deadline
+    from app.services.fake_llm import FakeChatModel
+    from app.services.llm_factory import set_llm_override
+    from app.services.rate_limiter import AdaptiveConcurrency, LLMRateLimiter, SharedTokenBuckets, reset_rate_limiter
+
+    async def burst(with_deadline):
+        reviews = []
+
+        async def review(text):
+            started = time.perf_counter()
+            result = await arun_full_review(text, deadline=Deadline(deadline) if with_deadline else None)
+            reviews.append((time.perf_counter() - started, result))
+
+        await asyncio.gather(*(review(text) for text, _ in contracts))
+        return reviews
+
+    set_llm_override(lambda temperature, model: FakeChatModel(model_name=model, latency=latency))
+    results = {"requests": len(contracts), "deadline_seconds": deadline}
+    try:
+        for name, with_deadline in (("off", False), ("on", True)):
+            # A fixed number of calls in flight stands in for the provider's capacity
+            reset_rate_limiter(LLMRateLimiter(
+                SharedTokenBuckets("", 0, 0),
+                AdaptiveConcurrency(llm_slots, llm_slots, latency_target=float("inf")),
+            ))
+            reviews = asyncio.run(burst(with_deadline))
+            tokens = [r["pipeline"]["prompt_tokens"] + r["pipeline"]["completion_tokens"] for _, r in reviews]
+            # A complete review that arrives after the client gave up is wasted work
+            late = [seconds > deadline and not r.get("partial") for seconds, r in reviews]
+            results[name] = {
+                "complete_in_time": sum(1 for (seconds, r) in reviews if seconds <= deadline and not r.get("partial")),
+                "partial": sum(1 for _, r in reviews if r.get("partial")),
+                "late": sum(late),
+                "llm_calls": sum(r["pipeline"]["llm_calls"] for _, r in reviews),
+                "tokens": sum(tokens),
+                "tokens_wasted": sum(t for t, is_late in zip(tokens, late) if is_late),
+                **_latency_summary([seconds for seconds, _ in reviews]),
+            }
+    finally:
+        set_llm_override(None)
+        reset_rate_limiter()
+    return results
+
+
+def bench_scheduler(batch, interactive, sessions=4, latency=0.05, llm_slots=4, requests_per_minute=1200):
+    """
+    Interactive sessions reviewing while a batch job floods the provider's ``llm_slots``.
+
+    "fifo" runs every call as one caller, so slots go out in arrival order (as before
+    the scheduler); "fair" schedules the sessions as interactive and the job as batch
+    traffic. The "_rate_limited" cases give the calls 4x the slots but only
+    ``requests_per_minute``, so the request budget is the bottleneck rather than the
+    slots. Reported: interactive review latency and how long the batch took.
+    """
+    from app.orchestrator import arun_full_review
+    from app.services.fake_llm import FakeChatModel
+    from app.services.llm_factory import set_llm_override
+    from app.services.llm_scheduler import llm_caller
+    from app.services.rate_limiter import AdaptiveConcurrency, LLMRateLimiter, SharedTokenBuckets, reset_rate_limiter
+
+    async def run(fair):
+        async def review(text, priority, tenant):
+            with llm_caller(priority if fair else "api", tenant if fair else None):
+                started = time.perf_counter()
+                await arun_full_review(text)
+                return time.perf_counter() - started
+
+        async def session(index):
+            # Sessions join once the batch has filled the queue, then review one contract after another
+            await asyncio.sleep(latency * 2)
+            return [await review(text, "interactive", f"session-{index}") for text, _ in interactive[index::sessions]]
+
+        started = time.perf_counter()
+        batch_task = asyncio.gather(*(review(text, "batch", "job") for text, _ in batch))
+        latencies = await asyncio.gather(*(session(index) for index in range(sessions)))
+        await batch_task
+        return [seconds for per_session in latencies for seconds in per_session], time.perf_counter() - started
+
+    set_llm_override(lambda temperature, model: FakeChatModel(model_name=model, latency=latency))
+    results = {"requests": len(batch), "sessions": sessions}
+    try:
+        cases = (
+            ("fifo", False, 0, llm_slots),
+            ("fair", True, 0, llm_slots),
+            ("fifo_rate_limited", False, requests_per_minute, llm_slots * 4),
+            ("fair_rate_limited", True, requests_per_minute, llm_slots * 4),
+        )
+        for name, fair, rpm, slots in cases:
+            # A one-second burst, so the budget binds from the first calls
+            limiter = LLMRateLimiter(
+                SharedTokenBuckets("", rpm, 0, burst=1.0),
+                AdaptiveConcurrency(slots, slots, latency_target=float("inf")),
+            )
+            reset_rate_limiter(limiter)
+            samples, seconds = asyncio.run(run(fair))
+            results[name] = {
+                "interactive": {**_latency_summary(samples), "p99_ms": round(_percentile(samples, 99) * 1000, 2)},
+                "batch_seconds": round(seconds, 3),
+                "queue": {
+                    priority: {key: stats[key] for key in ("admitted", "wait_p50_ms", "wait_p99_ms")}
+                    for priority, stats in limiter.concurrency.scheduler_snapshot()["classes"].items()
+                    if stats["admitted"]
+                },
+            }
+            if rpm:
+                results[name]["requests_per_minute"] = rpm
+                results[name]["budget_queue"] = {
+                    priority: {key: stats[key] for key in ("admitted", "wait_p50_ms", "wait_p99_ms")}
+                    for priority, stats in limiter.budget.scheduler_snapshot()["classes"].items()
+                    if stats["admitted"]
+                }
+    finally:
+        set_llm_override(None)
+        reset_rate_limiter()
+    return results
+
+
+# Groq list prices put llama-3.3-70b-versatile at roughly 10x llama-3.1-8b-instant per token
+LARGE_MODEL_COST_RATIO = 10
+
+
+def _tokens_by_model():
+    from prometheus_client import REGISTRY
+
+    totals = {}
+    for metric in REGISTRY.collect():
+        if metric.name == "contract_review_llm_tokens":
+            for sample in metric.samples:
+                if sample.name.endswith("_total"):
+                    model = sample.labels["model"]
+                    totals[model] = totals.get(model, 0) + sample.value
+    return totals
+
+
+def bench_cascade(contracts, noise=0.2, large_latency_factor=3.0):
+    """
+    Small model only vs. large model only vs. the cascade, on a small model that gets
+    ``noise`` of its clauses wrong and a large model ``large_latency_factor`` times slower.
+
+    Agreement is measured against the large-model results: clause text and risk level per clause type.
+    """
+    from app.orchestrator import run_full_review
+    from app.services.fake_llm import FakeChatModel
+    from app.services.llm_factory import set_llm_override
+    from app.services.risk_classifier import normalize_risk_level
+
+    small_model, large_model = settings.GROQ_MODEL, settings.CASCADE_LARGE_MODEL
+    set_llm_override(lambda temperature, model: FakeChatModel(
+        model_name=model,
+        latency=settings.FAKE_LLM_LATENCY * (large_latency_factor if model == large_model else 1),
+        tokens_per_second=settings.FAKE_LLM_TOKENS_PER_SECOND,
+        noise=0.0 if model == large_model else noise,
+    ))
+    cases = {"small": (small_model, False), "large": (large_model, False), "cascade": (small_model, True)}
+    runs = {}
+    results = {"contracts": len(contracts)}
+    try:
+        for name, (model, cascade) in cases.items():
+            settings.GROQ_MODEL, settings.MODEL_CASCADE_ENABLED = model, cascade
+            before = _tokens_by_model()
+            samples, reviews = [], []
+            for text, _ in contracts:
+                started = time.perf_counter()
+                reviews.append(run_full_review(text))
+                samples.append(time.perf_counter() - started)
+            after = _tokens_by_model()
+            spent = {key: after.get(key, 0) - before.get(key, 0) for key in (small_model, large_model)}
+            runs[name] = reviews
+            results[name] = {
+                **_latency_summary(samples),
+                "llm_calls": sum(review["pipeline"]["llm_calls"] for review in reviews),
+                "small_model_tokens": int(spent[small_model]),
+                "large_model_tokens": int(spent[large_model]),
+                "relative_cost": spent[small_model] + LARGE_MODEL_COST_RATIO * spent[large_model],
+            }
+    finally:
+        settings.GROQ_MODEL, settings.MODEL_CASCADE_ENABLED = small_model, False
+        set_llm_override(None)
+
+    baseline_cost = results["large"]["relative_cost"] or 1
+    for name in cases:
+        clauses = verdicts = total = 0
+        for review, reference in zip(runs[name], runs["large"]):
+            for key, value in reference["clauses"].items():
+                total += 1
+                clauses += review["clauses"].get(key) == value
+                verdicts += (
+                    normalize_risk_level(review["risks"].get(key)) == normalize_risk_level(reference["risks"].get(key))
+                )
+        results[name]["relative_cost"] = round(results[name]["relative_cost"] / baseline_cost, 3)
+        results[name]["clause_agreement_percent"] = round(100 * clauses / total, 1)
+        results[name]["risk_agreement_percent"] = round(100 * verdicts / total, 1)
+    return results
+
+
+def bench_single_flight(contracts, duplicates):
+    """
+    Submit every contract ``duplicates`` times at once, with and without single-flight.
+
+    Stands in for a busy period where several users upload the same contract.
+    """
+    from app.orchestrator import arun_full_review
+
+    async def burst():
+        samples = []
+        llm_calls = 0
+
+        async def review(text):
+            nonlocal llm_calls
+            started = time.perf_counter()
+            result = await arun_full_review(text)
+            samples.append(time.perf_counter() - started)
+            llm_calls += result["pipeline"]["llm_calls"]
+
+        started = time.perf_counter()
+        await asyncio.gather(*(review(text) for text, _ in contracts for _ in range(duplicates)))
+        return time.perf_counter() - started, samples, llm_calls
+
+    enabled = settings.SINGLE_FLIGHT_ENABLED
+    results = {"requests": len(contracts) * duplicates}
+    try:
+        for name, value in (("off", False), ("on", True)):
+            settings.SINGLE_FLIGHT_ENABLED = value
+            seconds, samples, llm_calls = asyncio.run(burst())
+            results[name] = {"seconds": round(seconds, 3), "llm_calls": llm_calls, **_latency_summary(samples)}
+    finally:
+        settings.SINGLE_FLIGHT_ENABLED = enabled
+    return results
+
+
+def bench_review_store(workdir, contracts, count, repeats=20, seed=0):
+    """
+    Fill a review store with ``count`` reviews, then time portfolio queries against it.
+
+    The reviews are real pipeline results for ``contracts`` with shuffled risk levels,
+    so the full-text index holds realistic clause summaries.
+    """
+    from app.orchestrator import run_full_review
+    from app.services.review_store import ReviewStore
+
+    rng = random.Random(seed)
+    templates = [(text, run_full_review(text)) for text, _ in contracts]
+    store = ReviewStore(os.path.join(workdir, "reviews.db"))
+    levels = ("High", "Medium", "Low")
+
+    started = time.perf_counter()
+    for i in range(count):
+        text, template = templates[i % len(templates)]
+        result = json.loads(json.dumps(template))
+        for key in result["risks"]:
+            result["risks"][key] = f"{rng.choice(levels)} Risk: synthetic verdict {i}"
+        store.save(f"{text}\n{i}", result, filename=f"contract_{i}.pdf", source="bench")
+    save_seconds = time.perf_counter() - started
+
+    # A word that occurs in the stored liability summaries
+    summary = str(templates[0][1]["clauses"].get("liability", ""))
+    word = max(re.findall(r"[a-z]{4,}", summary.lower()) or ["liability"], key=len)
+    queries = {
+        "filter": {"clause_type": "liability", "risk_level": "high"},
+        "full_text": {"q": word},
+        "filter_full_text": {"clause_type": "liability", "risk_level": "high", "q": f"{word[:4]}*"},
+        "deep_page": {"risk_level": "low", "offset": count // 2},
+    }
+    results = {
+        "stored_reviews": count,
+        "saves_per_second": round(count / save_seconds, 1),
+    }
+    for name, params in queries.items():
+        samples = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            store.query(**params)
+            samples.append(time.perf_counter() - started)
+        results[name] = _latency_summary(samples)
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        store.summary()
+        samples.append(time.perf_counter() - started)
+    results["summary"] = _latency_summary(samples)
+    return results
+
+
+def bench_prefilter(workdir, history, contracts, repeats=50):
+    """
+    Train the local risk prefilter on fake-LLM reviews of ``history``, then review
+    ``contracts`` with and without it.
+
+    Reports held-out precision from training, load and scoring times, the LLM calls and
+    prompt tokens saved, and agreement with the verdicts the LLM gives on its own.
+    """
+    from app.cli import train_prefilter
+    from app.orchestrator import run_full_review
+    from app.services import risk_prefilter
+    from app.services.review_store import ReviewStore
+    from app.services.risk_classifier import normalize_risk_level
+
+    store_path = os.path.join(workdir, "prefilter_reviews.db")
+    model_path = os.path.join(workdir, "risk_prefilter.npz")
+    store = ReviewStore(store_path)
+    for text, _ in history:
+        store.save(text, run_full_review(text, topology="sequential"))
+    started = time.perf_counter()
+    report = train_prefilter(store_path, model_path)
+    train_seconds = time.perf_counter() - started
+
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        model = risk_prefilter.RiskPrefilter.load(model_path)
+        samples.append(time.perf_counter() - started)
+    load = _latency_summary(samples)
+
+    enabled, path = settings.RISK_PREFILTER_ENABLED, settings.RISK_PREFILTER_PATH
+    settings.RISK_PREFILTER_PATH = model_path
+    runs = {}
+    try:
+        for name, value in (("off", False), ("on", True)):
+            settings.RISK_PREFILTER_ENABLED = value
+            runs[name] = [run_full_review(text, topology="sequential") for text, _ in contracts]
+    finally:
+        settings.RISK_PREFILTER_ENABLED, settings.RISK_PREFILTER_PATH = enabled, path
+
+    score_samples = []
+    total = agreed = answered = 0
+    for review, reference in zip(runs["on"], runs["off"]):
+        clauses = {
+            key: value if isinstance(value, str) else json.dumps(value, sort_keys=True)
+            for key, value in reference["clauses"].items()
+        }
+        for _ in range(repeats):
+            started = time.perf_counter()
+            model.answer(clauses)
+            score_samples.append(time.perf_counter() - started)
+        for key, verdict in reference["risks"].items():
+            total += 1
+            agreed += normalize_risk_level(review["risks"].get(key)) == normalize_risk_level(verdict)
+            answered += risk_prefilter.MARKER in str(review["risks"].get(key))
+    return {
+        "contracts": len(contracts),
+        "training_reviews": len(history),
+        "train_seconds": round(train_seconds, 3),
+        "model_bytes": os.path.getsize(model_path),
+        "holdout": report["at_threshold"],
+        "load_ms": load["p50_ms"],
+        "score_contract_us_p50": round(1e6 * _percentile(score_samples, 50), 1),
+        "score_contract_us_p95": round(1e6 * _percentile(score_samples, 95), 1),
+        "clauses_answered_percent": round(100 * answered / total, 1) if total else 0.0,
+        "risk_agreement_percent": round(100 * agreed / total, 1) if total else 0.0,
+        "llm_calls": {name: sum(r["pipeline"]["llm_calls"] for r in reviews) for name, reviews in runs.items()},
+        "prompt_tokens": {name: sum(r["pipeline"]["prompt_tokens"] for r in reviews) for name, reviews in runs.items()},
+    }
+
+
+async def _post_reviews(paths, concurrency):
+    import httpx
+    from app.main import app
+
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+    failures = 0
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def post(path):
+            nonlocal failures
+            async with semaphore:
+                with open(path, "rb") as f:
+                    body = f.read()
+                started = time.perf_counter()
+                response = await client.post("/review", files={"file": (os.path.basename(path), body, "application/pdf")})
+                samples.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    failures += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(post(path) for path in paths))
+        elapsed = time.perf_counter() - started
+    return elapsed, samples, failures
+
+
+def bench_api(paths, concurrency):
+    elapsed, samples, failures = asyncio.run(_post_reviews(paths, concurrency))
+    return {
+        "requests": len(paths),
+        "concurrency": concurrency,
+        "failures": failures,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(paths) / elapsed, 2),
+        **_latency_summary(samples),
+    }
+
+
+def bench_gradio(paths, concurrency):
+    from app.gradio_ui import PENDING_HTML, analyze_contract
+
+    def no_progress(*args, **kwargs):
+        pass
+
+    def session(path):
+        started = time.perf_counter()
+        first_result = None
+        for outputs in analyze_contract(path, {}, progress=no_progress):
+            # The first update only shows placeholders; the next one carries a finished stage
+            if first_result is None and outputs[:3].count(PENDING_HTML) < 3:
+                first_result = time.perf_counter() - started
+        seconds = time.perf_counter() - started
+        return seconds, first_result or seconds, "❌" in str(outputs[3])
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        runs = list(pool.map(session, paths))
+    elapsed = time.perf_counter() - started
+    samples = [seconds for seconds, _, _ in runs]
+    first_results = [first for _, first, _ in runs]
+    return {
+        "sessions": len(paths),
+        "concurrency": concurrency,
+        "failures": sum(1 for _, _, failed in runs if failed),
+        "seconds": round(elapsed, 3),
+        "sessions_per_second": round(len(paths) / elapsed, 2),
+        **_latency_summary(samples),
+        "first_result_p50_ms": round(_percentile(first_results, 50) * 1000, 2),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(results, baseline):
+    """Return {metric: percent change} for numeric metrics present in both runs"""
+    current = _flatten(results)
+    previous = _flatten(baseline)
+    deltas = {}
+    for name, value in current.items():
+        if name.rsplit(".", 1)[-1] in WORKLOAD_KEYS:
+            continue
+        old = previous.get(name)
+        if old:
+            deltas[name] = round((value - old) / old * 100, 1)
+    return deltas
+
+
+def _print_comparison(deltas):
+    print("\nChange vs. baseline (negative latency / positive throughput is better):")
+    for name, delta in sorted(deltas.items()):
+        lower_better = name.rsplit(".", 1)[-1].endswith(LOWER_IS_BETTER)
+        worse = delta > 0 if lower_better else delta < 0
+        flag = "  <-- regression" if worse and abs(delta) >= 10 else ""
+        print(f"  {name:55s} {delta:+7.1f}%{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="Small sizes for a fast smoke run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake LLM base latency per call (seconds)")
+    parser.add_argument("--tokens-per-second", type=float, default=0, help="Fake LLM completion speed (0 = instant)")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of malformed JSON responses")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS)
+    parser.add_argument("--output", default="bench_results.json", help="Results file (JSON)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    settings.FAKE_LLM_LATENCY = args.latency
+    settings.FAKE_LLM_TOKENS_PER_SECOND = args.tokens_per_second
+    settings.FAKE_LLM_MALFORMED_RATE = args.malformed_rate
+
+    page_counts = (2, 30) if args.quick else (2, 10, 50, 150, 300)
+    review_count = 5 if args.quick else 30
+    json_count = 40 if args.quick else 200
+    burst_count = 12 if args.quick else 40
+    request_count = 8 if args.quick else 48
+    stored_count = 500 if args.quick else 4000
+    repeats = 1 if args.quick else 3
+    selected = set(args.only or BENCHMARKS)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="contract-bench-") as workdir:
+        if "load_pdf" in selected:
+            results["load_pdf"] = bench_load_pdf(workdir, page_counts, repeats)
+
+        contracts = list(generate_corpus(review_count, seed=args.seed, pages=(1, 12)))
+        if "normalize" in selected:
+            results["normalize"] = bench_normalize(workdir, (30,) if args.quick else (50, 500), repeats)
+        if "review" in selected:
+            results["review"] = bench_review(contracts)
+        if "topologies" in selected:
+            results["topologies"] = bench_topologies(contracts)
+        if "rate_limit" in selected:
+            burst = list(generate_corpus(burst_count, seed=args.seed + 2, pages=(1, 4)))
+            results["rate_limit"] = bench_rate_limit(burst, max(16, args.concurrency))
+        if "deadline" in selected:
+            burst = list(generate_corpus(burst_count, seed=args.seed + 2, pages=(1, 4)))
+            results["deadline"] = bench_deadline(burst)
+        if "scheduler" in selected:
+            burst = list(generate_corpus(burst_count * 2, seed=args.seed + 2, pages=(1, 4)))
+            results["scheduler"] = bench_scheduler(burst, contracts[: 8 if args.quick else 16])
+        if "cascade" in selected:
+            results["cascade"] = bench_cascade(contracts)
+        if "single_flight" in selected:
+            results["single_flight"] = bench_single_flight(contracts[:4], 8)
+        if "review_store" in selected:
+            results["review_store"] = bench_review_store(workdir, contracts[:5], stored_count, seed=args.seed)
+        if "prefilter" in selected:
+            history = generate_corpus(40 if args.quick else 300, seed=args.seed + 3, pages=(1, 6))
+            results["prefilter"] = bench_prefilter(workdir, list(history), contracts)
+        if "llm_cache" in selected:
+            results["llm_cache"] = bench_llm_cache(workdir, contracts)
+        if "json" in selected:
+            results["json"] = bench_json(generate_corpus(json_count, seed=args.seed, pages=(1, 4)), args.seed)
+
+        # Distinct documents so neither cache nor identical prompts flatter the numbers
+        corpus = write_pdf_corpus(os.path.join(workdir, "requests"), request_count, seed=args.seed + 1, pages=(2, 20))
+        paths = [path for path, _, _ in corpus]
+        if "api" in selected:
+            results["api"] = bench_api(paths, args.concurrency)
+        if "gradio" in selected:
+            results["gradio"] = bench_gradio(paths, args.concurrency)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "quick": args.quick,
+            "fake_llm": {
+                "latency": args.latency,
+                "tokens_per_second": args.tokens_per_second,
+                "malformed_rate": args.malformed_rate,
+            },
+            "settings": {
+                "CLAUSE_EXTRACTION_MODE": settings.CLAUSE_EXTRACTION_MODE,
+                "CLAUSE_CHUNK_SIZE": settings.CLAUSE_CHUNK_SIZE,
+                "CLAUSE_CHUNK_CONCURRENCY": settings.CLAUSE_CHUNK_CONCURRENCY,
+                "PDF_WORKERS": settings.PDF_WORKERS,
+                "PDF_PARALLEL_MIN_PAGES": settings.PDF_PARALLEL_MIN_PAGES,
+                "PIPELINE_TOPOLOGY": settings.PIPELINE_TOPOLOGY,
+                "TEXT_NORMALIZATION_ENABLED": settings.TEXT_NORMALIZATION_ENABLED,
+                "LLM_JSON_MODE": settings.LLM_JSON_MODE,
+                "SINGLE_FLIGHT_ENABLED": settings.SINGLE_FLIGHT_ENABLED,
+                "CASCADE_CONFIDENCE_THRESHOLD": settings.CASCADE_CONFIDENCE_THRESHOLD,
+                "RISK_PREFILTER_THRESHOLD": settings.RISK_PREFILTER_THRESHOLD,
+            },
+        },
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["baseline_delta_percent"] = compare(results, json.load(f)["results"])
+
+    print(json.dumps(results, indent=2))
+    if args.baseline:
+        _print_comparison(report["baseline_delta_percent"])
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Recall benchmark for targeted clause extraction.
+
+Offline (default): checks that every planted clause provision in the synthetic
+corpus survives select_clause_spans, and reports how much text is cut.
+
+With --llm: also runs extract_clauses in "full" and "targeted" mode and reports,
+per clause type, how often targeted mode finds what full mode found.
+
+Usage:
+    python -m benchmarks.section_recall --contracts 200
+    python -m benchmarks.section_recall --contracts 20 --llm --output recall.json
+"""
+import argparse
+import json
+import time
+from app.services.section_index import CLAUSE_KEYWORDS, select_clause_spans
+from benchmarks.corpus import generate_corpus
+
+# Rough characters-per-token ratio for English prose
+CHARS_PER_TOKEN = 4
+
+
+def span_recall(contracts):
+    found = {clause_type: 0 for clause_type in CLAUSE_KEYWORDS}
+    present = {clause_type: 0 for clause_type in CLAUSE_KEYWORDS}
+    full_chars = selected_chars = 0
+    started = time.perf_counter()
+    for text, labels in contracts:
+        selected = select_clause_spans(text)
+        full_chars += len(text)
+        selected_chars += len(selected)
+        for clause_type, provision in labels.items():
+            if provision is None:
+                continue
+            present[clause_type] += 1
+            if provision in selected:
+                found[clause_type] += 1
+    elapsed = time.perf_counter() - started
+
+    per_clause = {
+        clause_type: round(found[clause_type] / present[clause_type], 4) if present[clause_type] else None
+        for clause_type in CLAUSE_KEYWORDS
+    }
+    return {
+        "contracts": len(contracts),
+        "recall": round(sum(found.values()) / max(1, sum(present.values())), 4),
+        "recall_per_clause": per_clause,
+        "full_tokens_est": full_chars // CHARS_PER_TOKEN,
+        "targeted_tokens_est": selected_chars // CHARS_PER_TOKEN,
+        "token_reduction": round(full_chars / max(1, selected_chars), 2),
+        "select_ms_per_contract": round(elapsed * 1000 / max(1, len(contracts)), 3),
+    }
+
+
+def _found(value):
+    return isinstance(value, (dict, list)) or (isinstance(value, str) and value.strip().lower() not in ("", "not_found"))
+
+
+def llm_agreement(contracts):
+    # Imported here so the offline benchmark doesn't need LLM configuration
+    from app.services.clause_extractor import extract_clauses
+
+    agree = {clause_type: 0 for clause_type in CLAUSE_KEYWORDS}
+    found_full = {clause_type: 0 for clause_type in CLAUSE_KEYWORDS}
+    timings = {"full": 0.0, "targeted": 0.0}
+    for text, _ in contracts:
+        started = time.perf_counter()
+        full = extract_clauses(text, mode="full")
+        timings["full"] += time.perf_counter() - started
+        started = time.perf_counter()
+        targeted = extract_clauses(text, mode="targeted")
+        timings["targeted"] += time.perf_counter() - started
+        for clause_type in CLAUSE_KEYWORDS:
+            if _found(full.get(clause_type)):
+                found_full[clause_type] += 1
+                if _found(targeted.get(clause_type)):
+                    agree[clause_type] += 1
+
+    return {
+        "recall_vs_full": round(sum(agree.values()) / max(1, sum(found_full.values())), 4),
+        "recall_vs_full_per_clause": {
+            clause_type: round(agree[clause_type] / found_full[clause_type], 4) if found_full[clause_type] else None
+            for clause_type in CLAUSE_KEYWORDS
+        },
+        "full_seconds": round(timings["full"], 3),
+        "targeted_seconds": round(timings["targeted"], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contracts", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-pages", type=int, default=2)
+    parser.add_argument("--max-pages", type=int, default=20)
+    parser.add_argument("--llm", action="store_true", help="Also compare LLM extraction in full vs targeted mode")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    contracts = list(generate_corpus(args.contracts, seed=args.seed, pages=(args.min_pages, args.max_pages)))
+    results = {"span": span_recall(contracts)}
+    if args.llm:
+        results["llm"] = llm_agreement(contracts)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
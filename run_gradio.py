@@ -1,11 +1,16 @@
 """Launch script for Gradio UI"""
 import os
+import threading
+from app.config import settings
 from app.gradio_ui import demo
+from app.services.llm_factory import warm_up
 
 if __name__ == "__main__":
     # Use static port 7861 (or from PORT environment variable)
     port = int(os.getenv("PORT", "7861"))
     server_name = "0.0.0.0"
     print(f"🚀 Starting Gradio UI on http://{server_name}:{port}")
+    if settings.LLM_WARMUP:
+        threading.Thread(target=warm_up, daemon=True).start()
     demo.launch(server_name=server_name, server_port=port, share=False)
 
@@ -0,0 +1,81 @@
+"""Concurrency of the async review pipeline against the fake provider"""
+import asyncio
+import time
+import unittest
+from app.config import settings
+from app.orchestrator import arun_full_review
+from app.services.fake_llm import FakeChatModel
+from app.services.llm_factory import set_llm_override
+from app.services.rate_limiter import AdaptiveConcurrency, LLMRateLimiter, SharedTokenBuckets, reset_rate_limiter
+
+# Seconds per fake LLM call: large enough that the reviews' own CPU time doesn't matter
+LATENCY = 0.2
+CONCURRENT_REVIEWS = 8
+
+CONTRACT = """MASTER SERVICES AGREEMENT {index}
+
+1. Term. This Agreement begins on the Effective Date and continues for {index} years.
+2. Payment. Client shall pay each invoice within 30 days of receipt.
+3. Termination. Either party may terminate this Agreement on 60 days' written notice.
+4. Liability. Neither party's liability shall exceed the fees paid in the prior 12 months.
+5. Confidentiality. Each party shall keep the other's Confidential Information secret.
+6. Governing Law. This Agreement is governed by the laws of the State of New York.
+"""
+
+# Every review must reach the provider: no caches, coalescing or local shortcuts
+OVERRIDES = {
+    "LLM_PROVIDER": "fake",
+    "REVIEW_CACHE_ENABLED": False,
+    "LLM_CACHE_ENABLED": False,
+    "SINGLE_FLIGHT_ENABLED": False,
+    "CLAUSE_INDEX_ENABLED": False,
+    "RISK_PREFILTER_ENABLED": False,
+    "MODEL_CASCADE_ENABLED": False,
+    "REVIEW_STORE_ENABLED": False,
+}
+
+
+class AsyncReviewConcurrencyTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self._saved = {name: getattr(settings, name) for name in OVERRIDES}
+        for name, value in OVERRIDES.items():
+            setattr(settings, name, value)
+        set_llm_override(lambda temperature, model: FakeChatModel(model_name=model, latency=LATENCY))
+        # Unlimited budget and more slots than the reviews can use at once
+        reset_rate_limiter(LLMRateLimiter(
+            SharedTokenBuckets("", 0, 0),
+            AdaptiveConcurrency(64, 64, latency_target=float("inf")),
+            enabled=False,
+        ))
+
+    def tearDown(self):
+        set_llm_override(None)
+        reset_rate_limiter()
+        for name, value in self._saved.items():
+            setattr(settings, name, value)
+
+    async def test_concurrent_reviews_take_about_as_long_as_one(self):
+        started = time.perf_counter()
+        single = await arun_full_review(CONTRACT.format(index=1))
+        one_review = time.perf_counter() - started
+        self.assertNotIn("error", single)
+        self.assertGreaterEqual(one_review, 2 * LATENCY)  # extraction, then the later stages
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(
+            arun_full_review(CONTRACT.format(index=index)) for index in range(2, CONCURRENT_REVIEWS + 2)
+        ))
+        concurrent = time.perf_counter() - started
+
+        for result in results:
+            self.assertNotIn("error", result)
+            self.assertFalse(result.get("partial"))
+            self.assertIsNotNone(result["clauses"])
+            self.assertIsNotNone(result["risks"])
+            self.assertIsNotNone(result["suggestions"])
+        # Run one after another, the reviews would take CONCURRENT_REVIEWS times as long
+        self.assertLess(concurrent, 2 * one_review)
+
+
+if __name__ == "__main__":
+    unittest.main()